@@ -22,6 +22,8 @@
 """Robotframe keyword library for OpenAFS tests"""
 
 from OpenAFSLibrary.__version__ import VERSION as __version__
+from OpenAFSLibrary import logger
+from OpenAFSLibrary.variable import check_tools, VariableCacheListener
 
 from OpenAFSLibrary.keywords import _CommandKeywords
 from OpenAFSLibrary.keywords import _LoginKeywords
@@ -32,6 +34,10 @@ from OpenAFSLibrary.keywords import _RxKeywords
 from OpenAFSLibrary.keywords import _PagKeywords
 from OpenAFSLibrary.keywords import _CacheKeywords
 from OpenAFSLibrary.keywords import _DumpKeywords
+from OpenAFSLibrary.keywords import _MetricsKeywords
+from OpenAFSLibrary.keywords import _PoolKeywords
+from OpenAFSLibrary.keywords import _WaitKeywords
+from OpenAFSLibrary.keywords import _BenchmarkKeywords
 
 
 class OpenAFSLibrary(
@@ -44,6 +50,10 @@ class OpenAFSLibrary(
     _PagKeywords,
     _CacheKeywords,
     _DumpKeywords,
+    _MetricsKeywords,
+    _PoolKeywords,
+    _WaitKeywords,
+    _BenchmarkKeywords,
 ):
     """OpenAFS Robot Framework test library
 
@@ -59,6 +69,8 @@ class OpenAFSLibrary(
     | AFS_CELL          | Test cell name |
     | KRB_REALM         | Authentication realm |
     | KRB_AFS_KEYTAB    | Authenication keytab for akimpersonate mode |
+    | AFS_COMMAND_TIMEOUT | Command timeout in seconds; 0 for no timeout |
+    | AFS_FILESERVERS   | Comma separated fileservers for `Create Volumes` and `auto` placement |
 
     === Command paths ===
 
@@ -77,3 +89,11 @@ class OpenAFSLibrary(
 
     ROBOT_LIBRARY_SCOPE = "GLOBAL"
     ROBOT_LIBRARY_VERSION = __version__
+
+    def __init__(self):
+        self.ROBOT_LIBRARY_LISTENER = VariableCacheListener()
+        # Resolve the command paths once at startup and report the commands
+        # which are not available. Use `Command Paths Should Be Valid` to
+        # fail the setup when a command is required.
+        for problem in check_tools():
+            logger.warn("Command not available: %s" % problem)
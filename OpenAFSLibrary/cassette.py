@@ -0,0 +1,161 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+#
+
+"""Record and replay command results.
+
+A cassette is a file of JSON lines, one for each command run, with the
+command arguments, exit code, output and error. The file is gzip
+compressed when the name ends with '.gz'. The first argument of each
+command is stored as a base name, so a cassette recorded with
+/usr/afs/bin/vos can be replayed where VOS is just 'vos'.
+"""
+
+import collections
+import gzip
+import json
+import os
+import threading
+
+from OpenAFSLibrary import command
+
+
+class CassetteError(Exception):
+    pass
+
+
+def _open(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _key(args):
+    """Return the lookup key of a command."""
+    if isinstance(args, str):
+        return args
+    args = [str(a) for a in args]
+    if args:
+        args[0] = os.path.basename(args[0])
+    return tuple(args)
+
+
+def load(path):
+    """Return the list of recorded command results in a cassette file."""
+    entries = []
+    with _open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+    return entries
+
+
+class Recorder:
+    """Command observer to write each command result to a cassette."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = _open(path, "w")
+
+    def record(self, args, code, output, error):
+        key = _key(args)
+        entry = {
+            "args": key if isinstance(key, str) else list(key),
+            "code": code,
+            "stdout": output,
+            "stderr": error,
+        }
+        line = json.dumps(entry, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Player:
+    """Command backend to serve the command results from a cassette.
+
+    Results are served in the recorded order for each distinct command. The
+    last recorded result of a command is repeated once the others have been
+    served, so polling loops may run longer than when recorded. A
+    CassetteError is raised for a command which was not recorded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._results = collections.defaultdict(collections.deque)
+        for entry in load(path):
+            args = entry["args"]
+            key = args if isinstance(args, str) else tuple(args)
+            self._results[key].append((entry["code"], entry["stdout"], entry["stderr"]))
+
+    def run(self, args, timeout=None, env=None):
+        key = _key(args)
+        with self._lock:
+            results = self._results.get(key)
+            if not results:
+                raise CassetteError("Command not in cassette %s: %s" % (self.path, key))
+            if len(results) > 1:
+                return results.popleft()
+            return results[0]
+
+
+_recorder = None
+_player = None
+
+
+def start_recording(path):
+    """Record the results of the commands run to a cassette file."""
+    global _recorder
+    stop_recording()
+    _recorder = Recorder(path)
+    command.add_observer(_recorder, output=True)
+
+
+def stop_recording():
+    """Stop recording and close the cassette file."""
+    global _recorder
+    if _recorder is not None:
+        command.remove_observer(_recorder)
+        _recorder.close()
+        _recorder = None
+
+
+def start_replay(path):
+    """Serve the command results from a cassette file instead of running them."""
+    global _player
+    _player = Player(path)
+    command.set_backend(_player)
+
+
+def stop_replay():
+    """Run commands again."""
+    global _player
+    if _player is not None:
+        command.set_backend(None)
+        _player = None
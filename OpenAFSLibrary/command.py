@@ -19,10 +19,19 @@
 # OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 #
 
+import asyncio
+import os
+import shlex
+import signal
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from OpenAFSLibrary import logger
-from OpenAFSLibrary.variable import get_var
+from OpenAFSLibrary.metrics import command_metrics, command_tag
+from OpenAFSLibrary.querycache import query_cache
+from OpenAFSLibrary.variable import get_var, get_tool
 
 
 class CommandFailed(Exception):
@@ -41,55 +50,604 @@ class NoSuchEntryError(CommandFailed):
         CommandFailed.__init__(self, "vos", args, "no such volume in the vldb")
 
 
-def run_program(args):
+class CommandTimedOut(CommandFailed):
+    def __init__(self, args, timeout, output="", error=""):
+        args = args.split() if isinstance(args, str) else [str(a) for a in args]
+        CommandFailed.__init__(
+            self, args[0], args[1:], "timed out after %s seconds" % timeout
+        )
+        self.timeout = timeout
+        self.output = output
+        self.error = error
+
+
+DEFAULT_MAX_WORKERS = 8
+
+# Optional replacement for subprocesses; see set_backend().
+_backend = None
+
+# (observer, output) pairs notified of each command result; see add_observer().
+_observers = []
+
+# Characters which require a shell to run a command string.
+_SHELL_METACHARS = set("|&;<>()$`\\*?[]#~\n")
+
+# Shell builtins and reserved words. Command strings which start with one of
+# these are run by the shell.
+_SHELL_WORDS = set(
+    ". : alias bg break case cd continue eval exec exit export fc fg "
+    "for getopts hash if jobs kill pwd read readonly return set shift source "
+    "times trap type ulimit umask unalias unset until wait while { !".split()
+)
+
+# Subcommands which only read cell state. The output of these is kept in the
+# query cache (when enabled).
+_CACHEABLE = {
+    "vos": ("examine", "listaddrs", "listpart", "listvldb", "listvol", "partinfo"),
+    "fs": ("examine", "listacl", "listquota", "lsmount", "whereis"),
+}
+
+# Subcommands which neither read nor change cell state.
+_NEUTRAL = {
+    "vos": ("apropos", "help"),
+    "fs": ("apropos", "checkvolumes", "flush", "flushmount", "flushvolume", "help"),
+}
+
+# Cached tools to be invalidated after a command changes the cell state.
+# A volume change may also change the fs examine volume status.
+_INVALIDATES = {
+    "vos": ("vos", "fs"),
+    "fs": ("fs",),
+}
+
+
+def _get_timeout(timeout):
+    """Return the command timeout in seconds, or None for no timeout.
+
+    The AFS_COMMAND_TIMEOUT variable is used when timeout is not given.
+    """
+    if timeout is None:
+        timeout = get_var("AFS_COMMAND_TIMEOUT")
+    timeout = float(timeout)
+    if timeout <= 0:
+        return None
+    return timeout
+
+
+def _kill_group(proc):
+    """Kill the process group of a program started in a new session."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def set_backend(backend):
+    """Run commands with the given backend instead of subprocesses.
+
+    The backend is an object with a run(args, timeout=None, env=None) method
+    which returns the (code, output, error) tuple of the command. Set the
+    backend to None to run subprocesses again. Returns the previous backend.
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+    return previous
+
+
+def add_observer(observer, output=False):
+    """Call observer.record(args, code, output, error) for each command run.
+
+    The output of streamed commands is only collected when an observer is
+    added with output true; the other observers are given None in its place
+    when no observer needs it.
+    """
+    _observers.append((observer, output))
+
+
+def remove_observer(observer):
+    for entry in list(_observers):
+        if entry[0] is observer:
+            _observers.remove(entry)
+
+
+def _collect_output():
+    """Returns true if an observer needs the output of streamed commands."""
+    return any(output for observer, output in _observers)
+
+
+def _invalidate(args):
+    """Invalidate the cached queries after a command which may change the cell.
+
+    Shell command strings are scanned for any vos or fs change command.
+    """
+    if not query_cache.enabled or not args:
+        return
     if isinstance(args, str):
-        cmd_line = args
-        shell = True
+        words = [os.path.basename(w) for w in args.split()]
+        starts = range(len(words))
     else:
-        args = [str(a) for a in args]
-        cmd_line = " ".join(args)
-        shell = False
-    logger.info("running: %s" % cmd_line)
+        words = [os.path.basename(str(a)) for a in args[:2]]
+        starts = [0]
+    for i in starts:
+        tool = words[i]
+        if tool in _INVALIDATES:
+            subcommand = words[i + 1] if i + 1 < len(words) else ""
+            key, policy = _cache_policy(tool, [subcommand])
+            if policy == "change":
+                query_cache.invalidate(*_INVALIDATES[tool])
+
+
+def _notify(args, code, output, error):
+    for observer, _ in list(_observers):
+        observer.record(args, code, output, error)
+
+
+def _spawn(args, cmd_line, shell, timeout, env):
+    """Run a subprocess and return the (code, output, error) tuple."""
     proc = subprocess.Popen(
-        args, shell=shell, bufsize=-1, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        args,
+        shell=shell,
+        bufsize=-1,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=timeout is not None,
+        env=env,
     )
-    stdout, stderr = proc.communicate()
-    output = stdout.decode("utf-8")
-    error = stderr.decode("utf-8")
-    logger.debug(f"code: {proc.returncode}")
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_group(proc)
+        stdout, stderr = proc.communicate()
+        logger.info("timed out: %s" % cmd_line)
+        raise CommandTimedOut(
+            args, timeout, stdout.decode("utf-8"), stderr.decode("utf-8")
+        )
+    return (proc.returncode, stdout.decode("utf-8"), stderr.decode("utf-8"))
+
+
+def _not_run(command_string, error):
+    """Return the shell exit status of a split command string which could not run.
+
+    Command strings are run without a shell when possible. The shell exit
+    codes are returned when the program is missing (127) or not executable
+    (126), as they were when the command string was run by a shell. Other
+    programs raise the error.
+    """
+    if not command_string:
+        raise error
+    code = 126 if isinstance(error, PermissionError) else 127
+    return (code, "", "%s\n" % error)
+
+
+def run_program(args, timeout=None, env=None):
+    command_string = isinstance(args, str)
+    args, cmd_line, shell = _decode_args(args)
+    timeout = _get_timeout(timeout)
+    logger.info("running: %s" % cmd_line)
+    start = time.monotonic()
+    try:
+        if _backend is not None:
+            code, output, error = _backend.run(args, timeout=timeout, env=env)
+        else:
+            try:
+                code, output, error = _spawn(args, cmd_line, shell, timeout, env)
+            except (FileNotFoundError, PermissionError) as e:
+                code, output, error = _not_run(command_string, e)
+    finally:
+        elapsed = time.monotonic() - start
+        command_metrics.record(command_tag(args), elapsed)
+        _invalidate(args)
+    _notify(args, code, output, error)
+    logger.debug(f"code: {code}")
+    logger.debug(f"elapsed: {elapsed:.3f}")
     logger.debug(f"output: {output}")
     logger.debug(f"error: {error}")
-    return (proc.returncode, output, error)
+    return (code, output, error)
+
+
+def _split_command(cmd):
+    """Split a command string into an argument list.
+
+    Returns None if the command string requires a shell, that is, it contains
+    shell metacharacters, unbalanced quotes, or environment assignments, or
+    it starts with a shell builtin or reserved word.
+    """
+    if _SHELL_METACHARS.intersection(cmd):
+        return None
+    try:
+        args = shlex.split(cmd)
+    except ValueError:
+        return None
+    if not args or "=" in args[0] or args[0] in _SHELL_WORDS:
+        return None
+    return args
+
+
+def _decode_args(args):
+    """Return the args, the command line, and the shell flag for the given args.
+
+    Command strings are run without a shell when possible.
+    """
+    if isinstance(args, str):
+        split = _split_command(args)
+        if split is None:
+            return (args, args, True)
+        return (split, args, False)
+    args = [str(a) for a in args]
+    return (args, " ".join(args), False)
+
+
+class ProgramStream:
+    """Iterate over the output lines of a program as they are produced.
+
+    The standard error is collected separately. The exit code and the
+    error output are available once the output has been consumed. The
+    program is killed if the stream is closed before the end of output.
+    CommandTimedOut is raised at the end of the output if the program was
+    killed because the timeout expired.
+    """
+
+    def __init__(self, args, timeout=None):
+        command_string = isinstance(args, str)
+        args, cmd_line, shell = _decode_args(args)
+        timeout = _get_timeout(timeout)
+        logger.info("running: %s" % cmd_line)
+        self.returncode = None
+        self.error = ""
+        self.count = 0
+        self.timed_out = False
+        self._args = args
+        self._timeout = timeout
+        self._tag = command_tag(args)
+        self._stderr = b""
+        self._start = time.monotonic()
+        self._lines = [] if _collect_output() else None
+        self._timer = None
+        self._proc = None
+        if _backend is not None:
+            self._result = _backend.run(args, timeout=timeout)
+            return
+        try:
+            self._proc = subprocess.Popen(
+                args,
+                shell=shell,
+                bufsize=-1,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True,  # The stream may be closed early.
+            )
+        except (FileNotFoundError, PermissionError) as e:
+            self._result = _not_run(command_string, e)
+            return
+        self._reader = threading.Thread(target=self._read_stderr, daemon=True)
+        self._reader.start()
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire(self):
+        self.timed_out = True
+        _kill_group(self._proc)
+
+    def _read_stderr(self):
+        self._stderr = self._proc.stderr.read()
+
+    def _readlines(self):
+        if self._proc is None:
+            yield from self._result[1].splitlines()
+        else:
+            for raw in self._proc.stdout:
+                yield raw.decode("utf-8").rstrip("\n")
+
+    def __iter__(self):
+        for line in self._readlines():
+            self.count += 1
+            if self._lines is not None:
+                self._lines.append(line)
+            yield line
+        self._finish()
+        if self.timed_out:
+            raise CommandTimedOut(self._args, self._timeout, error=self.error)
+        output = None
+        if self._lines is not None:
+            output = "".join(line + "\n" for line in self._lines)
+        _notify(self._args, self.returncode, output, self.error)
 
+    def _finish(self):
+        if self._proc is None:
+            self.returncode, _, self.error = self._result
+        else:
+            if self._timer is not None:
+                self._timer.cancel()
+            self.returncode = self._proc.wait()
+            self._reader.join()
+            self.error = self._stderr.decode("utf-8")
+        elapsed = time.monotonic() - self._start
+        command_metrics.record(self._tag, elapsed)
+        _invalidate(self._args)
+        logger.debug(f"code: {self.returncode}")
+        logger.debug(f"elapsed: {elapsed:.3f}")
+        logger.debug(f"lines: {self.count}")
+        logger.debug(f"error: {self.error}")
 
-def rxdebug(*args):
-    rc, out, err = run_program([get_var("RXDEBUG")] + list(args))
+    def close(self):
+        """Kill the program, and the programs it started, if still running."""
+        if self.returncode is None:
+            if self._proc is not None and self._proc.poll() is None:
+                _kill_group(self._proc)
+            self._finish()
+            if self._proc is not None:
+                self._proc.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def arun_program(args, timeout=None):
+    """Run a program as an asyncio subprocess.
+
+    This is the asyncio counterpart of run_program(); returns the
+    (code, output, error) tuple once the program exits.
+    """
+    command_string = isinstance(args, str)
+    args, cmd_line, shell = _decode_args(args)
+    timeout = _get_timeout(timeout)
+    logger.info("running: %s" % cmd_line)
+    start = time.monotonic()
+    try:
+        if _backend is not None:
+            code, output, error = await asyncio.to_thread(
+                _backend.run, args, timeout=timeout
+            )
+        else:
+            try:
+                code, output, error = await _aspawn(args, cmd_line, shell, timeout)
+            except (FileNotFoundError, PermissionError) as e:
+                code, output, error = _not_run(command_string, e)
+    finally:
+        elapsed = time.monotonic() - start
+        command_metrics.record(command_tag(args), elapsed)
+        _invalidate(args)
+    _notify(args, code, output, error)
+    logger.debug(f"code: {code}")
+    logger.debug(f"elapsed: {elapsed:.3f}")
+    logger.debug(f"output: {output}")
+    logger.debug(f"error: {error}")
+    return (code, output, error)
+
+
+async def _aspawn(args, cmd_line, shell, timeout):
+    """Run an asyncio subprocess and return the (code, output, error) tuple."""
+    options = {
+        "stdout": asyncio.subprocess.PIPE,
+        "stderr": asyncio.subprocess.PIPE,
+        "start_new_session": timeout is not None,
+    }
+    if shell:
+        proc = await asyncio.create_subprocess_shell(args, **options)
+    else:
+        proc = await asyncio.create_subprocess_exec(*args, **options)
+    if timeout is None:
+        stdout, stderr = await proc.communicate()
+    else:
+        readers = asyncio.gather(proc.stdout.read(), proc.stderr.read())
+        try:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            _kill_group(proc)
+            stdout, stderr = await readers
+            await proc.wait()
+            logger.info("timed out: %s" % cmd_line)
+            raise CommandTimedOut(
+                args, timeout, stdout.decode("utf-8"), stderr.decode("utf-8")
+            )
+        stdout, stderr = await readers
+    return (proc.returncode, stdout.decode("utf-8"), stderr.decode("utf-8"))
+
+
+async def arun_programs(commands, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+    """Run several programs concurrently as asyncio subprocesses.
+
+    At most max_workers programs are run at the same time. Returns the list
+    of (code, output, error) tuples in the same order as the given commands.
+    """
+    semaphore = asyncio.Semaphore(max(1, int(max_workers)))
+
+    async def run(args):
+        async with semaphore:
+            return await arun_program(args, timeout=timeout)
+
+    return list(await asyncio.gather(*[run(args) for args in commands]))
+
+
+def run_programs(commands, max_workers=DEFAULT_MAX_WORKERS, check=False, timeout=None):
+    """Run several programs concurrently.
+
+    Each command is run with run_program() on a bounded pool of worker
+    threads. Returns the list of (code, output, error) tuples in the same
+    order as the given commands. When check is true, a CommandFailed error
+    is raised for the first command (in the given order) which exited with
+    a non-zero code, after all of the commands have completed.
+    """
+    commands = list(commands)
+    if not commands:
+        return []
+    max_workers = max(1, min(int(max_workers), len(commands)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda a: run_program(a, timeout), commands))
+    if check:
+        for args, (rc, out, err) in zip(commands, results):
+            if rc != 0:
+                if isinstance(args, str):
+                    args = args.split()
+                else:
+                    args = [str(a) for a in args]
+                raise CommandFailed(args[0], args[1:], err)
+    return results
+
+
+def rxdebug(*args, timeout=None):
+    rc, out, err = run_program([get_tool("RXDEBUG")] + list(args), timeout)
     if rc != 0:
         raise CommandFailed("rxdebug", args, err)
     return out
 
 
-def bos(*args):
-    rc, out, err = run_program([get_var("BOS")] + list(args))
+def bos(*args, timeout=None):
+    rc, out, err = run_program([get_tool("BOS")] + list(args), timeout)
     if rc != 0:
         raise CommandFailed("bos", args, err)
     return out
 
 
-def vos(*args):
-    rc, out, err = run_program([get_var("VOS")] + list(args))
+def _cache_policy(tool, args):
+    """Return the cache key and whether the command is a query or a change."""
+    key = (tool,) + tuple(str(a) for a in args)
+    subcommand = key[1] if len(key) > 1 else ""
+    if subcommand in _CACHEABLE[tool]:
+        return (key, "query")
+    if subcommand in _NEUTRAL[tool]:
+        return (key, None)
+    return (key, "change")
+
+
+def _cached(tool, args, run):
+    """Run a command through the query cache."""
+    if not query_cache.enabled:
+        return run()
+    key, policy = _cache_policy(tool, args)
+    if policy == "query":
+        out = query_cache.get(key)
+        if out is None:
+            generation = query_cache.generation
+            out = run()
+            query_cache.put(key, out, generation)
+        else:
+            logger.debug("cached: %s" % " ".join(key))
+        return out
+    return run()
+
+
+async def _acached(tool, args, run):
+    """Run an async command through the query cache."""
+    if not query_cache.enabled:
+        return await run()
+    key, policy = _cache_policy(tool, args)
+    if policy == "query":
+        out = query_cache.get(key)
+        if out is None:
+            generation = query_cache.generation
+            out = await run()
+            query_cache.put(key, out, generation)
+        else:
+            logger.debug("cached: %s" % " ".join(key))
+        return out
+    return await run()
+
+
+def _stream(tool, args, error, timeout=None):
+    """Yield the output lines of a tool command.
+
+    The output of cached queries is served from the query cache.
+    """
+    key, policy = (None, None)
+    if query_cache.enabled:
+        key, policy = _cache_policy(tool, args)
+    if policy == "query":
+        out = query_cache.get(key)
+        if out is not None:
+            logger.debug("cached: %s" % " ".join(key))
+            yield from out.splitlines()
+            return
+    lines = [] if policy == "query" else None
+    generation = query_cache.generation
+    with ProgramStream([get_tool(tool.upper())] + list(args), timeout) as stream:
+        for line in stream:
+            if lines is not None:
+                lines.append(line)
+            yield line
+    if stream.returncode != 0:
+        raise error(args, stream.error)
+    if lines is not None:
+        query_cache.put(key, "\n".join(lines), generation)
+
+
+def _vos_error(args, err):
+    """Return the exception for a failed vos command."""
+    for line in err.splitlines():
+        if "VLDB: no such entry" in line:
+            return NoSuchEntryError(args)
+        if "does not exist" in line:
+            return NoSuchEntryError(args)
+    return CommandFailed("vos", args, err)
+
+
+def vos(*args, timeout=None):
+    def run():
+        rc, out, err = run_program([get_tool("VOS")] + list(args), timeout)
+        if rc != 0:
+            raise _vos_error(args, err)
+        return out
+
+    return _cached("vos", args, run)
+
+
+def fs(*args, timeout=None):
+    def run():
+        rc, out, err = run_program([get_tool("FS")] + list(args), timeout)
+        if rc != 0:
+            raise CommandFailed("fs", args, err)
+        return out
+
+    return _cached("fs", args, run)
+
+
+def vos_lines(*args, timeout=None):
+    """Yield the vos output lines as they are produced."""
+    return _stream("vos", args, _vos_error, timeout)
+
+
+def fs_lines(*args, timeout=None):
+    """Yield the fs output lines as they are produced."""
+    return _stream(
+        "fs", args, lambda args, err: CommandFailed("fs", args, err), timeout
+    )
+
+
+async def arxdebug(*args, timeout=None):
+    rc, out, err = await arun_program([get_tool("RXDEBUG")] + list(args), timeout)
     if rc != 0:
-        for line in err.splitlines():
-            if "VLDB: no such entry" in line:
-                raise NoSuchEntryError(args)
-            if "does not exist" in line:
-                raise NoSuchEntryError(args)
-        raise CommandFailed("vos", args, err)
+        raise CommandFailed("rxdebug", args, err)
     return out
 
 
-def fs(*args):
-    rc, out, err = run_program([get_var("FS")] + list(args))
+async def abos(*args, timeout=None):
+    rc, out, err = await arun_program([get_tool("BOS")] + list(args), timeout)
     if rc != 0:
-        raise CommandFailed("fs", args, err)
+        raise CommandFailed("bos", args, err)
     return out
+
+
+async def avos(*args, timeout=None):
+    async def run():
+        rc, out, err = await arun_program([get_tool("VOS")] + list(args), timeout)
+        if rc != 0:
+            raise _vos_error(args, err)
+        return out
+
+    return await _acached("vos", args, run)
+
+
+async def afs(*args, timeout=None):
+    async def run():
+        rc, out, err = await arun_program([get_tool("FS")] + list(args), timeout)
+        if rc != 0:
+            raise CommandFailed("fs", args, err)
+        return out
+
+    return await _acached("fs", args, run)
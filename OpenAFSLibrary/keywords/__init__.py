@@ -28,6 +28,10 @@ from OpenAFSLibrary.keywords.rx import _RxKeywords
 from OpenAFSLibrary.keywords.pag import _PagKeywords
 from OpenAFSLibrary.keywords.cache import _CacheKeywords
 from OpenAFSLibrary.keywords.dump import _DumpKeywords
+from OpenAFSLibrary.keywords.metrics import _MetricsKeywords
+from OpenAFSLibrary.keywords.pool import _PoolKeywords
+from OpenAFSLibrary.keywords.wait import _WaitKeywords
+from OpenAFSLibrary.keywords.bench import _BenchmarkKeywords
 
 __all__ = [
     "_CommandKeywords",
@@ -39,4 +43,8 @@ __all__ = [
     "_PagKeywords",
     "_CacheKeywords",
     "_DumpKeywords",
+    "_MetricsKeywords",
+    "_PoolKeywords",
+    "_WaitKeywords",
+    "_BenchmarkKeywords",
 ]
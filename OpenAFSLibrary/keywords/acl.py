@@ -23,7 +23,8 @@ import os
 import re
 
 from OpenAFSLibrary import logger
-from OpenAFSLibrary.command import fs
+from OpenAFSLibrary.command import fs, afs
+from OpenAFSLibrary.registry import registry
 
 _RIGHTS = list("rlidwkaABCDEFGH")
 
@@ -97,13 +98,27 @@ class AccessControlList:
     @classmethod
     def from_path(cls, path):
         """Read an ACL from AFS directory to create an ACL test object."""
+        cls._check_path(path)
+        return cls.from_output(fs("listacl", path))
+
+    @classmethod
+    async def afrom_path(cls, path):
+        """Read an ACL from AFS directory with an asyncio subprocess."""
+        cls._check_path(path)
+        return cls.from_output(await afs("listacl", path))
+
+    @staticmethod
+    def _check_path(path):
         if not os.path.exists(path):
             raise AssertionError("Path does not exist: %s" % (path))
         if not os.path.isdir(path):
             raise AssertionError("Path is not a directory: %s" % (path))
+
+    @classmethod
+    def from_output(cls, output):
+        """Create an ACL test object from the fs listacl output."""
         acl = AccessControlList()
         section = None
-        output = fs("listacl", path)
         for line in output.splitlines():
             if line.startswith("Access list for"):
                 continue
@@ -170,6 +185,10 @@ class AccessControlList:
         else:
             self.acls[name] = (pos, neg)
 
+    def rights(self, name):
+        """Returns the normal rights of an entry, or an empty string."""
+        return self.acls.get(name, ("", ""))[0]
+
     def contains(self, name, rights):
         """Returns true if an entry exists with a matching name and rights."""
         if name not in self.acls:
@@ -192,8 +211,20 @@ class _ACLKeywords:
     """ACL testing keywords."""
 
     def add_access_rights(self, path, name, rights):
-        """Add access rights to a path."""
+        """Add access rights to a path.
+
+        The previous rights of the entry are restored by `Remove All Created
+        Resources`.
+        """
+        acl = AccessControlList.from_output(fs("listacl", path))
         fs("setacl", "-dir", path, "-acl", name, rights)
+        registry.add_acl(os.path.abspath(path), name, acl.rights(name))
+
+    async def add_access_rights_async(self, path, name, rights):
+        """Add access rights to a path with an asyncio subprocess."""
+        acl = AccessControlList.from_output(await afs("listacl", path))
+        await afs("setacl", "-dir", path, "-acl", name, rights)
+        registry.add_acl(os.path.abspath(path), name, acl.rights(name))
 
     def access_control_list_matches(self, path, *acls):
         """Fails if an ACL does not match the given ACL."""
@@ -207,6 +238,18 @@ class _ACLKeywords:
         if a1 != a2:
             raise AssertionError("ACLs do not match: path=%s args=%s" % (a1, a2))
 
+    async def access_control_list_matches_async(self, path, *acls):
+        """Fails if an ACL does not match the given ACL.
+
+        The asyncio variant of `Access Control List Matches`.
+        """
+        a1 = await AccessControlList.afrom_path(path)
+        a2 = AccessControlList.from_args(*acls)
+        logger.debug("a1=%s" % a1)
+        logger.debug("a2=%s" % a2)
+        if a1 != a2:
+            raise AssertionError("ACLs do not match: path=%s args=%s" % (a1, a2))
+
     def access_control_list_contains(self, path, name, rights):
         """Fails if an ACL does not contain the given rights."""
         logger.debug(
@@ -0,0 +1,242 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+import re
+import time
+
+from OpenAFSLibrary import logger
+from OpenAFSLibrary.command import vos_lines
+from OpenAFSLibrary.keywords.path import _PathKeywords
+from OpenAFSLibrary.keywords.volume import (
+    _PHASE,
+    _PHASE_IDS,
+    _VolumeKeywords,
+    _check_mount_path,
+    _create_volume,
+    check_volumes,
+    get_volume_entry,
+    get_volume_status,
+    move_volume,
+    release_parent,
+)
+
+_NEW_SITE = re.compile(r"^Creating new volume \d+ on replication site (\S+?):")
+_UPDATE_SITE = re.compile(r"^Updating existing ro volume \d+ on (\S+)")
+_FORWARD = re.compile(r"^Starting ForwardMulti from \d+ to \d+ on (.+?) \((.*)\)")
+
+
+def _parse_sites(sites):
+    """Parse a comma separated list of server:part sites."""
+    if isinstance(sites, str):
+        sites = sites.split(",")
+    parsed = []
+    for site in sites:
+        server, sep, part = site.strip().partition(":")
+        if not server or not part:
+            raise AssertionError("Invalid site '%s'; expected server:part." % site)
+        parsed.append((server, part))
+    if len(parsed) < 2:
+        raise AssertionError("At least two sites are required.")
+    return parsed
+
+
+def release_timings(lines):
+    """Time the phases and the sites of vos release -verbose output.
+
+    Returns a tuple of the phase timings and a dictionary of the seconds
+    spent and the release mode (full or incremental) for each site server.
+    Each line is timed from the line before it. The time up to the end of
+    the forward to a site is counted for that site, and sites forwarded
+    together share the time.
+    """
+    phases = {}
+    sites = {}
+    current = []
+    last = time.monotonic()
+    for line in lines:
+        now = time.monotonic()
+        line = line.strip()
+        if current:
+            for server in current:
+                sites[server]["seconds"] += now - last
+        else:
+            m = _PHASE.match(line)
+            if m:
+                phase = _PHASE_IDS.sub("", m.group(1))
+                phases[phase] = phases.get(phase, 0.0) + now - last
+        last = now
+        m = _NEW_SITE.match(line) or _UPDATE_SITE.match(line)
+        if m:
+            current = [m.group(1)]
+            sites.setdefault(m.group(1), {"seconds": 0.0, "mode": "full"})
+            continue
+        m = _FORWARD.match(line)
+        if m:
+            current = re.split(r",\s*|\s+and\s+", m.group(1))
+            mode = "full" if m.group(2) == "entire volume" else "incremental"
+            for server in current:
+                sites.setdefault(server, {"seconds": 0.0})["mode"] = mode
+            continue
+        if line.startswith("updating VLDB") or line.startswith("Released volume"):
+            current = []
+    return phases, sites
+
+
+def measure_release(name, force=False):
+    """Release a volume with vos release -verbose and time each RO site.
+
+    The size of the RO volume is read with a single vos examine after the
+    release, since each RO site has the same content.
+    """
+    entry = get_volume_entry(name)
+    args = ["release", "-id", name, "-verbose", "-noresolve"]
+    if force:
+        args.append("-force")
+    start = time.monotonic()
+    phases, timings = release_timings(vos_lines(*args))
+    seconds = time.monotonic() - start
+    kbytes = get_volume_status(entry.ro).disk_used if entry.rosites else None
+    sites = []
+    for server, part in entry.rosites:
+        timing = timings.get(server, {"seconds": 0.0, "mode": None})
+        sites.append(
+            {
+                "server": server,
+                "part": part,
+                "mode": timing["mode"],
+                "seconds": timing["seconds"],
+                "kbytes": kbytes,
+            }
+        )
+    return {
+        "volume": name,
+        "force": bool(force),
+        "seconds": seconds,
+        "phases": phases,
+        "sites": sites,
+    }
+
+
+def _rate(amount, seconds):
+    return amount / seconds if seconds > 0 else 0.0
+
+
+class _BenchmarkKeywords:
+    """Volume operation benchmark keywords."""
+
+    def benchmark_volume_move(
+        self,
+        name,
+        path,
+        sites,
+        moves=2,
+        count=1,
+        size=0,
+        depth=0,
+        width=0,
+        fill="zero",
+    ):
+        """Measure the throughput of vos move.
+
+        Create the volume `name` on the first of the `sites` (a comma
+        separated list of server:part pairs), mount it on `path`, and fill
+        it with `Create Files` with the given `count`, `size`, `depth`,
+        `width` and `fill`. The volume is then moved `moves` times, from
+        each site to the next one in turn, and is removed at the end.
+
+        Returns a table with a row for each move. Each row is a dictionary
+        with the move number, the `from` and `to` sites, the `seconds`
+        taken, the `kbytes` and `files` in the volume, the `mb_per_sec`
+        and `files_per_sec` rates, and the `phases` timings from the
+        `vos move -verbose` output.
+        """
+        sites = _parse_sites(sites)
+        path = _check_mount_path(path)
+        server, part = sites[0]
+        _create_volume(name, server, part, path, "0", False, None)
+        release_parent(path)
+        results = []
+        try:
+            _PathKeywords().create_files(path, count, size, depth, width, fill)
+            status = get_volume_status(name)
+            for i in range(int(moves)):
+                source = sites[i % len(sites)]
+                dest = sites[(i + 1) % len(sites)]
+                start = time.monotonic()
+                phases = move_volume(name, *(source + dest))
+                seconds = time.monotonic() - start
+                row = {
+                    "move": i + 1,
+                    "from": "%s:%s" % source,
+                    "to": "%s:%s" % dest,
+                    "seconds": seconds,
+                    "kbytes": status.disk_used,
+                    "files": status.file_count,
+                    "mb_per_sec": _rate(status.disk_used / 1024.0, seconds),
+                    "files_per_sec": _rate(status.file_count, seconds),
+                    "phases": phases,
+                }
+                logger.info(
+                    "move %(move)d %(from)s -> %(to)s: %(seconds).3f seconds, "
+                    "%(mb_per_sec).2f MB/s, %(files_per_sec).1f files/s" % row
+                )
+                results.append(row)
+        finally:
+            _VolumeKeywords().remove_volume(name, path=path)
+        return results
+
+    def release_volume_and_measure(self, name, force=False, compare=False):
+        """Release a volume and measure the time spent on each RO site.
+
+        The volume is released with `vos release -verbose`, and with
+        `-force` when `force` is true. Returns a dictionary with the total
+        `seconds`, the `phases` timings (for example the re-clone and the
+        VLDB update), and a `sites` table. Each site row has the `server`,
+        `part`, release `mode` (full or incremental), `seconds` and the
+        `kbytes` of the released RO volume. The size is read once with
+        `vos examine`, after the release is timed.
+
+        When `compare` is true, the volume is released without and then with
+        `-force`, and a dictionary of the `incremental` and `full` results
+        is returned.
+        """
+        if compare:
+            results = {
+                "incremental": measure_release(name),
+                "full": measure_release(name, force=True),
+            }
+            for site, full in zip(
+                results["incremental"]["sites"], results["full"]["sites"]
+            ):
+                logger.info(
+                    "%s /vicep%s: incremental %.3f seconds, full %.3f seconds"
+                    % (site["server"], site["part"], site["seconds"], full["seconds"])
+                )
+        else:
+            results = measure_release(name, force=force)
+            for site in results["sites"]:
+                logger.info(
+                    "%(server)s /vicep%(part)s: %(mode)s %(seconds).3f seconds, "
+                    "%(kbytes)s kbytes" % site
+                )
+        check_volumes()
+        return results
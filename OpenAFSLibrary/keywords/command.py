@@ -19,8 +19,14 @@
 # OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 #
 
+import socket
+
 from OpenAFSLibrary import logger
-from OpenAFSLibrary.command import run_program
+from OpenAFSLibrary import cassette
+from OpenAFSLibrary import simcell
+from OpenAFSLibrary.command import run_program, run_programs, DEFAULT_MAX_WORKERS
+from OpenAFSLibrary.variable import check_tools, freeze, TOOLS
+from OpenAFSLibrary.querycache import query_cache, DEFAULT_TTL, DEFAULT_SIZE
 
 
 class _CommandKeywords:
@@ -42,3 +48,118 @@ class _CommandKeywords:
         logger.info("Code: %d" % rc)
         if rc == 0:
             raise AssertionError("Command should have failed: %s" % cmd)
+
+    def run_commands_in_parallel(self, *cmds, max_workers=DEFAULT_MAX_WORKERS):
+        """Run commands concurrently and return the list of outputs.
+
+        The commands are run on a pool of at most `max_workers` threads. The
+        outputs are returned in the same order as the given commands. Fails
+        if any command does not exit with a zero status code.
+        """
+        results = run_programs(cmds, max_workers=max_workers)
+        failed = []
+        for cmd, (rc, out, err) in zip(cmds, results):
+            if rc != 0:
+                logger.info("Command failed: %s; code: %d" % (cmd, rc))
+                logger.info("Error: " + err)
+                failed.append(cmd)
+        if failed:
+            raise AssertionError("Commands Failed! %s" % ", ".join(failed))
+        return [out for rc, out, err in results]
+
+    def enable_query_cache(self, ttl=DEFAULT_TTL, size=DEFAULT_SIZE):
+        """Cache the output of read-only vos and fs queries.
+
+        Outputs of queries such as `vos listvldb`, `vos listpart`, `fs examine`
+        and `fs listacl` are reused for `ttl` seconds. At most `size` outputs
+        are kept. Commands which change the cell, such as `vos create`
+        or `fs setacl`, invalidate the cached outputs, including commands
+        run with `Command Should Succeed` or `Run Commands In Parallel`.
+        """
+        query_cache.enable(ttl=ttl, size=size)
+
+    def disable_query_cache(self):
+        """Stop caching the output of read-only vos and fs queries."""
+        query_cache.disable()
+
+    def clear_query_cache(self):
+        """Remove all the cached query outputs."""
+        query_cache.clear()
+
+    def command_paths_should_be_valid(self, *names):
+        """Fails if a command variable does not name an executable command.
+
+        The command variables (`VOS`, `FS`, `BOS`, etc) are resolved to
+        absolute paths. All of the command variables are checked when no
+        names are given.
+        """
+        problems = check_tools(names or TOOLS)
+        for problem in problems:
+            logger.info(problem)
+        if problems:
+            raise AssertionError("Invalid command paths: %s" % "; ".join(problems))
+
+    def freeze_variables(self):
+        """Keep the resolved library variable values for the rest of the run.
+
+        Library variables are normally resolved again after any variable may
+        have changed. Use this keyword once the variables are set to skip
+        the lookups.
+        """
+        freeze(True)
+
+    def unfreeze_variables(self):
+        """Resolve the library variables again after they may have changed."""
+        freeze(False)
+
+    def start_recording_commands(self, path):
+        """Record the result of each command run to a cassette file.
+
+        The arguments, exit code, output and error of each command are
+        written as JSON lines. The file is compressed when `path` ends with
+        `.gz`. See `Start Replaying Commands`.
+        """
+        cassette.start_recording(path)
+
+    def stop_recording_commands(self):
+        """Stop recording commands and close the cassette file."""
+        cassette.stop_recording()
+
+    def start_replaying_commands(self, path):
+        """Serve command results from a cassette file instead of running them.
+
+        Commands are not run while replaying. Results are served in the
+        recorded order for each distinct command, and the last result of a
+        command is repeated. Commands which are not in the cassette fail.
+        """
+        cassette.start_replay(path)
+
+    def stop_replaying_commands(self):
+        """Run commands again after `Start Replaying Commands`."""
+        cassette.stop_replay()
+
+    def start_simulated_cell(
+        self, servers=None, parts="a", latency=0, error_rate=0, cell="example.com"
+    ):
+        """Run the vos, fs, bos, pts and rxdebug commands on a simulated cell.
+
+        The simulated cell keeps the volumes, mount points and ACLs in
+        memory, so the keywords may be run and timed without a real cell.
+        `servers` and `parts` are comma separated lists of the fileserver
+        names and partitions; the default server is this host. Each command
+        is delayed by `latency` seconds and fails at random with the
+        probability `error_rate`.
+        """
+        if not servers:
+            servers = socket.gethostname()
+        simcell.start(
+            cell=cell,
+            servers=servers.split(","),
+            parts=parts.split(","),
+            latency=latency,
+            error_rate=error_rate,
+        )
+
+    def stop_simulated_cell(self):
+        """Run commands on the real cell again after `Start Simulated Cell`."""
+        simcell.stop()
@@ -22,7 +22,7 @@
 import os
 
 from OpenAFSLibrary import logger
-from OpenAFSLibrary.variable import get_var, get_bool
+from OpenAFSLibrary.variable import get_var, get_bool, get_tool
 from OpenAFSLibrary.command import run_program
 
 
@@ -35,21 +35,16 @@ def akimpersonate(user):
     """Acquire an AFS token for authenticated access without Kerberos."""
     if not user:
         raise AssertionError("User name is required")
-    aklog = get_var("AKLOG")
+    aklog = get_tool("AKLOG")
     cell = get_var("AFS_CELL")
     realm = get_var("KRB_REALM")
     keytab = get_var("KRB_AFS_KEYTAB")
     principal = get_principal(user, realm)
-    cmd = "%s -d -c %s -k %s -keytab %s -principal %s" % (
-        aklog,
-        cell,
-        realm,
-        keytab,
-        principal,
-    )
+    cmd = [aklog, "-d", "-c", cell, "-k", realm, "-keytab", keytab]
+    cmd += ["-principal", principal]
     rc, out, err = run_program(cmd)
     if rc:
-        raise AssertionError("aklog failed: '%s'; exit code = %d" % (cmd, rc))
+        raise AssertionError("aklog failed: '%s'; exit code = %d" % (" ".join(cmd), rc))
 
 
 def login_with_password(user, password):
@@ -58,19 +53,16 @@ def login_with_password(user, password):
         raise AssertionError("user is required")
     if not password:
         raise AssertionError("password is required")
-    klog_krb5 = get_var("KLOG_KRB5")
+    klog_krb5 = get_tool("KLOG_KRB5")
     cell = get_var("AFS_CELL")
     realm = get_var("KRB_REALM")
-    cmd = "%s -principal %s -password %s -cell %s -k %s" % (
-        klog_krb5,
-        user,
-        password,
-        cell,
-        realm,
-    )
+    cmd = [klog_krb5, "-principal", user, "-password", password]
+    cmd += ["-cell", cell, "-k", realm]
     rc, out, err = run_program(cmd)
     if rc:
-        raise AssertionError("klog.krb5 failed: '%s'; exit code = %d" % (cmd, rc))
+        raise AssertionError(
+            "klog.krb5 failed: '%s'; exit code = %d" % (" ".join(cmd), rc)
+        )
 
 
 def login_with_keytab(user, keytab):
@@ -79,22 +71,22 @@ def login_with_keytab(user, keytab):
         raise ValueError("User name is required.")
     if not keytab:
         raise ValueError("keytab is required.")
-    kinit = get_var("KINIT")
-    aklog = get_var("AKLOG")
+    kinit = get_tool("KINIT")
+    aklog = get_tool("AKLOG")
     cell = get_var("AFS_CELL")
     realm = get_var("KRB_REALM")
     principal = get_principal(user, realm)
     logger.info("keytab: " + keytab)
     if not os.path.exists(keytab):
         raise AssertionError("Keytab file '%s' is missing." % keytab)
-    cmd = "%s -k -t %s %s" % (kinit, keytab, principal)
+    cmd = [kinit, "-k", "-t", keytab, principal]
     rc, out, err = run_program(cmd)
     if rc:
-        raise AssertionError("kinit failed: '%s'; exit code = %d" % (cmd, rc))
-    cmd = "%s -d -c %s -k %s" % (aklog, cell, realm)
+        raise AssertionError("kinit failed: '%s'; exit code = %d" % (" ".join(cmd), rc))
+    cmd = [aklog, "-d", "-c", cell, "-k", realm]
     rc, out, err = run_program(cmd)
     if rc:
-        raise AssertionError("kinit failed: '%s'; exit code = %d" % (cmd, rc))
+        raise AssertionError("kinit failed: '%s'; exit code = %d" % (" ".join(cmd), rc))
 
 
 class _LoginKeywords:
@@ -113,15 +105,16 @@ class _LoginKeywords:
     def logout(self):
         """Release the AFS token."""
         if not get_bool("AFS_AKIMPERSONATE"):
-            kdestroy = get_var("KDESTROY")
+            kdestroy = get_tool("KDESTROY")
             krb5cc = "/tmp/afsrobot.krb5cc"
-            cmd = "KRB5CCNAME=%s %s" % (krb5cc, kdestroy)
-            rc, out, err = run_program(cmd)
+            env = dict(os.environ, KRB5CCNAME=krb5cc)
+            rc, out, err = run_program([kdestroy], env=env)
             if rc:
                 raise AssertionError(
-                    "kdestroy failed: '%s'; exit code = %d" % (cmd, rc)
+                    "kdestroy failed: 'KRB5CCNAME=%s %s'; exit code = %d"
+                    % (krb5cc, kdestroy, rc)
                 )
-        unlog = get_var("UNLOG")
-        rc, out, err = run_program(unlog)
+        unlog = get_tool("UNLOG")
+        rc, out, err = run_program([unlog])
         if rc:
             raise AssertionError("unlog failed: '%s'; exit code = %d" % (unlog, rc))
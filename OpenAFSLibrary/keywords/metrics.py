@@ -0,0 +1,56 @@
+# Copyright (c) 2025, Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+from OpenAFSLibrary import logger
+from OpenAFSLibrary.metrics import command_metrics
+
+
+class _MetricsKeywords:
+    """Command latency metrics keywords."""
+
+    def get_command_metrics(self):
+        """Returns the command latency stats.
+
+        Returns a list of dictionaries, one for each command tag (for example
+        `vos listvldb`), with the count, total, mean, min, max, p50, p95 and
+        p99 durations in seconds. The slowest total is listed first.
+        """
+        return command_metrics.summary()
+
+    def write_command_metrics(self, path, format="json"):
+        """Write the command latency stats to a file.
+
+        The `format` may be `json` or `csv`.
+        """
+        if format == "json":
+            text = command_metrics.to_json()
+        elif format == "csv":
+            text = command_metrics.to_csv()
+        else:
+            raise ValueError("Invalid metrics format: %s" % format)
+        with open(path, "w") as f:
+            f.write(text)
+        logger.info("Wrote command metrics to %s" % path)
+
+    def reset_command_metrics(self):
+        """Discard the command latency samples collected so far."""
+        command_metrics.reset()
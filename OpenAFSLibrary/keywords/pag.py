@@ -23,7 +23,7 @@ import os
 import subprocess
 
 from OpenAFSLibrary import logger
-from OpenAFSLibrary.variable import get_var, get_bool
+from OpenAFSLibrary.variable import get_bool, get_tool
 
 
 PAG_MIN = 0x41000000
@@ -120,7 +120,7 @@ class _PagKeywords:
 
     def pag_shell(self, script):
         """Run a command in the pagsh and returns the output."""
-        PAGSH = get_var("PAGSH")
+        PAGSH = get_tool("PAGSH")
         logger.info("running %s" % (PAGSH,))
         logger.debug("script=%s" % (script,))
         script = script.encode("ascii")
@@ -0,0 +1,308 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+import itertools
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+from OpenAFSLibrary import logger
+from OpenAFSLibrary.command import fs, vos
+from OpenAFSLibrary.keywords.volume import (
+    _check_mount_path,
+    _create_volume,
+    get_fileservers,
+    get_parts,
+    release_parent,
+)
+from OpenAFSLibrary.registry import registry
+
+RETRY_DELAY = 1.0  # seconds to wait after a failed background create
+
+
+class VolumePool:
+    """Blank volumes created in the background, ready to be checked out.
+
+    A background thread creates volumes until each server has `high`
+    volumes available, and starts again when the number available on a
+    server drops below `low`.
+    """
+
+    def __init__(self, servers, parts, high=4, low=1, prefix="pool", quota="0"):
+        self.servers = list(servers)
+        self.parts = parts  # server -> list of partitions
+        self.high = int(high)
+        self.low = int(low)
+        self.prefix = "%s.%d" % (prefix, os.getpid())
+        self.quota = quota
+        self.errors = 0
+        self.last_error = None
+        self.available = {s: deque() for s in self.servers}
+        self.checked_out = {}  # name -> (vid, server, part, path)
+        self._count = itertools.count(1)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._refill = set(self.servers)
+        self._dump = None
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _needed(self):
+        """Return a server which needs another volume, or None."""
+        for server in self.servers:
+            n = len(self.available[server])
+            if n < self.low:
+                self._refill.add(server)
+            if server in self._refill:
+                if n < self.high:
+                    return server
+                self._refill.discard(server)
+        return None
+
+    def _create(self, server):
+        n = next(self._count)
+        parts = self.parts[server]
+        part = parts[n % len(parts)]
+        name = "%s.%d" % (self.prefix, n)
+        vid = _create_volume(name, server, part, None, self.quota, False, None)
+        return (name, vid, part)
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                server = self._needed()
+                while server is None and not self._stopped:
+                    self._cond.wait()
+                    server = self._needed()
+                if self._stopped:
+                    return
+            try:
+                volume = self._create(server)
+            except Exception as e:
+                logger.info("Failed to create pool volume: %s" % e)
+                self.errors += 1
+                self.last_error = e
+                time.sleep(RETRY_DELAY)
+                continue
+            with self._cond:
+                self.available[server].append(volume)
+                self._cond.notify_all()
+
+    def _last_error(self):
+        if self.last_error is None:
+            return ""
+        return "; %d volume creates failed, last error: %s" % (
+            self.errors,
+            self.last_error,
+        )
+
+    def wait(self, timeout=None):
+        """Wait until the pool is filled.
+
+        Fails on timeout, with the last error of the background creates.
+        """
+        with self._cond:
+            filled = self._cond.wait_for(
+                lambda: self._stopped or self._needed() is None, timeout
+            )
+        if not filled:
+            raise AssertionError(
+                "Volume pool not filled in %s seconds%s" % (timeout, self._last_error())
+            )
+
+    def checkout(self, name=None, path=None, server=None):
+        """Take a volume from the pool, optionally renamed and mounted.
+
+        A volume is created when none is available. Returns the volume id.
+        """
+        if server and server not in self.parts:
+            raise AssertionError(
+                "Server '%s' is not in the volume pool servers: %s"
+                % (server, ", ".join(self.servers))
+            )
+        with self._cond:
+            servers = [server] if server else self.servers
+            server = max(servers, key=lambda s: len(self.available.get(s, ())))
+            volume = None
+            if self.available.get(server):
+                volume = self.available[server].popleft()
+                self._cond.notify_all()
+        if volume is None:
+            logger.info(
+                "Volume pool is empty; creating a volume%s" % self._last_error()
+            )
+            try:
+                volume = self._create(server)
+            except Exception as e:
+                raise AssertionError(
+                    "Failed to create a volume for the empty pool: %s%s"
+                    % (e, self._last_error())
+                ) from e
+        pool_name, vid, part = volume
+        if name and name != pool_name:
+            vos("rename", "-oldname", pool_name, "-newname", name)
+            registry.forget_volume(pool_name)
+            registry.add_volume(name, vid, server, part)
+        name = name or pool_name
+        if path:
+            path = _check_mount_path(path)
+            fs("mkmount", "-dir", path, "-vol", name)
+            registry.add_mount(path)
+            release_parent(path)
+        self.checked_out[name] = (vid, server, part, path)
+        return vid
+
+    def _blank_dump(self, server):
+        """Dump a new pool volume once; returns the dump file name."""
+        if self._dump is None:
+            volume = self._create(server)
+            fd, dump = tempfile.mkstemp(prefix="afsrobot", suffix=".dump")
+            os.close(fd)
+            vos("dump", "-id", volume[1], "-file", dump)
+            self._dump = dump
+            with self._cond:
+                self.available[server].append(volume)
+                self._cond.notify_all()
+        return self._dump
+
+    def give_back(self, name, recycle=True):
+        """Return a checked out volume to the pool, or remove it.
+
+        A recycled volume is cleared by restoring the dump of a blank pool
+        volume over it, which keeps the root directory of the volume.
+        """
+        if name not in self.checked_out:
+            raise AssertionError("Volume '%s' was not checked out." % name)
+        vid, server, part, path = self.checked_out.pop(name)
+        if path:
+            fs("rmmount", "-dir", path)
+            registry.forget_mount(path)
+            release_parent(path)
+        with self._cond:
+            full = len(self.available[server]) >= self.high
+        if not recycle or full or self._stopped:
+            vos("remove", "-id", vid)
+            registry.forget_volume(vid)
+            return
+        vos(
+            "restore",
+            "-server",
+            server,
+            "-partition",
+            part,
+            "-name",
+            name,
+            "-file",
+            self._blank_dump(server),
+            "-overwrite",
+            "full",
+        )
+        pool_name = "%s.%d" % (self.prefix, next(self._count))
+        vos("rename", "-oldname", name, "-newname", pool_name)
+        registry.forget_volume(vid)
+        registry.add_volume(pool_name, vid, server, part)
+        with self._cond:
+            self.available[server].append((pool_name, vid, part))
+            self._cond.notify_all()
+
+    def destroy(self):
+        """Stop the background thread and remove the available volumes."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        for server in self.servers:
+            while self.available[server]:
+                name, vid, part = self.available[server].popleft()
+                vos("remove", "-id", vid)
+                registry.forget_volume(vid)
+        if self._dump is not None:
+            os.remove(self._dump)
+            self._dump = None
+
+
+_pool = None
+
+
+def _get_pool():
+    if _pool is None:
+        raise AssertionError("No volume pool has been created.")
+    return _pool
+
+
+class _PoolKeywords:
+    """Volume pool keywords."""
+
+    def create_volume_pool(
+        self, size=4, low=1, servers=None, parts=None, prefix="pool", quota="0"
+    ):
+        """Create blank volumes in the background for `Checkout Volume`.
+
+        Up to `size` volumes are kept available on each of the `servers`
+        (default `AFS_FILESERVERS`, or this host), spread over the server
+        `parts` (default all partitions). The pool is refilled in the
+        background when fewer than `low` volumes are available on a server.
+        """
+        global _pool
+        if _pool is not None:
+            raise AssertionError("A volume pool already exists.")
+        if isinstance(servers, str):
+            servers = servers.split(",")
+        servers = servers or get_fileservers()
+        if isinstance(parts, str):
+            parts = parts.split(",")
+        partitions = {s: parts or get_parts(s) for s in servers}
+        _pool = VolumePool(servers, partitions, size, low, prefix, quota)
+
+    def wait_for_volume_pool(self, timeout=60):
+        """Wait until the volume pool is filled.
+
+        Fails after `timeout` seconds, with the last error from creating the
+        pool volumes, if any.
+        """
+        _get_pool().wait(float(timeout))
+
+    def checkout_volume(self, name=None, path=None, server=None):
+        """Take a blank volume from the pool.
+
+        The volume is renamed to `name` and mounted on `path` when given.
+        A volume is created when the pool is empty. Returns the volume id.
+        """
+        return _get_pool().checkout(name, path, server)
+
+    def return_volume(self, name, recycle=True):
+        """Give back a volume taken with `Checkout Volume`.
+
+        The volume is unmounted. When `recycle` is true, the volume contents
+        are cleared and the volume is put back in the pool, otherwise the
+        volume is removed.
+        """
+        _get_pool().give_back(name, recycle)
+
+    def destroy_volume_pool(self):
+        """Remove the volumes available in the pool and stop refilling it."""
+        global _pool
+        if _pool is not None:
+            _pool.destroy()
+            _pool = None
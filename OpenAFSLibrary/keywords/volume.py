@@ -19,18 +19,38 @@
 # OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 #
 
+import asyncio
+import contextlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import socket
 import re
 
 from OpenAFSLibrary import logger
-from OpenAFSLibrary.command import vos, fs, NoSuchEntryError
+from OpenAFSLibrary.variable import get_var, VariableMissing, VariableEmpty
+from OpenAFSLibrary.registry import registry, within
+from OpenAFSLibrary.resolver import ServerResolver
+from OpenAFSLibrary.vldb import PartitionVolumeIds, VldbSnapshot, parse_vldb
+from OpenAFSLibrary.volstatus import parse_volume_status
+from OpenAFSLibrary.command import (
+    add_observer,
+    remove_observer,
+    vos,
+    fs,
+    avos,
+    afs,
+    vos_lines,
+    fs_lines,
+    CommandFailed,
+    NoSuchEntryError,
+)
 
 
-def examine_path(path):
+def _parse_examine(lines):
     info = {}
-    out = fs("examine", "-path", path)
-    for line in out.splitlines():
+    for line in lines:
         m = re.match(r"File (\S+) \(([\d\.]+)\) contained in volume (\d+)", line)
         if m:
             info["path"] = m.group(1)
@@ -57,46 +77,153 @@ def examine_path(path):
     return info
 
 
+def examine_path(path):
+    return _parse_examine(fs_lines("examine", "-path", path))
+
+
+async def aexamine_path(path):
+    out = await afs("examine", "-path", path)
+    return _parse_examine(out.splitlines())
+
+
+def _parse_vldb_entry(lines, name_or_id):
+    """Return the first VolumeEntry in the listvldb output."""
+    for entry in parse_vldb(lines):
+        return entry
+    raise NoSuchEntryError(("listvldb", "-name", name_or_id))
+
+
 def get_volume_entry(name_or_id):
-    info = {"locked": False}
-    out = vos("listvldb", "-name", name_or_id, "-quiet", "-noresolve", "-noauth")
-    for line in out.splitlines():
-        m = re.search(r"^(\S+)", line)
-        if m:
-            info["name"] = m.group(1)
-        m = re.search(r"RWrite: (\d+)", line)
-        if m:
-            info["rw"] = m.group(1)
-        m = re.search(r"ROnly: (\d+)", line)
-        if m:
-            info["ro"] = m.group(1)
-        m = re.search(r"Backup: (\d+)", line)
-        if m:
-            info["bk"] = m.group(1)
-        m = re.match(r"\s+server (\S+) partition /vicep(\S+) RW Site", line)
-        if m:
-            info["server"] = m.group(1)
-            info["part"] = m.group(2)
-        m = re.match(r"\s+server (\S+) partition /vicep(\S+) RO Site", line)
-        if m:
-            server = m.group(1)
-            part = m.group(2)
-            if "rosites" not in info:
-                info["rosites"] = []
-            info["rosites"].append((server, part))
-        m = re.match(r"\s*Volume is currently LOCKED", line)
-        if m:
-            info["locked"] = True
-        m = re.match(r"\s*Volume is locked for a (\S+) operation", line)
+    return _parse_vldb_entry(
+        vos_lines("listvldb", "-name", name_or_id, "-quiet", "-noresolve", "-noauth"),
+        name_or_id,
+    )
+
+
+async def aget_volume_entry(name_or_id):
+    out = await avos("listvldb", "-name", name_or_id, "-quiet", "-noresolve", "-noauth")
+    return _parse_vldb_entry(out.splitlines(), name_or_id)
+
+
+DEFAULT_MAX_PER_SERVER = 4
+MAX_LOOKUPS = 32  # Above this, the VLDB is listed once instead of per volume.
+PLACEMENT_TTL = 30
+PLACEMENT_RESERVE = 102400  # 1K blocks reserved for each volume without a quota
+_PARTINFO = re.compile(
+    r"Free space on partition /vicep(\S+): (\d+) K blocks out of total (\d+)"
+)
+_PHASE = re.compile(r"^(.*?)\s*\.\.\.\s*done")
+_PHASE_IDS = re.compile(r"\s+\d+\b")
+
+_snapshot = None
+_partition_volume_ids = PartitionVolumeIds()
+_resolver = ServerResolver()
+
+
+def _read_vldb_snapshot():
+    lines = vos_lines("listvldb", "-quiet", "-noresolve", "-noauth")
+    return VldbSnapshot(parse_vldb(lines))
+
+
+def load_vldb_snapshot():
+    """Index the VLDB entries of the cell from a single vos listvldb."""
+    global _snapshot
+    snapshot = _read_vldb_snapshot()
+    unload_vldb_snapshot()
+    _snapshot = snapshot
+    add_observer(_snapshot)
+    return _snapshot
+
+
+def unload_vldb_snapshot():
+    """Look up the VLDB entries with vos listvldb again."""
+    global _snapshot
+    if _snapshot is not None:
+        remove_observer(_snapshot)
+        _snapshot = None
+
+
+def lookup_volume_entry(name_or_id):
+    """Get the VLDB entry from the snapshot when loaded, otherwise from the VLDB.
+
+    After a vos command may have changed the VLDB, each entry is looked up
+    again with vos listvldb -name and updated in the snapshot.
+    """
+    if _snapshot is None:
+        return get_volume_entry(name_or_id)
+    entry = _snapshot.get(name_or_id)
+    if entry is None or not _snapshot.is_current(entry.name):
+        if not _snapshot.stale:
+            raise NoSuchEntryError(("listvldb", "-name", name_or_id))
+        name = entry.name if entry is not None else str(name_or_id)
+        try:
+            entry = get_volume_entry(name_or_id)
+        except NoSuchEntryError:
+            _snapshot.update(name, None)
+            raise
+        _snapshot.update(name, entry)
+    return entry
+
+
+def get_volume_status(name_or_id):
+    """Get the volume header status with vos examine -format."""
+    lines = vos_lines("examine", "-id", name_or_id, "-format", "-noauth")
+    for status in parse_volume_status(lines):
+        return status
+    raise AssertionError("Volume status not found for '%s'." % name_or_id)
+
+
+def get_partition_status(server, part):
+    """Get the status of each volume on a partition with vos listvol -format."""
+    lines = vos_lines(
+        "listvol", "-server", server, "-partition", part, "-format", "-noauth"
+    )
+    return list(parse_volume_status(lines))
+
+
+def phase_timings(lines):
+    """Return the seconds spent in each phase of vos -verbose output.
+
+    Each "... done" line is timed from the line before it, as the lines
+    are produced. The volume ids are removed from the phase names, and the
+    times of repeated phases are added together.
+    """
+    phases = {}
+    last = time.monotonic()
+    for line in lines:
+        now = time.monotonic()
+        m = _PHASE.match(line.strip())
         if m:
-            info["op"] = m.group(1)
-    return info
+            phase = _PHASE_IDS.sub("", m.group(1))
+            phases[phase] = phases.get(phase, 0.0) + now - last
+        last = now
+    return phases
 
 
-def get_parts(server):
-    """Get the server partitions."""
+def move_volume(name_or_id, from_server, from_part, to_server, to_part):
+    """Move a volume with vos move -verbose; returns the phase timings."""
+    lines = vos_lines(
+        "move",
+        "-id",
+        name_or_id,
+        "-fromserver",
+        from_server,
+        "-frompartition",
+        from_part,
+        "-toserver",
+        to_server,
+        "-topartition",
+        to_part,
+        "-verbose",
+    )
+    phases = phase_timings(lines)
+    registry.move_volume(name_or_id, to_server, to_part)
+    return phases
+
+
+def _parse_parts(lines):
     parts = []
-    for line in vos("listpart", server).splitlines():
+    for line in lines:
         line = line.strip()
         if line.startswith("The partitions"):
             continue
@@ -107,20 +234,408 @@ def get_parts(server):
     return parts
 
 
+def get_parts(server):
+    """Get the server partitions."""
+    return _parse_parts(vos_lines("listpart", server))
+
+
+async def aget_parts(server):
+    """Get the server partitions."""
+    out = await avos("listpart", server)
+    return _parse_parts(out.splitlines())
+
+
+def _volume_on_partition(server, part, vid):
+    """Returns true if the volume id is listed on the server partition.
+
+    The ids listed on each partition are kept for a few seconds, so
+    checking many volumes lists each partition once.
+    """
+
+    def load():
+        lines = vos_lines(
+            "listvol",
+            "-server",
+            server,
+            "-partition",
+            part,
+            "-fast",
+            "-noauth",
+            "-quiet",
+        )
+        return (line.strip() for line in lines)
+
+    return str(vid) in _partition_volume_ids.get(server, part, load)
+
+
+def _parse_partinfo(lines):
+    """Return a dict of partition -> (free, total) 1K blocks."""
+    parts = {}
+    for line in lines:
+        m = _PARTINFO.match(line)
+        if m:
+            parts[m.group(1)] = (int(m.group(2)), int(m.group(3)))
+    return parts
+
+
+class _Placement:
+    """Choose the partitions for new volumes from vos partinfo samples.
+
+    The free space of each server is sampled for `ttl` seconds. Each
+    placement reserves the volume quota (or PLACEMENT_RESERVE blocks for
+    unlimited volumes) of the sampled free space, so volumes are spread
+    over partitions with similar free space.
+    """
+
+    def __init__(self, ttl=PLACEMENT_TTL):
+        self.ttl = ttl
+        self._samples = {}  # server -> (expires, {part: [free, total, placed]})
+        self._lock = threading.Lock()
+
+    def _sample(self, server):
+        sample = self._samples.get(server)
+        if sample is None or time.monotonic() >= sample[0]:
+            parts = _parse_partinfo(vos_lines("partinfo", server, "-noauth"))
+            sample = (
+                time.monotonic() + self.ttl,
+                {p: [free, total, 0] for p, (free, total) in parts.items()},
+            )
+            self._samples[server] = sample
+        return sample[1]
+
+    def choose(self, servers, part=None, quota=0):
+        """Return the (server, part) with the most free space."""
+        with self._lock:
+            candidates = []
+            for server in servers:
+                for p, info in self._sample(server).items():
+                    if part is None or p == part:
+                        candidates.append((-info[0], info[2], server, p, info))
+            if not candidates:
+                raise AssertionError("No partitions found for volume placement.")
+            candidates.sort(key=lambda c: c[:2])
+            free, placed, server, p, info = candidates[0]
+            info[0] -= int(quota) or PLACEMENT_RESERVE
+            info[2] += 1
+            return (server, p)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+_placement = _Placement()
+
+
+def place_volume(server=None, part=None, quota=0):
+    """Resolve 'auto' server and partition arguments to a partition.
+
+    The server defaults to this host and the partition to 'a'. An 'auto'
+    server is chosen from AFS_FILESERVERS, and an 'auto' partition from
+    the partitions of the server, by the most free space.
+    """
+    if server is None or server == "":  # use this host
+        server = socket.gethostname()
+    if part is None or part == "":
+        part = "a"
+    if server != "auto" and part != "auto":
+        return (server, part)
+    servers = get_fileservers() if server == "auto" else [server]
+    return _placement.choose(servers, None if part == "auto" else part, quota)
+
+
+def _parse_created_vid(out):
+    for line in out.splitlines():
+        m = re.match(r"Volume (\d+) created on partition", line)
+        if m:
+            return m.group(1)
+    raise AssertionError("Created volume id not found!")
+
+
+def _check_mount_path(path):
+    path = os.path.abspath(path)
+    if not path.startswith("/afs"):
+        raise AssertionError("Path not in '/afs'.")
+    return path
+
+
+class _VolumeBatch:
+    """Parent volume releases and cache checks deferred until a batch ends."""
+
+    def __init__(self):
+        self.depth = 0
+        self.parents = {}  # parent directory -> None, in insertion order
+        self.checkvolumes = False
+        self.lock = threading.Lock()
+
+
+_batch = _VolumeBatch()
+
+
+def _defer(ppath=None):
+    """Defer a parent release or a cache check; returns false if not batching."""
+    with _batch.lock:
+        if not _batch.depth:
+            return False
+        if ppath:
+            _batch.parents[ppath] = None
+        _batch.checkvolumes = True
+        return True
+
+
+def begin_volume_batch():
+    """Defer the parent volume releases and fs checkvolumes until the batch ends."""
+    with _batch.lock:
+        _batch.depth += 1
+
+
+def end_volume_batch():
+    """Release each parent volume changed in the batch once.
+
+    Batches may be nested; the releases are done when the outermost batch
+    ends. A single fs checkvolumes is run after the releases.
+    """
+    with _batch.lock:
+        if not _batch.depth:
+            raise AssertionError("No volume batch has been started.")
+        _batch.depth -= 1
+        if _batch.depth:
+            return
+        parents = list(_batch.parents)
+        checkvolumes = _batch.checkvolumes
+        _batch.parents.clear()
+        _batch.checkvolumes = False
+    released = set()
+    for ppath in parents:
+        parent = get_volume_entry(examine_path(ppath)["vid"])
+        if parent.ro is not None and parent.name not in released:
+            released.add(parent.name)
+            vos("release", parent.name, "-verbose")
+    if checkvolumes:
+        fs("checkvolumes")
+
+
+@contextlib.contextmanager
+def volume_batch():
+    """Context manager for begin_volume_batch() and end_volume_batch()."""
+    begin_volume_batch()
+    try:
+        yield
+    finally:
+        end_volume_batch()
+
+
+def check_volumes():
+    """Run fs checkvolumes, or defer it to the end of the volume batch."""
+    if not _defer():
+        fs("checkvolumes")
+
+
+async def acheck_volumes():
+    if not _defer():
+        await afs("checkvolumes")
+
+
 def release_parent(path):
     ppath = os.path.dirname(path)
+    if _defer(ppath):
+        return
     info = examine_path(ppath)
     parent = get_volume_entry(info["vid"])
-    if "ro" in parent:
-        vos("release", parent["name"], "-verbose")
+    if parent.ro is not None:
+        vos("release", parent.name, "-verbose")
         fs("checkvolumes")
 
 
+async def arelease_parent(path):
+    ppath = os.path.dirname(path)
+    if _defer(ppath):
+        return
+    info = await aexamine_path(ppath)
+    parent = await aget_volume_entry(info["vid"])
+    if parent.ro is not None:
+        await avos("release", parent.name, "-verbose")
+        await afs("checkvolumes")
+
+
 def _zap_volume(name_or_id, server, part):
+    """Zap the volume; returns false if the volume is not on the partition."""
     try:
         vos("zap", "-id", name_or_id, "-server", server, "-part", part)
+        return True
     except NoSuchEntryError:
         logger.info("No such volume to zap")
+        return False
+
+
+async def _azap_volume(name_or_id, server, part):
+    try:
+        await avos("zap", "-id", name_or_id, "-server", server, "-part", part)
+        return True
+    except NoSuchEntryError:
+        logger.info(
+            "No volume {name_or_id} to zap on server {server} part {part}".format(
+                **locals()
+            )
+        )
+        return False
+
+
+def zap_sweep(name_or_id, servers, part=None, max_per_server=DEFAULT_MAX_PER_SERVER):
+    """Zap a volume from every partition of the servers in parallel.
+
+    At most `max_per_server` zaps are run at the same time on each server.
+    Only the given partition is zapped when `part` is given. Returns the
+    list of (server, part) tuples of the partitions which held the volume.
+    """
+    with ThreadPoolExecutor(max_workers=len(servers)) as executor:
+        if part:
+            parts = [[part]] * len(servers)
+        else:
+            parts = list(executor.map(get_parts, servers))
+    sites = [(s, p) for s, server_parts in zip(servers, parts) for p in server_parts]
+    if not sites:
+        return []
+    limits = {s: threading.Semaphore(int(max_per_server)) for s in servers}
+
+    def zap(site):
+        with limits[site[0]]:
+            return _zap_volume(name_or_id, site[0], site[1])
+
+    workers = min(int(max_per_server) * len(servers), len(sites))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        zapped = list(executor.map(zap, sites))
+    return [site for site, found in zip(sites, zapped) if found]
+
+
+def _create_volume(name, server, part, path, quota, ro, acl):
+    """Create, mount and replicate a volume; returns the volume id."""
+    out = vos(
+        "create",
+        "-server",
+        server,
+        "-partition",
+        part,
+        "-name",
+        name,
+        "-m",
+        quota,
+        "-verbose",
+    )
+    vid = _parse_created_vid(out)
+    registry.add_volume(name, vid, server, part)
+    if path:
+        fs("mkmount", "-dir", path, "-vol", name)
+        registry.add_mount(path)
+        if acl:
+            fs("setacl", "-dir", path, "-acl", *acl.split(","))
+    if ro:
+        vos("addsite", "-server", server, "-partition", part, "-id", name)
+        vos("release", name, "-verbose")
+    return vid
+
+
+def get_fileservers():
+    """Return the AFS_FILESERVERS list, or this host when not set."""
+    try:
+        servers = get_var("AFS_FILESERVERS")
+    except (VariableMissing, VariableEmpty):
+        return [socket.gethostname()]
+    if isinstance(servers, str):
+        servers = servers.split(",")
+    return [s.strip() for s in servers if s.strip()]
+
+
+def _volume_names(names, count):
+    """Expand a name pattern and count into a list of volume names."""
+    if count is None:
+        return list(names)
+    if len(names) != 1:
+        raise AssertionError("A single name pattern is required with a count.")
+    pattern = names[0]
+    if "{" not in pattern:
+        pattern += ".{}"
+    return [pattern.format(i) for i in range(1, int(count) + 1)]
+
+
+def _created_volume_entry(name, vid, snapshot):
+    """Return the VLDB entry of a registered volume, or None if removed."""
+    if snapshot is not None:
+        return snapshot.get(vid) or snapshot.get(name)
+    for name_or_id in (vid, name):
+        try:
+            return get_volume_entry(name_or_id)
+        except NoSuchEntryError:
+            pass
+    return None
+
+
+def _remove_created_volume(name, vid, server, part, snapshot=None):
+    """Remove a registered volume and its read-only clones, or zap it.
+
+    The VLDB entry is looked up with vos listvldb -name, unless a snapshot
+    is given.
+    """
+    entry = _created_volume_entry(name, vid, snapshot)
+    if entry is None:
+        # The VLDB entry was removed; zap the volume left on the partition.
+        _zap_volume(vid, server, part)
+        return
+    for s, p in entry.rosites:
+        vos("remove", "-server", s, "-part", p, "-id", entry.ro)
+    vos("remove", "-id", entry.rw)
+
+
+def remove_created_resources(max_per_server=DEFAULT_MAX_PER_SERVER):
+    """Remove the registered ACL entries, mount points and volumes.
+
+    ACL entries outside of the registered mount points are restored to
+    their previous rights first (entries which were created are removed),
+    then the mount points, then the volumes. The volumes are removed
+    concurrently with at most `max_per_server` removes per server. Each
+    VLDB entry is looked up by the remove, or with a single vos listvldb
+    of the cell for more than MAX_LOOKUPS volumes. The parent volumes are
+    released once and fs checkvolumes is run once at the end. Returns the
+    list of failures.
+    """
+    failures = []
+    mounts = list(registry.mounts)
+    with volume_batch():
+        for (path, name), previous in list(registry.acls.items()):
+            if any(within(path, m) for m in mounts):
+                continue
+            try:
+                fs("setacl", "-dir", path, "-acl", name, previous or "none")
+            except CommandFailed as e:
+                failures.append(str(e))
+        for path in reversed(mounts):
+            try:
+                fs("rmmount", "-dir", path)
+                release_parent(path)
+            except CommandFailed as e:
+                failures.append(str(e))
+        volumes = list(registry.volumes.items())
+        if volumes:
+            snapshot = None
+            if len(volumes) > MAX_LOOKUPS:
+                snapshot = _read_vldb_snapshot()
+            servers = {server for name, (vid, server, part) in volumes}
+            limits = {s: threading.Semaphore(int(max_per_server)) for s in servers}
+
+            def remove(item):
+                name, (vid, server, part) = item
+                with limits[server]:
+                    try:
+                        _remove_created_volume(name, vid, server, part, snapshot)
+                    except CommandFailed as e:
+                        return str(e)
+
+            workers = int(max_per_server) * len(servers)
+            with ThreadPoolExecutor(max_workers=min(workers, len(volumes))) as executor:
+                failures.extend(f for f in executor.map(remove, volumes) if f)
+            check_volumes()
+    registry.clear()
+    return failures
 
 
 class _VolumeKeywords:
@@ -142,42 +657,17 @@ class _VolumeKeywords:
         Create a volume and optionally mount the volume. Also optionally create
         a read-only clone of the volume and release the new new volume. Release the
         parent volume if it is replicated.
+
+        Set `server` and/or `part` to `auto` to place the volume on the
+        partition with the most free space, sampled with `vos partinfo` from
+        the `AFS_FILESERVERS` servers, or the given server.
         """
-        vid = None
         if not name:
             raise AssertionError("volume name is required!")
-        if server is None or server == "":  # use this host
-            server = socket.gethostname()
+        server, part = place_volume(server, part, quota)
         if path:
-            path = os.path.abspath(path)
-            if not path.startswith("/afs"):
-                raise AssertionError("Path not in '/afs'.")
-        out = vos(
-            "create",
-            "-server",
-            server,
-            "-partition",
-            part,
-            "-name",
-            name,
-            "-m",
-            quota,
-            "-verbose",
-        )
-        for line in out.splitlines():
-            m = re.match(r"Volume (\d+) created on partition", line)
-            if m:
-                vid = m.group(1)
-                break
-        if vid is None:
-            raise AssertionError("Created volume id not found!")
-        if path:
-            fs("mkmount", "-dir", path, "-vol", name)
-            if acl:
-                fs("setacl", "-dir", path, "-acl", *acl.split(","))
-        if ro:
-            vos("addsite", "-server", server, "-partition", part, "-id", name)
-            vos("release", name, "-verbose")
+            path = _check_mount_path(path)
+        vid = _create_volume(name, server, part, path, quota, ro, acl)
         if path:
             release_parent(path)
         if orphan:
@@ -185,16 +675,128 @@ class _VolumeKeywords:
             vos("delent", "-id", vid)
         return vid
 
+    def create_volumes(
+        self,
+        *names,
+        count=None,
+        servers=None,
+        parts=None,
+        path=None,
+        quota="0",
+        ro=False,
+        acl=None,
+        max_per_server=DEFAULT_MAX_PER_SERVER,
+    ):
+        """Create many volumes concurrently.
+
+        Create the given volumes, or `count` volumes named with a single
+        pattern, for example `test.{:04d}`; `.{}` is appended to a pattern
+        without a field. Numbering starts at 1.
+
+        The volumes are spread round-robin over the `servers` (default
+        `AFS_FILESERVERS`, or this host) and their `parts` (default all of
+        the partitions of each server). At most `max_per_server` volumes are
+        created at the same time on each server. When a `path` is given,
+        each volume is mounted in that directory by name and the parent
+        volume is released once at the end. Returns the list of volume ids,
+        in the order of the names.
+        """
+        names = _volume_names(names, count)
+        if not names:
+            return []
+        if isinstance(servers, str):
+            servers = servers.split(",")
+        servers = servers or get_fileservers()
+        if isinstance(parts, str):
+            parts = parts.split(",")
+        if path:
+            path = _check_mount_path(path)
+        with ThreadPoolExecutor(max_workers=len(servers)) as executor:
+            if parts:
+                partitions = {s: parts for s in servers}
+            else:
+                partitions = dict(zip(servers, executor.map(get_parts, servers)))
+        for server, server_parts in partitions.items():
+            if not server_parts:
+                raise AssertionError("No partitions found on server %s" % server)
+        limits = {s: threading.Semaphore(int(max_per_server)) for s in servers}
+
+        def create(i):
+            name = names[i]
+            server = servers[i % len(servers)]
+            server_parts = partitions[server]
+            part = server_parts[(i // len(servers)) % len(server_parts)]
+            mount = os.path.join(path, name) if path else None
+            with limits[server]:
+                return _create_volume(name, server, part, mount, quota, ro, acl)
+
+        workers = int(max_per_server) * len(servers)
+        with ThreadPoolExecutor(max_workers=min(workers, len(names))) as executor:
+            vids = list(executor.map(create, range(len(names))))
+        if path:
+            release_parent(os.path.join(path, names[0]))
+        return vids
+
+    def remove_all_created_resources(self, max_per_server=DEFAULT_MAX_PER_SERVER):
+        """Remove the volumes, mount points and ACL entries created by the keywords.
+
+        The resources created with `Create Volume`, `Create Volumes`,
+        `Mount Volume` and `Add Access Rights`, and not removed since, are
+        removed. ACL entries changed by `Add Access Rights` are restored to
+        their previous rights. Mount points are removed before volumes.
+        Volumes are removed in parallel, with at most `max_per_server`
+        removes per fileserver, and are zapped when the VLDB entry is gone.
+        The parent volumes are released once and a single `fs checkvolumes`
+        is run. Fails after trying to remove all of the resources if any
+        could not be removed.
+        """
+        failures = remove_created_resources(max_per_server)
+        for failure in failures:
+            logger.info(failure)
+        if failures:
+            raise AssertionError(
+                "Failed to remove %d created resources." % len(failures)
+            )
+
+    def begin_volume_batch(self):
+        """Defer the parent volume releases until `End Volume Batch`.
+
+        Creating or removing a volume mounted in a replicated volume normally
+        releases that parent volume each time. Within a batch, the changed
+        parent volumes are collected and each one is released once when the
+        batch ends, followed by a single `fs checkvolumes`.
+        """
+        begin_volume_batch()
+
+    def end_volume_batch(self):
+        """Release the parent volumes changed since `Begin Volume Batch`."""
+        end_volume_batch()
+
     def remove_volume(
-        self, name_or_id, path=None, flush=False, server=None, part=None, zap=False
+        self,
+        name_or_id,
+        path=None,
+        flush=False,
+        server=None,
+        part=None,
+        zap=False,
+        max_per_server=DEFAULT_MAX_PER_SERVER,
     ):
         """Remove a volume.
 
         Remove the volume and any clones. Optionally remove the given mount point.
+
+        When the volume has no VLDB entry and `zap` is true, the volume is
+        zapped from the partition `part`, or from all of the partitions, of
+        the `server` (a comma separated list, default this host). The
+        partitions are zapped in parallel, at most `max_per_server` at a
+        time on each server. Returns the list of (server, part) tuples of
+        the partitions which held the volume.
         """
         if name_or_id == "0":
             logger.info("Skipping remove for volume id 0")
             return
+        registry.forget_volume(name_or_id)
         volume = None
         if path and os.path.exists(path):
             path = os.path.abspath(path)
@@ -203,14 +805,15 @@ class _VolumeKeywords:
             if flush:
                 fs("flush", path)
             fs("rmmount", "-dir", path)
+            registry.forget_mount(path)
             release_parent(path)
         try:
             volume = get_volume_entry(name_or_id)
         except NoSuchEntryError:
             logger.info("No vldb entry found for volume '%s'" % name_or_id)
         if volume:
-            if "rosites" in volume:
-                for server, part in volume["rosites"]:
+            if volume.rosites:
+                for server, part in volume.rosites:
                     vos(
                         "remove",
                         "-server",
@@ -221,42 +824,157 @@ class _VolumeKeywords:
                         "%s.readonly" % name_or_id,
                     )
             vos("remove", "-id", name_or_id)
-            fs("checkvolumes")
+            check_volumes()
+        elif zap:
+            servers = server.split(",") if server else [socket.gethostname()]
+            zapped = zap_sweep(name_or_id, servers, part, max_per_server)
+            logger.info("Zapped volume %s from %s" % (name_or_id, zapped))
+            return zapped
+
+    async def create_volume_async(
+        self,
+        name,
+        server=None,
+        part="a",
+        path=None,
+        quota="0",
+        ro=False,
+        acl=None,
+        orphan=False,
+    ):
+        """Create and mount a volume with asyncio subprocesses.
+
+        The asyncio variant of `Create Volume`.
+        """
+        if not name:
+            raise AssertionError("volume name is required!")
+        if "auto" in (server, part):
+            server, part = await asyncio.to_thread(place_volume, server, part, quota)
+        else:
+            server, part = place_volume(server, part, quota)
+        if path:
+            path = _check_mount_path(path)
+        out = await avos(
+            "create",
+            "-server",
+            server,
+            "-partition",
+            part,
+            "-name",
+            name,
+            "-m",
+            quota,
+            "-verbose",
+        )
+        vid = _parse_created_vid(out)
+        registry.add_volume(name, vid, server, part)
+        if path:
+            await afs("mkmount", "-dir", path, "-vol", name)
+            registry.add_mount(path)
+            if acl:
+                await afs("setacl", "-dir", path, "-acl", *acl.split(","))
+        if ro:
+            await avos("addsite", "-server", server, "-partition", part, "-id", name)
+            await avos("release", name, "-verbose")
+        if path:
+            await arelease_parent(path)
+        if orphan:
+            # Intentionally remove the vldb entry for testing!
+            await avos("delent", "-id", vid)
+        return vid
+
+    async def remove_volume_async(
+        self,
+        name_or_id,
+        path=None,
+        flush=False,
+        server=None,
+        part=None,
+        zap=False,
+        max_per_server=DEFAULT_MAX_PER_SERVER,
+    ):
+        """Remove a volume with asyncio subprocesses.
+
+        The asyncio variant of `Remove Volume`. The read-only sites and the
+        partitions to be zapped are removed concurrently.
+        """
+        if name_or_id == "0":
+            logger.info("Skipping remove for volume id 0")
+            return
+        registry.forget_volume(name_or_id)
+        volume = None
+        if path and os.path.exists(path):
+            path = os.path.abspath(path)
+            if not path.startswith("/afs"):
+                raise AssertionError("Path not in '/afs': %s" % (path))
+            if flush:
+                await afs("flush", path)
+            await afs("rmmount", "-dir", path)
+            registry.forget_mount(path)
+            await arelease_parent(path)
+        try:
+            volume = await aget_volume_entry(name_or_id)
+        except NoSuchEntryError:
+            logger.info("No vldb entry found for volume '%s'" % name_or_id)
+        if volume:
+            readonly = "%s.readonly" % name_or_id
+            await asyncio.gather(
+                *[
+                    avos("remove", "-server", s, "-part", p, "-id", readonly)
+                    for s, p in volume.rosites
+                ]
+            )
+            await avos("remove", "-id", name_or_id)
+            await acheck_volumes()
         elif zap:
-            if not server:
-                server = socket.gethostname()
+            servers = server.split(",") if server else [socket.gethostname()]
             if part:
-                try:
-                    vos("zap", "-id", name_or_id, "-server", server, "-part", part)
-                except NoSuchEntryError:
-                    logger.info(
-                        "No volume {name_or_id} to zap on server {server} part {part}".format(
-                            **locals()
-                        )
-                    )
+                parts = [[part]] * len(servers)
             else:
-                for part in get_parts(server):
-                    try:
-                        vos("zap", "-id", name_or_id, "-server", server, "-part", part)
-                    except NoSuchEntryError:
-                        logger.info(
-                            "No volume {name_or_id} to zap on server {server} part {part}".format(
-                                **locals()
-                            )
-                        )
+                parts = await asyncio.gather(*[aget_parts(s) for s in servers])
+            sites = [(s, p) for s, sp in zip(servers, parts) for p in sp]
+            limits = {s: asyncio.Semaphore(int(max_per_server)) for s in servers}
+
+            async def zap(s, p):
+                async with limits[s]:
+                    return await _azap_volume(name_or_id, s, p)
+
+            found = await asyncio.gather(*[zap(s, p) for s, p in sites])
+            return [site for site, f in zip(sites, found) if f]
 
     def mount_volume(self, path, vol, *options):
         """
         Mount a volume on a path.
         """
         fs("mkmount", "-dir", path, "-vol", vol, *options)
+        registry.add_mount(os.path.abspath(path))
+
+    def move_volume(self, name_or_id, from_server, from_part, to_server, to_part):
+        """
+        Move the volume to another server or partition.
+
+        Returns a dictionary of the seconds spent in each phase of the move,
+        taken from the `vos move -verbose` output.
+        """
+        phases = move_volume(name_or_id, from_server, from_part, to_server, to_part)
+        for phase, seconds in phases.items():
+            logger.info("%s: %.3f seconds" % (phase, seconds))
+        check_volumes()
+        return phases
 
     def release_volume(self, name):
         """
         Release the volume.
         """
         vos("release", "-id", name, "-verbose")
-        fs("checkvolumes")
+        check_volumes()
+
+    async def release_volume_async(self, name):
+        """
+        Release the volume with asyncio subprocesses.
+        """
+        await avos("release", "-id", name, "-verbose")
+        await acheck_volumes()
 
     def volume_should_exist(self, name_or_id):
         """
@@ -265,25 +983,12 @@ class _VolumeKeywords:
         Fails if the volume entry is not found in the VLDB or the volume is
         not present on the fileserver indicated by the VLDB.
         """
-        volume = get_volume_entry(name_or_id)
-        out = vos(
-            "listvol",
-            "-server",
-            volume["server"],
-            "-partition",
-            volume["part"],
-            "-fast",
-            "-noauth",
-            "-quiet",
-        )
-        for line in out.splitlines():
-            vid = line.strip()
-            if vid:
-                if volume["rw"] == vid:
-                    return
+        volume = lookup_volume_entry(name_or_id)
+        if _volume_on_partition(volume.server, volume.part, volume.rw):
+            return
         raise AssertionError(
             "Volume id %s is not present on server '%s', partition '%s'"
-            % (volume["rw"], volume["server"], volume["part"])
+            % (volume.rw, volume.server, volume.part)
         )
 
     def volume_should_not_exist(self, name_or_id):
@@ -291,7 +996,7 @@ class _VolumeKeywords:
         Fails if volume exists.
         """
         try:
-            volume = get_volume_entry(name_or_id)
+            volume = lookup_volume_entry(name_or_id)
         except Exception:
             volume = None
         if volume:
@@ -300,71 +1005,118 @@ class _VolumeKeywords:
     def volume_location_matches(self, name_or_id, server, part, vtype="rw"):
         """
         Fails if volume is not located on the given server and partition.
+
+        The server matches on any of the addresses registered for the
+        fileserver. Host names and fileserver addresses are cached, so
+        repeated checks do not query DNS.
         """
-        address = socket.gethostbyname(server)
+        addresses = _resolver.addresses(server)
         if vtype not in ("rw", "ro", "bk"):
             raise AssertionError("Volume type must be one of 'rw', 'ro', or 'bk'.")
-        volume = get_volume_entry(name_or_id)
+        volume = lookup_volume_entry(name_or_id)
         logger.info("volume: %s" % (volume))
-        if vtype not in volume:
+        if volume.id(vtype) is None:
             raise AssertionError(
                 "Volume type '%s' not found in VLDB for volume '%s'"
                 % (vtype, name_or_id)
             )
         if vtype == "ro":
             found = False
-            for s, p in volume["rosites"]:
-                if s == address and p == part:
+            for s, p in volume.rosites:
+                if s in addresses and p == part:
                     found = True
             if not found:
                 raise AssertionError(
                     "Volume entry does not contain ro site! %s:%s" % (server, part)
                 )
         else:
-            if volume["server"] != address or volume["part"] != part:
+            if volume.server not in addresses or volume.part != part:
                 raise AssertionError(
                     "Volume entry location does not match! expected %s:%s, found %s:%s"
-                    % (address, part, volume["server"], volume["part"])
+                    % (server, part, volume.server, volume.part)
                 )
-        out = vos(
-            "listvol",
-            "-server",
-            volume["server"],
-            "-partition",
-            volume["part"],
-            "-fast",
-            "-noauth",
-            "-quiet",
-        )
-        for line in out.splitlines():
-            vid = line.strip()
-            if vid:
-                if volume[vtype] == vid:
-                    return
+        if _volume_on_partition(volume.server, volume.part, volume.id(vtype)):
+            return
         raise AssertionError(
             "Volume id %s is not present on server '%s', partition '%s'"
-            % (volume["rw"], volume["server"], volume["part"])
+            % (volume.rw, volume.server, volume.part)
         )
 
     def volume_should_be_locked(self, name):
         """
         Fails if the volume is not locked.
         """
-        volume = get_volume_entry(name)
-        if not volume["locked"]:
+        volume = lookup_volume_entry(name)
+        if not volume.locked:
             raise AssertionError("Volume '%s' is not locked." % (name))
 
     def volume_should_be_unlocked(self, name):
         """
         Fails if the volume is locked.
         """
-        volume = get_volume_entry(name)
-        if volume["locked"]:
+        volume = lookup_volume_entry(name)
+        if volume.locked:
             raise AssertionError("Volume '%s' is locked." % (name))
 
+    def get_volume_status(self, name_or_id=None, server=None, part=None):
+        """
+        Get the volume header status from the fileserver.
+
+        Returns the status of the volume `name_or_id`, or a list of the
+        status of each volume on the `server` partition `part`. The status
+        has the fields `name`, `id`, `server`, `part`, `status`, `type`,
+        `in_use`, `needs_salvaged`, `destroy_me`, `parent_id`, `backup_id`,
+        `clone_id`, `creation_date`, `access_date`, `update_date`,
+        `backup_date`, `copy_date`, `flags`, `disk_used`, `max_quota`,
+        `min_quota`, `file_count`, `day_use` and `week_use`. For example,
+        `${status.disk_used}`.
+        """
+        if name_or_id:
+            return get_volume_status(name_or_id)
+        if not server or not part:
+            raise AssertionError("A volume, or a server and partition, is required.")
+        return get_partition_status(server, part)
+
     def get_volume_id(self, name):
         """
         Lookup the volume numeric id.
         """
-        volume = get_volume_entry(name)
-        return volume["rw"]
+        volume = lookup_volume_entry(name)
+        return str(volume.rw)
+
+    def load_vldb_snapshot(self):
+        """
+        Index the VLDB entries of the cell with a single `vos listvldb`.
+
+        `Volume Should Exist`, `Volume Should Not Exist`, `Volume Location
+        Matches`, `Get Volume Id` and the volume lock checks look up the
+        entries in the snapshot instead of running `vos listvldb` for each
+        volume. After a vos command which may change the VLDB, the entries
+        are looked up again one at a time, with `vos listvldb -name`, until
+        `Refresh VLDB Snapshot` loads the whole VLDB again. Returns the
+        number of entries.
+        """
+        return len(load_vldb_snapshot())
+
+    def refresh_vldb_snapshot(self):
+        """
+        Load the VLDB snapshot again.
+        """
+        return len(load_vldb_snapshot())
+
+    def unload_vldb_snapshot(self):
+        """
+        Discard the VLDB snapshot.
+        """
+        unload_vldb_snapshot()
+
+    def get_volume_names_with_prefix(self, prefix):
+        """
+        Return the sorted names of the volumes which start with the prefix.
+
+        The VLDB snapshot is loaded if needed.
+        """
+        snapshot = _snapshot
+        if snapshot is None or snapshot.stale:
+            snapshot = load_vldb_snapshot()
+        return [entry.name for entry in snapshot.with_prefix(prefix)]
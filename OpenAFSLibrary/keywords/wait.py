@@ -0,0 +1,223 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+import random
+import time
+
+from OpenAFSLibrary import logger
+from OpenAFSLibrary.command import (
+    CommandFailed,
+    NoSuchEntryError,
+    ProgramStream,
+    run_programs,
+)
+from OpenAFSLibrary.keywords.volume import MAX_LOOKUPS
+from OpenAFSLibrary.metrics import command_metrics
+from OpenAFSLibrary.variable import get_tool
+from OpenAFSLibrary.vldb import VldbSnapshot, parse_vldb
+from OpenAFSLibrary.volstatus import parse_volume_status
+
+DEFAULT_TIMEOUT = 60
+INITIAL_DELAY = 0.1
+MAX_DELAY = 5.0
+
+
+def wait_for(names, pending, timeout, what, tag):
+    """Poll until no names are pending, with exponential backoff and jitter.
+
+    `pending(names)` is called once per round and returns the names which
+    have not settled. The time each name took to settle is recorded in the
+    command metrics with the given tag. Fails when the names have not
+    settled within `timeout` seconds.
+    """
+    start = time.monotonic()
+    deadline = start + float(timeout)
+    delay = INITIAL_DELAY
+    names = list(names)
+    while True:
+        waiting = set(pending(names))
+        now = time.monotonic()
+        for name in names:
+            if name not in waiting:
+                command_metrics.record(tag, now - start)
+        names = [n for n in names if n in waiting]
+        if not names:
+            logger.info("Settled in %.3f seconds" % (now - start))
+            return
+        if now >= deadline:
+            raise AssertionError(
+                "Timed out after %s seconds waiting for %s: %s"
+                % (timeout, what, ", ".join(names))
+            )
+        time.sleep(min(deadline - now, delay * random.uniform(0.5, 1.0)))
+        delay = min(delay * 2, MAX_DELAY)
+
+
+def _run(commands):
+    """Run vos commands concurrently; returns the (code, output, error) tuples.
+
+    The commands are not run through the query cache, so each round of a
+    wait sees the current state. Fails at once for a missing VLDB entry.
+    """
+    vos = get_tool("VOS")
+    commands = [[vos] + args for args in commands]
+    results = run_programs(commands)
+    for args, (code, output, error) in zip(commands, results):
+        if code != 0 and "no such entry" in error:
+            raise NoSuchEntryError(args[1:])
+    return results
+
+
+def _entries(names):
+    """Look up the VLDB entries of the names.
+
+    The entries are looked up with concurrent vos listvldb -name commands,
+    or with a single vos listvldb of the cell for more than MAX_LOOKUPS
+    names.
+    """
+    if len(names) > MAX_LOOKUPS:
+        args = [get_tool("VOS"), "listvldb", "-quiet", "-noresolve", "-noauth"]
+        with ProgramStream(args) as stream:
+            snapshot = VldbSnapshot(parse_vldb(stream))
+        if stream.returncode != 0:
+            raise CommandFailed("vos", args[1:], stream.error)
+        entries = {}
+        for name in names:
+            entries[name] = snapshot.get(name)
+            if entries[name] is None:
+                raise NoSuchEntryError(["listvldb", "-name", name])
+        return entries
+    commands = [
+        ["listvldb", "-name", name, "-quiet", "-noresolve", "-noauth"] for name in names
+    ]
+    entries = {}
+    for name, (code, output, error) in zip(names, _run(commands)):
+        if code != 0:
+            raise CommandFailed("vos", ["listvldb", "-name", name], error)
+        entries[name] = next(parse_vldb(output.splitlines()))
+    return entries
+
+
+def _examine(names, readonly=False):
+    """Examine the volumes with concurrent vos examine -format commands.
+
+    Returns the (status, entry) of each name. The status is None when the
+    volume header could not be read, for example while the volume is busy.
+    The entry is the VLDB entry shown by vos examine.
+    """
+    suffix = ".readonly" if readonly else ""
+    commands = [
+        ["examine", "-id", name + suffix, "-format", "-noresolve", "-noauth"]
+        for name in names
+    ]
+    examined = {}
+    for name, (code, output, error) in zip(names, _run(commands)):
+        lines = output.splitlines()
+        status = next(iter(parse_volume_status(lines)), None)
+        if "END_OF_ENTRY" in lines:
+            del lines[: lines.index("END_OF_ENTRY") + 1]
+        lines.insert(0, name)  # vos examine does not repeat the name.
+        entry = None
+        for entry in parse_vldb(lines):
+            pass
+        examined[name] = (status, entry)
+    return examined
+
+
+def _locked(names):
+    entries = _entries(names)
+    return [n for n in names if entries[n].locked]
+
+
+def _released(rw_status, entry, ro_status):
+    """Returns true if the RO sites are released from the RW volume.
+
+    The VLDB flags each RO site which missed a release. vos examine reads
+    the header of a single RO site, so only that site's update time is
+    compared with the RW volume.
+    """
+    if entry is None or entry.locked or entry.unreleased:
+        return False
+    if rw_status is None or ro_status is None:
+        return False
+    return ro_status.update_date >= rw_status.update_date
+
+
+def _not_released(names):
+    rw = _examine(names)
+    for name in names:
+        entry = rw[name][1]
+        if entry is not None and not entry.rosites:
+            raise AssertionError("Volume '%s' has no read-only sites." % name)
+    ro = _examine(names, readonly=True)
+    return [n for n in names if not _released(rw[n][0], rw[n][1], ro[n][0])]
+
+
+def _offline(names):
+    examined = _examine(names)
+    waiting = []
+    for name in names:
+        status = examined[name][0]
+        if status is None or status.status != "OK" or not status.in_use:
+            waiting.append(name)
+    return waiting
+
+
+class _WaitKeywords:
+    """Keywords to wait for volume state changes."""
+
+    def wait_for_volume_unlocked(self, *names, timeout=DEFAULT_TIMEOUT):
+        """Wait until the VLDB entries of the volumes are unlocked.
+
+        The VLDB is polled with exponential backoff and jitter. Each round
+        looks up the volumes with concurrent `vos listvldb -name` commands,
+        or with a single `vos listvldb` for more than 32 volumes. Fails at
+        once for a volume without a VLDB entry, and when the volumes are
+        still locked after `timeout` seconds. The time each volume took to
+        settle is recorded in the command metrics as `wait unlocked`.
+        """
+        wait_for(names, _locked, timeout, "volume unlocked", "wait unlocked")
+
+    def wait_for_release_complete(self, *names, timeout=DEFAULT_TIMEOUT):
+        """Wait until the read-only sites of the volumes are released.
+
+        A release is complete when the VLDB entry is unlocked, no read-only
+        site is flagged by an unfinished release, and the read-only volume
+        has the update time of the read-write volume. Each round examines
+        the read-write and read-only volumes with concurrent
+        `vos examine -format` commands. The settle times are recorded as
+        `wait release`.
+
+        `vos examine` reads the read-only volume header of one site only.
+        The other sites are checked only by their release flags in the
+        VLDB. The update times of those sites are not compared, to avoid a
+        `vos listvol` of each read-only partition in every round.
+        """
+        wait_for(names, _not_released, timeout, "release complete", "wait release")
+
+    def wait_for_volume_online(self, *names, timeout=DEFAULT_TIMEOUT):
+        """Wait until the read-write volumes are online on their fileservers.
+
+        Each round examines the volumes with concurrent `vos examine -format`
+        commands. The settle times are recorded as `wait online`.
+        """
+        wait_for(names, _offline, timeout, "volume online", "wait online")
@@ -0,0 +1,106 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+"""Command latency metrics."""
+
+import csv
+import io
+import json
+import math
+import os
+import threading
+
+FIELDS = ("tag", "count", "total", "mean", "min", "max", "p50", "p95", "p99")
+
+
+def command_tag(args):
+    """Return the metrics tag for a command, for example 'vos listvldb'."""
+    if isinstance(args, str):
+        args = args.split()
+    if not args:
+        return ""
+    tag = os.path.basename(str(args[0]))
+    if len(args) > 1 and not str(args[1]).startswith("-"):
+        tag = "%s %s" % (tag, args[1])
+    return tag
+
+
+def percentile(samples, p):
+    """Return the nearest-rank percentile of the sorted samples."""
+    if not samples:
+        return 0.0
+    rank = max(1, int(math.ceil(p / 100.0 * len(samples))))
+    return samples[rank - 1]
+
+
+class CommandMetrics:
+    """Collect the durations of commands by tag."""
+
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, tag, seconds):
+        """Add a duration sample for the tag."""
+        with self._lock:
+            self._samples.setdefault(tag, []).append(seconds)
+
+    def reset(self):
+        """Remove all the samples."""
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """Return a list of stats for each tag, slowest total first."""
+        with self._lock:
+            samples = {tag: sorted(s) for tag, s in self._samples.items()}
+        stats = []
+        for tag, s in samples.items():
+            total = sum(s)
+            stats.append(
+                {
+                    "tag": tag,
+                    "count": len(s),
+                    "total": total,
+                    "mean": total / len(s),
+                    "min": s[0],
+                    "max": s[-1],
+                    "p50": percentile(s, 50),
+                    "p95": percentile(s, 95),
+                    "p99": percentile(s, 99),
+                }
+            )
+        stats.sort(key=lambda x: x["total"], reverse=True)
+        return stats
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_csv(self):
+        f = io.StringIO()
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for row in self.summary():
+            writer.writerow(row)
+        return f.getvalue()
+
+
+command_metrics = CommandMetrics()
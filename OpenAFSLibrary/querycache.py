@@ -0,0 +1,119 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+"""Cache for the output of read-only AFS queries."""
+
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 30
+DEFAULT_SIZE = 1024
+
+
+class QueryCache:
+    """LRU cache of command outputs with a time-to-live.
+
+    The cache is keyed by a tuple of the tool name and the command
+    arguments. The cache is disabled until enable() is called.
+
+    The generation is incremented by each invalidation. A query which ran
+    while an invalidation happened may have read the old state, so its
+    output is not put in the cache.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.ttl = DEFAULT_TTL
+        self.size = DEFAULT_SIZE
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enable(self, ttl=DEFAULT_TTL, size=DEFAULT_SIZE):
+        """Enable the cache with the given ttl (seconds) and size limit."""
+        with self._lock:
+            self.ttl = float(ttl)
+            self.size = int(size)
+            self.enabled = True
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def disable(self):
+        """Disable and clear the cache."""
+        with self._lock:
+            self.enabled = False
+            self._entries.clear()
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None):
+        """Add a value, evicting the least recently used entries as needed.
+
+        The value is not added when the cache was invalidated since the given
+        generation, which is read before running the query.
+        """
+        with self._lock:
+            if not self.enabled:
+                return
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tools):
+        """Remove the entries for the given tool names."""
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._entries if k[0] in tools]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+query_cache = QueryCache()
@@ -0,0 +1,97 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+"""Registry of the cell resources created by the library keywords."""
+
+import threading
+
+
+class ResourceRegistry:
+    """Track the volumes, mount points and ACL entries created by keywords.
+
+    The registry is used to remove the resources which remain at the end of
+    a suite.
+    """
+
+    def __init__(self):
+        self.volumes = {}  # name -> (vid, server, part)
+        self.mounts = {}  # path -> None, in insertion order
+        self.acls = {}  # (path, name) -> previous rights, in insertion order
+        self._lock = threading.Lock()
+
+    def add_volume(self, name, vid, server, part):
+        with self._lock:
+            self.volumes[name] = (str(vid), server, part)
+
+    def move_volume(self, name_or_id, server, part):
+        """Update the location of a volume given by name or id."""
+        key = str(name_or_id)
+        with self._lock:
+            for name, (vid, _, _) in list(self.volumes.items()):
+                if key in (name, vid):
+                    self.volumes[name] = (vid, server, part)
+
+    def add_mount(self, path):
+        with self._lock:
+            self.mounts[path] = None
+
+    def add_acl(self, path, name, previous=""):
+        """Add an ACL entry and the normal rights it had before it was set.
+
+        The previous rights are empty when the entry was created. Only the
+        rights before the first change are kept.
+        """
+        with self._lock:
+            self.acls.setdefault((path, name), previous)
+
+    def forget_volume(self, name_or_id):
+        """Remove a volume by name or id from the registry."""
+        key = str(name_or_id)
+        with self._lock:
+            for name, (vid, server, part) in list(self.volumes.items()):
+                if key in (name, vid):
+                    del self.volumes[name]
+
+    def forget_mount(self, path):
+        """Remove a mount point, and the ACL entries within it, from the registry."""
+        with self._lock:
+            self.mounts.pop(path, None)
+            for acl in list(self.acls):
+                if within(acl[0], path):
+                    del self.acls[acl]
+
+    def clear(self):
+        with self._lock:
+            self.volumes.clear()
+            self.mounts.clear()
+            self.acls.clear()
+
+    def __len__(self):
+        return len(self.volumes) + len(self.mounts) + len(self.acls)
+
+
+def within(path, directory):
+    """Returns true if the path is the directory or is below it."""
+    return path == directory or path.startswith(directory.rstrip("/") + "/")
+
+
+registry = ResourceRegistry()
@@ -0,0 +1,143 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+"""Cache of fileserver host names and addresses."""
+
+import ipaddress
+import os
+import socket
+import threading
+
+from OpenAFSLibrary import command, logger
+
+# vos commands which change the addresses registered for the fileservers.
+_ADDRESS_CHANGES = ("changeaddr", "remaddrs", "setaddrs")
+
+
+def parse_listaddrs(lines):
+    """Parse vos listaddrs -printuuid -noresolve output.
+
+    Returns a list of (uuid, addresses) tuples, one for each fileserver.
+    The uuid is None for servers which did not register a uuid.
+    """
+    servers = []
+    uuid = None
+    addresses = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith("UUID:"):
+            if addresses:
+                servers.append((uuid, addresses))
+            uuid = line.split(":", 1)[1].strip()
+            addresses = []
+        elif line:
+            addresses.append(line)
+        elif addresses:
+            servers.append((uuid, addresses))
+            uuid = None
+            addresses = []
+    if addresses:
+        servers.append((uuid, addresses))
+    return servers
+
+
+def _is_address(host):
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class ServerResolver:
+    """Resolve fileserver names to the addresses registered in the VLDB.
+
+    Host names are resolved once and kept until clear() is called. The
+    addresses of the fileservers are grouped by uuid from `vos listaddrs`,
+    so a multihomed server matches on any of its addresses. When the
+    addresses cannot be listed, a server matches on its own address only.
+    """
+
+    def __init__(self):
+        self._hosts = {}
+        self._servers = None
+        self._lock = threading.Lock()
+
+    def address(self, host):
+        """Return the IP address of the host name."""
+        if _is_address(host):
+            return host
+        with self._lock:
+            address = self._hosts.get(host)
+        if address is None:
+            address = socket.gethostbyname(host)
+            with self._lock:
+                self._hosts[host] = address
+        return address
+
+    def addresses(self, host):
+        """Return the set of the addresses of the fileserver."""
+        address = self.address(host)
+        return self._load().get(address, frozenset([address]))
+
+    def clear(self):
+        """Discard the cached names and addresses."""
+        with self._lock:
+            if self._servers is not None:
+                command.remove_observer(self)
+            self._hosts.clear()
+            self._servers = None
+
+    def record(self, args, code, output, error):
+        if isinstance(args, str):
+            args = args.split()
+        if len(args) < 2 or os.path.basename(str(args[0])) != "vos":
+            return
+        if args[1] in _ADDRESS_CHANGES:
+            with self._lock:
+                if self._servers is not None:
+                    command.remove_observer(self)
+                self._servers = None
+
+    def _load(self):
+        with self._lock:
+            servers = self._servers
+        if servers is not None:
+            return servers
+        try:
+            lines = list(
+                command.vos_lines("listaddrs", "-printuuid", "-noresolve", "-noauth")
+            )
+        except command.CommandFailed as e:
+            # Match on the resolved address only, and list again next time.
+            logger.info("Unable to list the fileserver addresses: %s" % e)
+            return {}
+        servers = {}
+        for uuid, addresses in parse_listaddrs(lines):
+            group = frozenset(addresses)
+            for address in addresses:
+                servers[address] = group
+        with self._lock:
+            if self._servers is None:
+                command.add_observer(self)
+            self._servers = servers
+        return servers
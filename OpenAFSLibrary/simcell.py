@@ -0,0 +1,954 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+"""Simulated AFS cell command backend.
+
+The SimulatedCell emulates a subset of the vos, fs, bos, pts and rxdebug
+commands with an in-memory VLDB, fileserver partitions, mount points and
+ACLs. The output formats match the ones parsed by the library keywords, so
+the keyword logic can be run and load tested without an AFS cell:
+
+    cell = SimulatedCell(servers=["afs1", "afs2"], parts=["a", "b"])
+    command.set_backend(cell)
+
+Latency may be added to every command, or to commands by tag (for
+example 'vos release'), and errors may be injected.
+"""
+
+import os
+import random
+import shlex
+import threading
+import time
+import uuid
+
+from OpenAFSLibrary import command
+from OpenAFSLibrary.keywords.acl import parse
+
+FIRST_VOLUME_ID = 536870912
+PARTITION_BLOCKS = 1073741824  # 1K blocks
+VOLUME_BLOCKS = 2  # blocks used by an empty volume
+
+# Options which do not take a value.
+_FLAGS = set(
+    "clear dryrun encrypt extended fast force format id_only localauth long "
+    "negative noauth noresolve printuuid quiet remove verbose version".split()
+)
+
+# Option abbreviations.
+_ALIASES = {
+    "p": "partition",
+    "part": "partition",
+    "s": "server",
+    "maxquota": "m",
+    "nameorid": "name",
+}
+
+
+class Volume:
+    """Simulated read-write volume and its VLDB entry."""
+
+    def __init__(self, name, rw, server, part, quota=0):
+        self.name = name
+        self.rw = rw
+        self.ro = None
+        self.bk = None
+        self.server = server
+        self.part = part
+        self.rosites = []
+        self.released = False
+        self.quota = quota
+        self.blocks = VOLUME_BLOCKS
+        self.files = 1  # The root directory.
+        self.locked = False
+        self.op = None
+        self.created = int(time.time())
+        self.updated = self.created
+        self.released_at = 0
+        self.day_use = 0
+        self.online = True
+
+
+class _Failure(Exception):
+    def __init__(self, error, code=1, output=""):
+        self.error = error
+        self.code = code
+        self.output = output
+
+
+def _parse_args(args):
+    """Split command arguments into positional values and options."""
+    positional = []
+    options = {}
+    name = None
+    for arg in args:
+        if arg.startswith("-") and len(arg) > 1 and not arg[1:].isdigit():
+            name = _ALIASES.get(arg[1:], arg[1:])
+            if name in _FLAGS:
+                options[name] = True
+                name = None
+            else:
+                options.setdefault(name, [])
+        elif name is None:
+            positional.append(arg)
+        else:
+            options[name].append(arg)
+    return positional, options
+
+
+def _opt(options, name, positional=None, index=0, default=None):
+    """Return an option value, or the positional value in its place."""
+    values = options.get(name)
+    if values:
+        return values[0]
+    if positional is not None and len(positional) > index:
+        return positional[index]
+    if default is not None:
+        return default
+    raise _Failure("Missing required parameter '-%s'" % name)
+
+
+class SimulatedCell:
+    """Command backend which emulates the AFS servers of a cell."""
+
+    def __init__(
+        self,
+        cell="example.com",
+        servers=("localhost",),
+        parts=("a",),
+        latency=0.0,
+        error_rate=0.0,
+        seed=0,
+    ):
+        self.cell = cell
+        self.latency = float(latency)
+        self.latencies = {}
+        self.error_rate = float(error_rate)
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._failures = {}
+        self._next_id = FIRST_VOLUME_ID
+        self.addresses = {}  # server name -> address
+        self.multihomed = {}  # address -> additional addresses
+        self.partitions = {}  # (address, part) -> {volume id: volume name}
+        self.sizes = {}  # (address, part) -> 1K blocks, when not PARTITION_BLOCKS
+        self.volumes = {}  # name -> Volume
+        self.ids = {}  # volume id -> Volume
+        self.mounts = {}  # path -> volume name
+        self.acls = {}  # path -> {name: (positive, negative)}
+        self.users = {}  # pts name -> id
+        for server in servers:
+            self.add_server(server, parts)
+        if self.addresses:
+            server = next(iter(self.addresses))
+            self.create_volume("root.afs", server, parts[0])
+            self.create_volume("root.cell", server, parts[0])
+            self.mounts["/afs"] = "root.afs"
+            self.mounts["/afs/%s" % cell] = "root.cell"
+
+    #
+    # Cell setup.
+    #
+
+    def add_server(self, name, parts=("a",), address=None, aliases=()):
+        """Add a fileserver with the given partitions and extra addresses."""
+        with self._lock:
+            if address is None:
+                address = "10.0.%d.%d" % divmod(len(self.addresses) + 1, 256)
+            self.addresses[name] = address
+            self.multihomed[address] = list(aliases)
+            for part in parts:
+                self.partitions[(address, part)] = {}
+            return address
+
+    def set_latency(self, tag, seconds):
+        """Add latency to the commands with the given tag, e.g. 'vos release'."""
+        self.latencies[tag] = float(seconds)
+
+    def inject_error(self, tag, error="simulated error", code=1, count=1):
+        """Fail the next count commands with the given tag."""
+        with self._lock:
+            self._failures[tag] = [error, code, int(count)]
+
+    def create_volume(self, name, server, part, quota=0):
+        """Create a volume and its VLDB entry; returns the volume."""
+        with self._lock:
+            address = self._address(server)
+            if (address, part) not in self.partitions:
+                raise _Failure("partition /vicep%s does not exist on the server" % part)
+            if name in self.volumes:
+                raise _Failure("Volume %s already exists" % name)
+            volume = Volume(name, self._new_id(), address, part, quota)
+            volume.updated = self._clock()
+            self.volumes[name] = volume
+            self.ids[volume.rw] = volume
+            self.partitions[(address, part)][volume.rw] = name
+            return volume
+
+    def populate(self, count, prefix="vol", server=None, part=None):
+        """Create count volumes named prefix.N spread over the partitions."""
+        sites = sorted(self.partitions)
+        for i in range(int(count)):
+            address, p = sites[i % len(sites)]
+            self.create_volume("%s.%d" % (prefix, i), server or address, part or p)
+
+    #
+    # Backend interface.
+    #
+
+    def run(self, args, timeout=None, env=None):
+        """Run a command; returns the (code, output, error) tuple."""
+        if isinstance(args, str):
+            args = shlex.split(args)
+        args = [str(a) for a in args]
+        tool = os.path.basename(args[0]) if args else ""
+        subcommand = args[1] if len(args) > 1 else ""
+        if subcommand.startswith("-"):  # e.g. rxdebug
+            subcommand = ""
+        rest = args[2:] if subcommand else args[1:]
+        tag = ("%s %s" % (tool, subcommand)).strip()
+        self.calls += 1
+        delay = self.latencies.get(tag, self.latency)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            failure = self._failures.get(tag)
+            if failure:
+                failure[2] -= 1
+                if failure[2] <= 0:
+                    del self._failures[tag]
+                return (failure[1], "", failure[0] + "\n")
+            if self.error_rate and self._random.random() < self.error_rate:
+                return (1, "", "simulated error\n")
+            handler = getattr(self, "_%s_%s" % (tool, subcommand), None)
+            if handler is None:
+                return (1, "", "%s: Unrecognized operation '%s'\n" % (tool, subcommand))
+            positional, options = _parse_args(rest)
+            try:
+                output = handler(positional, options)
+            except _Failure as e:
+                return (e.code, e.output, e.error + "\n")
+            return (0, output, "")
+
+    #
+    # Helpers.
+    #
+
+    def _clock(self):
+        return int(time.time())
+
+    def _new_id(self):
+        vid = self._next_id
+        self._next_id += 3  # Leave room for the RO and BK ids.
+        return vid
+
+    def _address(self, server):
+        if server in self.addresses:
+            return self.addresses[server]
+        if server in self.addresses.values():
+            return server
+        for address, aliases in self.multihomed.items():
+            if server in aliases:
+                return address
+        raise _Failure("vos: server '%s' not found in host table" % server)
+
+    def _server_name(self, address, options):
+        if options.get("noresolve"):
+            return address
+        for name, a in self.addresses.items():
+            if a == address:
+                return name
+        return address
+
+    def _lookup(self, name_or_id):
+        """Find the VLDB entry of a volume by name or id."""
+        key = str(name_or_id)
+        for suffix in (".readonly", ".backup"):
+            if key.endswith(suffix):
+                key = key[: -len(suffix)]
+        volume = self.volumes.get(key)
+        if volume is None and key.isdigit():
+            vid = int(key)
+            volume = self.ids.get(vid)
+            if volume is None:
+                for v in self.volumes.values():
+                    if vid in (v.ro, v.bk):
+                        volume = v
+                        break
+        if volume is None:
+            raise _Failure("VLDB: no such entry")
+        return volume
+
+    def _space(self, address, part):
+        """Return the free and total 1K blocks of a partition."""
+        total = self.sizes.get((address, part), PARTITION_BLOCKS)
+        used = sum(
+            self.volumes[n].blocks if n in self.volumes else VOLUME_BLOCKS
+            for n in self.partitions[(address, part)].values()
+        )
+        return (total - used, total)
+
+    def _mount_of(self, path):
+        """Return the mount path and volume containing the path."""
+        path = os.path.normpath(path)
+        p = path
+        while True:
+            if p in self.mounts:
+                return (p, self.volumes.get(self.mounts[p]))
+            parent = os.path.dirname(p)
+            if parent == p:
+                raise _Failure("fs: File '%s' doesn't exist" % path)
+            p = parent
+
+    #
+    # vos
+    #
+
+    def _vos_create(self, positional, options):
+        server = _opt(options, "server")
+        part = _opt(options, "partition")
+        name = _opt(options, "name")
+        quota = int(_opt(options, "m", default="0"))
+        volume = self.create_volume(name, server, part, quota)
+        return "Volume %d created on partition /vicep%s of %s\n" % (
+            volume.rw,
+            part,
+            server,
+        )
+
+    def _vos_remove(self, positional, options):
+        name_or_id = _opt(options, "id", positional)
+        volume = self._lookup(name_or_id)
+        readonly = str(name_or_id).endswith(".readonly")
+        if "server" in options and (readonly or str(name_or_id) == str(volume.ro)):
+            address = self._address(_opt(options, "server"))
+            part = _opt(options, "partition")
+            if (address, part) not in volume.rosites:
+                raise _Failure("Volume %s does not exist on the server" % volume.ro)
+            volume.rosites.remove((address, part))
+            self.partitions[(address, part)].pop(volume.ro, None)
+            return "Volume %d on partition /vicep%s server %s deleted\n" % (
+                volume.ro,
+                part,
+                address,
+            )
+        for address, part in volume.rosites:
+            self.partitions[(address, part)].pop(volume.ro, None)
+        sites = self.partitions[(volume.server, volume.part)]
+        sites.pop(volume.rw, None)
+        sites.pop(volume.bk, None)
+        del self.volumes[volume.name]
+        del self.ids[volume.rw]
+        return "Volume %d on partition /vicep%s server %s deleted\n" % (
+            volume.rw,
+            volume.part,
+            volume.server,
+        )
+
+    def _vos_zap(self, positional, options):
+        vid = _opt(options, "id", positional)
+        address = self._address(_opt(options, "server"))
+        part = _opt(options, "partition")
+        sites = self.partitions.get((address, part), {})
+        found = None
+        for v, name in sites.items():
+            if str(v) == str(vid) or name == vid:
+                found = v
+                break
+        if found is None:
+            raise _Failure("Volume %s does not exist on the server" % vid)
+        del sites[found]
+        return "Volume %s deleted\n" % found
+
+    def _vos_delent(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        del self.volumes[volume.name]
+        del self.ids[volume.rw]
+        return "Deleted 1 VLDB entries\n"
+
+    def _vos_rename(self, positional, options):
+        volume = self._lookup(_opt(options, "oldname", positional))
+        newname = _opt(options, "newname", positional, 1)
+        if newname in self.volumes:
+            raise _Failure("Volume %s already exists" % newname)
+        oldname = volume.name
+        del self.volumes[oldname]
+        volume.name = newname
+        self.volumes[newname] = volume
+        self.partitions[(volume.server, volume.part)][volume.rw] = newname
+        return "Renamed volume %s to %s\n" % (oldname, newname)
+
+    def _vos_restore(self, positional, options):
+        address = self._address(_opt(options, "server", positional))
+        part = _opt(options, "partition", positional, 1)
+        name = _opt(options, "name", positional, 2)
+        filename = _opt(options, "file")
+        if not os.path.exists(filename):
+            raise _Failure("Can't access file %s" % filename)
+        volume = self.volumes.get(name)
+        if volume is None:
+            volume = self.create_volume(name, address, part)
+        elif not options.get("overwrite"):
+            raise _Failure("Volume %s already exists; use -overwrite" % name)
+        volume.blocks, volume.files = VOLUME_BLOCKS, 0
+        with open(filename, "rb") as f:
+            fields = f.readline().split()
+        if fields[:1] == [b"SIMDUMP"]:  # Written by the simulated vos dump.
+            volume.blocks, volume.files = int(fields[2]), int(fields[3])
+        volume.updated = self._clock()
+        return "Restored volume %s on %s /vicep%s\n" % (name, address, part)
+
+    def _vos_dump(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        filename = _opt(options, "file")
+        with open(filename, "w") as f:
+            f.write("SIMDUMP %s %d %d\n" % (volume.name, volume.blocks, volume.files))
+        return ""
+
+    def _vos_addsite(self, positional, options):
+        address = self._address(_opt(options, "server"))
+        part = _opt(options, "partition")
+        volume = self._lookup(_opt(options, "id", positional))
+        if (address, part) in volume.rosites:
+            raise _Failure("RO already exists on partition /vicep%s" % part)
+        if volume.ro is None:
+            volume.ro = volume.rw + 1
+        volume.rosites.append((address, part))
+        return "Added replication site %s /vicep%s for volume %s\n" % (
+            address,
+            part,
+            volume.name,
+        )
+
+    def _vos_release(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        if volume.locked:
+            raise _Failure(
+                "Volume %d is locked for a %s operation" % (volume.rw, volume.op)
+            )
+        if volume.ro is None:
+            volume.ro = volume.rw + 1
+        out = []
+        full = options.get("force") or not volume.released
+        if options.get("verbose"):
+            out.append(
+                "This is a%s release of volume %d\n"
+                % (" complete" if full else "n incremental", volume.rw)
+            )
+            out.append("Re-cloning permanent RO volume %d ... done\n" % volume.ro)
+            out.append("Getting status of parent volume %d... done\n" % volume.rw)
+        for site in volume.rosites:
+            server = self._server_name(site[0], options)
+            if volume.ro not in self.partitions[site]:
+                out.append(
+                    "Creating new volume %d on replication site %s: done\n"
+                    % (volume.ro, server)
+                )
+                since = "entire volume"
+            else:
+                out.append(
+                    "Updating existing ro volume %d on %s ...\n" % (volume.ro, server)
+                )
+                since = (
+                    "entire volume"
+                    if full
+                    else "as of %s" % time.ctime(volume.released_at)
+                )
+            out.append(
+                "Starting ForwardMulti from %d to %d on %s (%s).\n"
+                % (volume.ro, volume.ro, server, since)
+            )
+            self.partitions[site][volume.ro] = volume.name + ".readonly"
+        if options.get("verbose"):
+            out.append("updating VLDB ... done\n")
+        else:
+            out = []  # Only the result is printed without -verbose.
+        volume.released = True
+        volume.released_at = volume.updated
+        out.append("Released volume %s successfully\n" % volume.name)
+        return "".join(out)
+
+    def _vos_backup(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        volume.bk = volume.rw + 2
+        self.partitions[(volume.server, volume.part)][volume.bk] = (
+            volume.name + ".backup"
+        )
+        return "Created backup volume for %s\n" % volume.name
+
+    def _vos_move(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        source = (
+            self._address(_opt(options, "fromserver", positional, 1)),
+            _opt(options, "frompartition", positional, 2),
+        )
+        dest = (
+            self._address(_opt(options, "toserver", positional, 3)),
+            _opt(options, "topartition", positional, 4),
+        )
+        if source != (volume.server, volume.part):
+            raise _Failure("Volume %d does not exist on the server" % volume.rw)
+        if dest not in self.partitions:
+            raise _Failure("partition /vicep%s does not exist on the server" % dest[1])
+        if dest == source:
+            raise _Failure("Cannot move volume to its current location")
+        if volume.locked:
+            raise _Failure(
+                "Volume %d is locked for a %s operation" % (volume.rw, volume.op)
+            )
+        sites = self.partitions[source]
+        sites.pop(volume.rw, None)
+        sites.pop(volume.bk, None)  # The backup volume is deleted.
+        volume.bk = None
+        self.partitions[dest][volume.rw] = volume.name
+        volume.server, volume.part = dest
+        out = []
+        if options.get("verbose"):
+            rw, clone = volume.rw, self._new_id()
+            for phase in (
+                "Starting transaction on source volume %d" % rw,
+                "Allocating new volume id for clone of volume %d" % rw,
+                "Cloning source volume %d" % rw,
+                "Ending the transaction on the source volume %d" % rw,
+                "Starting transaction on source clone %d" % clone,
+                "Creating the destination volume %d" % rw,
+                "Dumping from clone %d on source to volume %d on destination"
+                % (clone, rw),
+                "Ending transaction on cloned volume %d" % clone,
+                "Starting transaction on source volume %d" % rw,
+                "Doing the incremental dump from source to destination for volume %d"
+                % rw,
+                "Setting volume flags on destination volume %d" % rw,
+                "Ending transaction on destination volume %d" % rw,
+                "Ending transaction on source volume %d" % rw,
+                "Deleting old volume %d on source server" % rw,
+                "Starting transaction on the cloned volume %d" % clone,
+                "Deleting the cloned volume %d" % clone,
+            ):
+                out.append("%s ... done\n" % phase)
+        out.append(
+            "Volume %d moved from %s /vicep%s to %s /vicep%s \n"
+            % ((volume.rw,) + source + dest)
+        )
+        return "".join(out)
+
+    def _vos_offline(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        volume.online = False
+        return ""
+
+    def _vos_online(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        volume.online = True
+        return ""
+
+    def _vos_lock(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        volume.locked = True
+        volume.op = "delete"
+        return "Locked VLDB entry for volume %s\n" % volume.name
+
+    def _vos_unlock(self, positional, options):
+        volume = self._lookup(_opt(options, "id", positional))
+        volume.locked = False
+        volume.op = None
+        return "Released lock on vldb entry for volume %s\n" % volume.name
+
+    def _format_vldb_entry(self, volume, options):
+        ids = "    RWrite: %d" % volume.rw
+        if volume.ro is not None:
+            ids += "     ROnly: %d" % volume.ro
+        if volume.bk is not None:
+            ids += "     Backup: %d" % volume.bk
+        lines = [volume.name, ids]
+        lines.append("    number of sites -> %d" % (1 + len(volume.rosites)))
+        lines.append(
+            "       server %s partition /vicep%s RW Site"
+            % (self._server_name(volume.server, options), volume.part)
+        )
+        for address, part in volume.rosites:
+            lines.append(
+                "       server %s partition /vicep%s RO Site"
+                % (self._server_name(address, options), part)
+            )
+        if volume.locked:
+            lines.append("    Volume is currently LOCKED")
+            lines.append("    Volume is locked for a %s operation" % volume.op)
+        return "\n".join(lines) + "\n"
+
+    def _vos_listvldb(self, positional, options):
+        if "name" in options or positional:
+            volume = self._lookup(_opt(options, "name", positional))
+            return "\n" + self._format_vldb_entry(volume, options)
+        volumes = sorted(self.volumes.values(), key=lambda v: v.name)
+        if "server" in options:
+            address = self._address(_opt(options, "server"))
+            part = options.get("partition", [None])[0]
+            volumes = [
+                v
+                for v in volumes
+                if any(
+                    s == address and (part is None or p == part)
+                    for s, p in [(v.server, v.part)] + v.rosites
+                )
+            ]
+        out = []
+        if not options.get("quiet"):
+            out.append("VLDB entries for all servers\n")
+        for volume in volumes:
+            out.append("\n" + self._format_vldb_entry(volume, options))
+        if not options.get("quiet"):
+            out.append("\nTotal entries: %d\n" % len(volumes))
+        return "".join(out)
+
+    def _vos_changeaddr(self, positional, options):
+        old = _opt(options, "oldaddr", positional)
+        for aliases in self.multihomed.values():
+            if old in aliases:
+                aliases.remove(old)
+                if not options.get("remove"):
+                    aliases.append(_opt(options, "newaddr", positional, 1))
+                return ""
+        raise _Failure("vos: could not change server address %s" % old)
+
+    def _vos_listaddrs(self, positional, options):
+        out = []
+        for name, address in self.addresses.items():
+            if options.get("printuuid"):
+                out.append("UUID: %s\n" % uuid.uuid5(uuid.NAMESPACE_DNS, name))
+            for a in [address] + self.multihomed[address]:
+                out.append("%s\n" % self._server_name(a, options))
+            out.append("\n")
+        return "".join(out)
+
+    def _vos_listpart(self, positional, options):
+        address = self._address(_opt(options, "server", positional))
+        parts = sorted(p for a, p in self.partitions if a == address)
+        return "The partitions on the server are:\n    %s \nTotal: %d\n" % (
+            "     ".join("/vicep%s" % p for p in parts),
+            len(parts),
+        )
+
+    def _format_status(self, vid, name, address, part, options):
+        """Return the vos -format volume header lines of a volume or clone."""
+        vtype = "RW"
+        base = name
+        for suffix, t in ((".readonly", "RO"), (".backup", "BK")):
+            if name.endswith(suffix):
+                vtype, base = t, name[: -len(suffix)]
+        volume = self.volumes.get(base)
+        if volume is None:  # Orphaned volume; no VLDB entry.
+            volume = Volume(base, vid, address, part)
+        fields = [
+            ("name", name),
+            ("id", vid),
+            ("serv", "%s\t%s" % (address, self._server_name(address, {}))),
+            ("part", "/vicep%s" % part),
+            ("status", "OK"),
+            ("backupID", volume.bk or 0),
+            ("parentID", volume.rw),
+            ("cloneID", volume.ro or 0),
+            ("inUse", "Y" if volume.online else "N"),
+            ("needsSalvaged", "N"),
+            ("destroyMe", "N"),
+            ("type", vtype),
+            ("creationDate", volume.created),
+            ("accessDate", 0),
+            ("updateDate", volume.updated if vtype == "RW" else volume.released_at),
+            ("backupDate", 0),
+            ("copyDate", volume.created),
+            ("flags", "0\t(Optional)"),
+            ("diskused", volume.blocks),
+            ("maxquota", volume.quota),
+            ("minquota", 0),
+            ("filecount", volume.files),
+            ("dayUse", volume.day_use),
+            ("weekUse", "0\t(Optional)"),
+        ]
+        return "".join("%s\t\t%s\n" % f for f in fields)
+
+    def _vos_examine(self, positional, options):
+        name_or_id = _opt(options, "id", positional)
+        volume = self._lookup(name_or_id)
+        key = str(name_or_id)
+        vid, name, site = volume.rw, volume.name, (volume.server, volume.part)
+        if key.endswith(".readonly") or key == str(volume.ro):
+            if not volume.rosites:
+                raise _Failure("Volume %s does not exist" % key)
+            vid, name, site = volume.ro, volume.name + ".readonly", volume.rosites[0]
+        if options.get("format"):
+            out = self._format_status(vid, name, site[0], site[1], options)
+        else:
+            out = "%-32s %10d %s %10d K  On-line\n" % (name, vid, "RW", volume.blocks)
+        # vos examine does not repeat the volume name in the VLDB entry.
+        entry = self._format_vldb_entry(volume, options).split("\n", 1)[1]
+        return out + "\n" + entry
+
+    def _vos_partinfo(self, positional, options):
+        address = self._address(_opt(options, "server", positional))
+        part = options.get("partition", positional[1:2] or [None])[0]
+        lines = []
+        for a, p in sorted(self.partitions):
+            if a != address or (part is not None and p != part):
+                continue
+            lines.append(
+                "Free space on partition /vicep%s: %d K blocks out of total %d\n"
+                % ((p,) + self._space(a, p))
+            )
+        return "".join(lines)
+
+    def _vos_listvol(self, positional, options):
+        address = self._address(_opt(options, "server", positional))
+        part = options.get("partition", positional[1:2] or [None])[0]
+        out = []
+        for (a, p), sites in sorted(self.partitions.items()):
+            if a != address or (part is not None and p != part):
+                continue
+            if options.get("fast"):
+                out.extend("%d\n" % vid for vid in sorted(sites))
+                continue
+            if options.get("format"):
+                out.append(
+                    "Total number of volumes on server %s partition /vicep%s: %d \n"
+                    % (self._server_name(a, options), p, len(sites))
+                )
+                for vid, name in sorted(sites.items()):
+                    out.append("BEGIN_OF_ENTRY\n")
+                    out.append(self._format_status(vid, name, a, p, options))
+                    out.append("END_OF_ENTRY\n")
+                continue
+            out.append(
+                "Total number of volumes on server %s partition /vicep%s: %d \n"
+                % (self._server_name(a, options), p, len(sites))
+            )
+            for vid, name in sorted(sites.items(), key=lambda x: x[1]):
+                vtype = "RO" if name.endswith(".readonly") else "RW"
+                if name.endswith(".backup"):
+                    vtype = "BK"
+                blocks = VOLUME_BLOCKS
+                volume = self.volumes.get(name)
+                if volume is not None:
+                    blocks = volume.blocks
+                out.append(
+                    "%-32s %10d %s %10d K On-line\n" % (name, vid, vtype, blocks)
+                )
+            out.append(
+                "\nTotal volumes onLine %d ; Total volumes offLine 0 ; Total busy 0\n\n"
+                % len(sites)
+            )
+        return "".join(out)
+
+    #
+    # fs
+    #
+
+    def _fs_mkmount(self, positional, options):
+        path = os.path.normpath(_opt(options, "dir", positional))
+        name = _opt(options, "vol", positional, 1)
+        if path in self.mounts:
+            raise _Failure("fs: File '%s' exists" % path)
+        self._mount_of(os.path.dirname(path))
+        self.mounts[path] = name
+        return ""
+
+    def _fs_rmmount(self, positional, options):
+        path = os.path.normpath(_opt(options, "dir", positional))
+        if path not in self.mounts:
+            raise _Failure("fs: '%s' is not a mount point." % path)
+        del self.mounts[path]
+        self.acls.pop(path, None)
+        return ""
+
+    def _fs_examine(self, positional, options):
+        path = os.path.normpath(_opt(options, "path", positional))
+        mount, volume = self._mount_of(path)
+        if volume is None:
+            raise _Failure(
+                "fs: You don't have the required access rights on '%s'" % path
+            )
+        vid, name = volume.rw, volume.name
+        if volume.released and mount != "/afs/.%s" % self.cell:
+            vid, name = volume.ro, volume.name + ".readonly"
+        free, total = self._space(volume.server, volume.part)
+        if volume.quota:
+            quota = "Current disk quota is %d" % volume.quota
+        else:
+            quota = "Current disk quota is unlimited"
+        return (
+            "File %s (%d.1.1) contained in volume %d\n"
+            "Volume status for vid = %d named %s\n"
+            "%s\n"
+            "Current blocks used are %d\n"
+            "The partition has %d blocks available out of %d\n"
+            % (
+                path,
+                vid,
+                vid,
+                vid,
+                name,
+                quota,
+                volume.blocks,
+                free,
+                total,
+            )
+        )
+
+    def _acl_of(self, path):
+        p = path
+        while p not in self.acls:
+            if p in self.mounts or os.path.dirname(p) == p:
+                return {"system:administrators": ("rlidwka", "")}
+            p = os.path.dirname(p)
+        return self.acls[p]
+
+    def _fs_listacl(self, positional, options):
+        path = os.path.normpath(_opt(options, "path", positional))
+        self._mount_of(path)
+        acl = self._acl_of(path)
+        lines = ["Access list for %s is" % path, "Normal rights:"]
+        for name in sorted(acl):
+            if acl[name][0]:
+                lines.append("  %s %s" % (name, acl[name][0]))
+        negative = [name for name in sorted(acl) if acl[name][1]]
+        if negative:
+            lines.append("Negative rights:")
+            for name in negative:
+                lines.append("  %s %s" % (name, acl[name][1]))
+        return "\n".join(lines) + "\n"
+
+    def _fs_setacl(self, positional, options):
+        path = os.path.normpath(_opt(options, "dir", positional))
+        self._mount_of(path)
+        entries = options.get("acl") or positional[1:]
+        if len(entries) % 2:
+            raise _Failure("fs: Missing second part of user/access pair.")
+        acl = {} if options.get("clear") else dict(self._acl_of(path))
+        index = 1 if options.get("negative") else 0
+        for name, rights in zip(entries[0::2], entries[1::2]):
+            sign, chars = parse(rights)
+            entry = list(acl.get(name, ("", "")))
+            entry[1 if sign == "-" else index] = "".join(chars)
+            if entry == ["", ""]:
+                acl.pop(name, None)
+            else:
+                acl[name] = tuple(entry)
+        self.acls[path] = acl
+        return ""
+
+    def _fs_checkvolumes(self, positional, options):
+        return "All volumeID/name mappings checked.\n"
+
+    def _fs_flush(self, positional, options):
+        return ""
+
+    def _fs_getcacheparms(self, positional, options):
+        return "AFS using 0 of the cache's available 100000 1K byte blocks.\n"
+
+    #
+    # bos
+    #
+
+    def _bos_status(self, positional, options):
+        self._address(_opt(options, "server", positional))
+        return (
+            "Instance dafs, currently running normally.\n"
+            "    Auxiliary status is: file server running.\n"
+        )
+
+    def _bos_listhosts(self, positional, options):
+        self._address(_opt(options, "server", positional))
+        hosts = ["Cell name is %s" % self.cell]
+        for i, name in enumerate(self.addresses):
+            hosts.append("    Host %d is %s" % (i + 1, name))
+        return "\n".join(hosts) + "\n"
+
+    #
+    # pts
+    #
+
+    def _pts_createuser(self, positional, options):
+        name = _opt(options, "name", positional)
+        if name in self.users:
+            raise _Failure(
+                "pts: Entry for name already exists ; unable to create user %s" % name
+            )
+        uid = int(_opt(options, "id", default=str(len(self.users) + 1)))
+        self.users[name] = uid
+        return "User %s has id %d\n" % (name, uid)
+
+    def _pts_delete(self, positional, options):
+        name = _opt(options, "name", positional)
+        if self.users.pop(name, None) is None:
+            raise _Failure("pts: User or group doesn't exist deleting %s" % name)
+        return ""
+
+    def _pts_examine(self, positional, options):
+        name = _opt(options, "name", positional)
+        if name not in self.users:
+            raise _Failure(
+                "pts: User or group doesn't exist so couldn't look up id for %s" % name
+            )
+        return (
+            "Name: %s, id: %d, owner: system:administrators, "
+            "creator: admin,\n  membership: 0, flags: S----, group quota: 20.\n"
+            % (name, self.users[name])
+        )
+
+    def _pts_listentries(self, positional, options):
+        lines = ["Name                          ID  Owner Creator"]
+        for name, uid in sorted(self.users.items()):
+            lines.append("%-28s %4d   -204    -204" % (name, uid))
+        return "\n".join(lines) + "\n"
+
+    #
+    # rxdebug
+    #
+
+    def _rxdebug_(self, positional, options):
+        server = _opt(options, "servers", positional)
+        port = _opt(options, "port", default="7000")
+        if not options.get("version"):
+            raise _Failure("rxdebug: only -version is simulated")
+        return "Trying %s (port %s):\nAFS version: OpenAFS 1.8.13 (simulated)\n" % (
+            server,
+            port,
+        )
+
+
+_cell = None
+
+
+def start(**kwargs):
+    """Run the commands on a new simulated cell; returns the cell."""
+    global _cell
+    _cell = SimulatedCell(**kwargs)
+    command.set_backend(_cell)
+    return _cell
+
+
+def stop():
+    """Run the commands on the real cell again."""
+    global _cell
+    if _cell is not None:
+        command.set_backend(None)
+        _cell = None
@@ -20,6 +20,7 @@
 #
 
 import os
+import shutil
 
 from robot.libraries.BuiltIn import BuiltIn, RobotNotRunningError
 
@@ -31,6 +32,7 @@ _default_value = {
     "KRB_AFS_KEYTAB": "robot.keytab",
     "KRB_REALM": "EXAMPLE.COM",
     "AFS_AKIMPERSONATE": False,
+    "AFS_COMMAND_TIMEOUT": 0,
     "PAG_ONEGROUP": True,
     "AKLOG": "aklog",
     "BOS": "bos",
@@ -45,6 +47,28 @@ _default_value = {
 }
 
 
+# Variables which name the commands run by the library.
+TOOLS = (
+    "AKLOG",
+    "BOS",
+    "FS",
+    "KDESTROY",
+    "KINIT",
+    "KLOG_KRB5",
+    "PAGSH",
+    "RXDEBUG",
+    "UNLOG",
+    "VOS",
+)
+
+# Resolved command paths, keyed by the variable value.
+_tool_paths = {}
+
+# Resolved variable values, keyed by variable name.
+_cache = {}
+_frozen = False
+
+
 class VariableMissing(Exception):
     pass
 
@@ -54,10 +78,18 @@ class VariableEmpty(Exception):
 
 
 def get_var(name):
-    """Return the variable value as a string."""
+    """Return the variable value as a string.
+
+    Resolved values are cached until clear_cache() is called.
+    """
     if not name:
         raise ValueError("get_var argument is missing!")
 
+    try:
+        return _cache[name]
+    except KeyError:
+        pass
+
     try:
         value = _rf.get_variable_value("${%s}" % name)
     except AttributeError:
@@ -81,9 +113,58 @@ def get_var(name):
     if value == "":
         raise VariableEmpty(name)
 
+    _cache[name] = value
     return value
 
 
+def clear_cache():
+    """Forget the resolved variable values, unless frozen."""
+    if not _frozen:
+        _cache.clear()
+
+
+def freeze(frozen=True):
+    """Keep the resolved variable values until unfrozen."""
+    global _frozen
+    _frozen = frozen
+    if not frozen:
+        _cache.clear()
+
+
+class VariableCacheListener:
+    """Robot Framework listener to invalidate the resolved variable cache.
+
+    Variables may be changed by any keyword outside of this library (for
+    example `Set Global Variable`, or a user keyword with arguments), by an
+    assignment, and when a suite or test scope starts or ends.
+    """
+
+    ROBOT_LISTENER_API_VERSION = 2
+
+    def __init__(self, libname="OpenAFSLibrary"):
+        self.libname = libname
+
+    def start_suite(self, name, attrs):
+        clear_cache()
+
+    def end_suite(self, name, attrs):
+        clear_cache()
+
+    def start_test(self, name, attrs):
+        clear_cache()
+
+    def end_test(self, name, attrs):
+        clear_cache()
+
+    def start_keyword(self, name, attrs):
+        if attrs.get("libname") != self.libname:
+            clear_cache()
+
+    def end_keyword(self, name, attrs):
+        if attrs.get("libname") != self.libname or attrs.get("assign"):
+            clear_cache()
+
+
 def get_bool(name):
     """Return the variable value as a bool."""
     value = get_var(name)
@@ -98,6 +179,53 @@ def get_bool(name):
     return False
 
 
+def _which(value):
+    """Return the absolute path of an executable command, or None."""
+    path = shutil.which(value)
+    if path is None:
+        return None
+    return os.path.abspath(path)
+
+
+def get_tool(name):
+    """Return the command path for a command variable.
+
+    The command is resolved to an absolute path the first time a given
+    variable value is seen, so the PATH is not searched for every command
+    run. The value is returned unchanged when the command is not found
+    (it may be installed later); it is resolved again on the next call.
+    """
+    value = get_var(name)
+    try:
+        return _tool_paths[value]
+    except KeyError:
+        pass
+    path = _which(value)
+    if path is None:
+        return value
+    _tool_paths[value] = path
+    return path
+
+
+def check_tools(names=TOOLS):
+    """Resolve the command variables and return a list of problems found."""
+    problems = []
+    for name in names:
+        try:
+            value = get_var(name)
+        except (VariableMissing, VariableEmpty) as e:
+            problems.append("%s: variable is %s" % (name, type(e).__name__))
+            continue
+        if os.path.sep in value:
+            if not os.path.exists(value):
+                problems.append("%s: %s does not exist" % (name, value))
+            elif not os.access(value, os.X_OK):
+                problems.append("%s: %s is not executable" % (name, value))
+        elif get_tool(name) == value:
+            problems.append("%s: %s not found in PATH" % (name, value))
+    return problems
+
+
 def _split_into_list(name):
     # Split the given scalar into a list. This can be useful since lists can be
     # created only from tests or resources, and we set variables at runtime via
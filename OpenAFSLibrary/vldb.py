@@ -0,0 +1,296 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+"""In-memory index of the VLDB entries of a cell."""
+
+import bisect
+import os
+import re
+import threading
+import time
+
+from OpenAFSLibrary import command
+
+PARTITION_TTL = 10
+
+
+def _changes_vldb(args):
+    """Returns true if the command is a vos command which may change the cell."""
+    if isinstance(args, str):
+        args = args.split()
+    if not args or os.path.basename(str(args[0])) != "vos":
+        return False
+    key, policy = command._cache_policy("vos", args[1:])
+    return policy == "change"
+
+
+class VolumeEntry:
+    """A VLDB entry parsed from vos listvldb output.
+
+    The volume ids are ints, or None when the volume type does not exist.
+    The RW site is given by `server` and `part`, and `rosites` is a list of
+    (server, part) tuples. The RO sites flagged by an unfinished release
+    are listed in `unreleased`.
+    """
+
+    __slots__ = (
+        "name",
+        "rw",
+        "ro",
+        "bk",
+        "server",
+        "part",
+        "rosites",
+        "unreleased",
+        "locked",
+        "op",
+    )
+
+    def __init__(self, name):
+        self.name = name
+        self.rw = None
+        self.ro = None
+        self.bk = None
+        self.server = None
+        self.part = None
+        self.rosites = []
+        self.unreleased = []
+        self.locked = False
+        self.op = None
+
+    def id(self, vtype="rw"):
+        """Return the volume id of the type 'rw', 'ro', or 'bk'."""
+        return getattr(self, vtype)
+
+    def __eq__(self, other):
+        if not isinstance(other, VolumeEntry):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return "VolumeEntry(%s)" % ", ".join(
+            "%s=%r" % (a, getattr(self, a)) for a in self.__slots__
+        )
+
+
+_IDS = re.compile(r"(RWrite|ROnly|Backup|RClone): (\d+)")
+_SITE = re.compile(r"server (\S+) partition /vicep(\S+) (RW|RO|BK) Site")
+_LOCK_OP = re.compile(r"Volume is locked for a (\S+) operation")
+_ID_FIELDS = {"RWrite": "rw", "ROnly": "ro", "Backup": "bk"}
+
+
+def parse_vldb(lines):
+    """Parse vos listvldb output; yields a VolumeEntry for each entry.
+
+    The lines are read in a single pass. Each line is dispatched on its
+    first word, so at most one precompiled pattern is matched per line.
+    """
+    entry = None
+    for line in lines:
+        if not line:
+            continue
+        if not line[0].isspace():
+            if line.startswith(("VLDB entries for", "Total entries")):
+                continue
+            if entry is not None:
+                yield entry
+            entry = VolumeEntry(line.split(None, 1)[0])
+            continue
+        if entry is None:
+            continue
+        line = line.strip()
+        if line.startswith(("RWrite:", "ROnly:", "Backup:")):
+            for field, vid in _IDS.findall(line):
+                if field in _ID_FIELDS:
+                    setattr(entry, _ID_FIELDS[field], int(vid))
+        elif line.startswith("server "):
+            m = _SITE.match(line)
+            if m:
+                if m.group(3) == "RW":
+                    entry.server = m.group(1)
+                    entry.part = m.group(2)
+                elif m.group(3) == "RO":
+                    entry.rosites.append((m.group(1), m.group(2)))
+                    if "--" in line:  # e.g. "-- Not released"
+                        entry.unreleased.append((m.group(1), m.group(2)))
+        elif line.startswith("Volume is "):
+            if line.startswith("Volume is currently LOCKED"):
+                entry.locked = True
+            else:
+                m = _LOCK_OP.match(line)
+                if m:
+                    entry.op = m.group(1)
+    if entry is not None:
+        yield entry
+
+
+class VldbSnapshot:
+    """Index of VolumeEntry objects by name, volume id, and location.
+
+    The snapshot is also a command observer; it is marked as stale when a
+    vos command which may change the VLDB is run. The entries updated since
+    then are current again.
+    """
+
+    def __init__(self, entries=()):
+        self.stale = False
+        self._updated = set()  # names updated since the snapshot became stale
+        self._names = {}
+        self._ids = {}
+        self._sites = {}
+        self._sorted = None
+        for entry in entries:
+            self.add(entry)
+        self._sorted = sorted(self._names)
+
+    def add(self, entry):
+        """Add a VolumeEntry to the index."""
+        name = entry.name
+        if name in self._names:
+            self.discard(name)
+        if self._sorted is not None:
+            bisect.insort(self._sorted, name)
+        self._names[name] = entry
+        for vid in (entry.rw, entry.ro, entry.bk):
+            if vid is not None:
+                self._ids[vid] = entry
+        sites = []
+        if entry.server is not None:
+            sites.append((entry.server, entry.part))
+        sites.extend(entry.rosites)
+        for site in set(sites):
+            self._sites.setdefault(site, []).append(entry)
+
+    def discard(self, name):
+        """Remove the entry of a volume from the index, if present."""
+        entry = self._names.pop(name, None)
+        if entry is None:
+            return
+        if self._sorted is not None:
+            del self._sorted[bisect.bisect_left(self._sorted, name)]
+        for vid in (entry.rw, entry.ro, entry.bk):
+            if self._ids.get(vid) is entry:
+                del self._ids[vid]
+        for entries in self._sites.values():
+            if entry in entries:
+                entries.remove(entry)
+
+    def update(self, name, entry):
+        """Replace the entry of a volume after a lookup; entry None removes it.
+
+        The entry is current until the next vos command which may change
+        the VLDB.
+        """
+        if entry is None:
+            self.discard(name)
+        else:
+            self.add(entry)
+            name = entry.name
+        if self.stale:
+            self._updated.add(name)
+
+    def is_current(self, name):
+        """Return true when the entry of the volume name is known to be current."""
+        return not self.stale or name in self._updated
+
+    def get(self, name_or_id):
+        """Return the entry for a volume name or id, or None if not found."""
+        key = str(name_or_id)
+        if key.isdigit():
+            return self._ids.get(int(key))
+        for suffix in (".readonly", ".backup"):
+            if key.endswith(suffix):
+                key = key[: -len(suffix)]
+        return self._names.get(key)
+
+    def with_prefix(self, prefix):
+        """Return the entries of the volumes whose names start with prefix."""
+        entries = []
+        i = bisect.bisect_left(self._sorted, prefix)
+        while i < len(self._sorted) and self._sorted[i].startswith(prefix):
+            entries.append(self._names[self._sorted[i]])
+            i += 1
+        return entries
+
+    def on_partition(self, server, part):
+        """Return the entries with a RW or RO site on the server partition."""
+        return list(self._sites.get((server, part), []))
+
+    def record(self, args, code, output, error):
+        if _changes_vldb(args):
+            self.stale = True
+            self._updated.clear()
+
+    def __len__(self):
+        return len(self._names)
+
+
+class PartitionVolumeIds:
+    """Sets of the volume ids on fileserver partitions.
+
+    Each set is kept for `ttl` seconds. The sets are observers of the
+    commands run while any unexpired sets are held, and are discarded when
+    a vos command which may create, remove or move volumes is run.
+    """
+
+    def __init__(self, ttl=PARTITION_TTL):
+        self.ttl = ttl
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def get(self, server, part, load):
+        """Return the set of ids on the partition, calling load() when needed."""
+        key = (server, part)
+        with self._lock:
+            entry = self._sets.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            return entry[1]
+        ids = set(load())
+        with self._lock:
+            self._expire()
+            if not self._sets:
+                command.add_observer(self)
+            self._sets[key] = (time.monotonic() + self.ttl, ids)
+        return ids
+
+    def clear(self):
+        """Discard all the sets."""
+        with self._lock:
+            if self._sets:
+                command.remove_observer(self)
+            self._sets.clear()
+
+    def _expire(self):
+        """Discard the expired sets, and stop observing when none are left."""
+        now = time.monotonic()
+        for key, (expires, ids) in list(self._sets.items()):
+            if now >= expires:
+                del self._sets[key]
+                if not self._sets:
+                    command.remove_observer(self)
+
+    def record(self, args, code, output, error):
+        if _changes_vldb(args):
+            self.clear()
+        else:
+            with self._lock:
+                self._expire()
@@ -0,0 +1,115 @@
+# Copyright (c) 2025 Sine Nomine Associates
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THE SOFTWARE IS PROVIDED 'AS IS' AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+
+
+"""Volume status records parsed from vos -format output."""
+
+# Volume header fields: -format key -> (attribute, converter)
+_FIELDS = {
+    "name": ("name", str),
+    "id": ("id", int),
+    "part": ("part", lambda v: v.replace("/vicep", "")),
+    "status": ("status", str),
+    "backupID": ("backup_id", int),
+    "parentID": ("parent_id", int),
+    "cloneID": ("clone_id", int),
+    "inUse": ("in_use", lambda v: v == "Y"),
+    "needsSalvaged": ("needs_salvaged", lambda v: v == "Y"),
+    "destroyMe": ("destroy_me", lambda v: v == "Y"),
+    "type": ("type", str),
+    "creationDate": ("creation_date", int),
+    "accessDate": ("access_date", int),
+    "updateDate": ("update_date", int),
+    "backupDate": ("backup_date", int),
+    "copyDate": ("copy_date", int),
+    "flags": ("flags", int),
+    "diskused": ("disk_used", int),
+    "maxquota": ("max_quota", int),
+    "minquota": ("min_quota", int),
+    "filecount": ("file_count", int),
+    "dayUse": ("day_use", int),
+    "weekUse": ("week_use", int),
+}
+
+
+class VolumeStatus:
+    """Volume header status of a volume on a fileserver partition.
+
+    Dates are seconds since the epoch, sizes are 1K blocks, and the flag
+    fields are bools. Fields missing from the output are None.
+    """
+
+    __slots__ = ("server",) + tuple(attr for attr, conv in _FIELDS.values())
+
+    def __init__(self):
+        for attr in self.__slots__:
+            setattr(self, attr, None)
+
+    def __eq__(self, other):
+        if not isinstance(other, VolumeStatus):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return "VolumeStatus(name=%r, id=%r, server=%r, part=%r, status=%r)" % (
+            self.name,
+            self.id,
+            self.server,
+            self.part,
+            self.status,
+        )
+
+
+def parse_volume_status(lines):
+    """Parse vos examine or vos listvol -format output.
+
+    Yields a VolumeStatus for each volume. Each line is split on whitespace
+    into a key and values; lines with unknown keys, such as the VLDB entry
+    printed by vos examine, are skipped.
+    """
+    status = None
+    for line in lines:
+        fields = line.split()
+        if not fields or line[0].isspace():
+            continue
+        key = fields[0]
+        if key == "BEGIN_OF_ENTRY":
+            status = VolumeStatus()
+        elif key == "END_OF_ENTRY":
+            if status is not None:
+                yield status
+            status = None
+        elif len(fields) > 1 and (key in _FIELDS or key == "serv"):
+            if key == "name" and status is not None and status.name is not None:
+                yield status  # vos examine output has no entry markers
+                status = None
+            if status is None:
+                status = VolumeStatus()
+            if key == "serv":
+                status.server = fields[1]
+            elif key in _FIELDS:
+                attr, convert = _FIELDS[key]
+                try:
+                    setattr(status, attr, convert(fields[1]))
+                except ValueError:
+                    pass
+    if status is not None:
+        yield status
@@ -0,0 +1,94 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+"""Microbenchmark of the vos listvldb parser.
+
+Compares the single-pass parser with the previous parser, which matched
+every pattern against every line, on a cell-wide listing.
+
+Usage: python -m tests.bench_vldb [entries]
+"""
+
+import re
+import sys
+import time
+
+from OpenAFSLibrary.vldb import parse_vldb
+
+
+def listing(count):
+    lines = []
+    for i in range(count):
+        rw = 536870912 + 3 * i
+        lines += [
+            "",
+            "vol.%d " % i,
+            "    RWrite: %d     ROnly: %d     Backup: %d " % (rw, rw + 1, rw + 2),
+            "    number of sites -> 2",
+            "       server 10.0.0.%d partition /vicepa RW Site " % (i % 8),
+            "       server 10.0.0.%d partition /vicepb RO Site " % (i % 8),
+        ]
+    return lines
+
+
+def split(lines):
+    entry = []
+    for line in lines:
+        if line.strip():
+            entry.append(line)
+        elif entry:
+            yield entry
+            entry = []
+    if entry:
+        yield entry
+
+
+def previous_parser(lines):
+    info = {"locked": False}
+    for line in lines:
+        m = re.search(r"^(\S+)", line)
+        if m:
+            info["name"] = m.group(1)
+        m = re.search(r"RWrite: (\d+)", line)
+        if m:
+            info["rw"] = m.group(1)
+        m = re.search(r"ROnly: (\d+)", line)
+        if m:
+            info["ro"] = m.group(1)
+        m = re.search(r"Backup: (\d+)", line)
+        if m:
+            info["bk"] = m.group(1)
+        m = re.match(r"\s+server (\S+) partition /vicep(\S+) RW Site", line)
+        if m:
+            info["server"] = m.group(1)
+            info["part"] = m.group(2)
+        m = re.match(r"\s+server (\S+) partition /vicep(\S+) RO Site", line)
+        if m:
+            info.setdefault("rosites", []).append((m.group(1), m.group(2)))
+        m = re.match(r"\s*Volume is currently LOCKED", line)
+        if m:
+            info["locked"] = True
+        m = re.match(r"\s*Volume is locked for a (\S+) operation", line)
+        if m:
+            info["op"] = m.group(1)
+    return info
+
+
+def timed(name, func, lines):
+    start = time.perf_counter()
+    count = len(func(lines))
+    elapsed = time.perf_counter() - start
+    print("%-10s %8d entries %8.3f s" % (name, count, elapsed))
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lines = listing(count)
+    before = timed("previous", lambda x: [previous_parser(e) for e in split(x)], lines)
+    after = timed("parse_vldb", lambda x: list(parse_vldb(x)), lines)
+    print("speedup    %.1fx" % (before / after))
+
+
+if __name__ == "__main__":
+    main()
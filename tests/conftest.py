@@ -1,12 +1,19 @@
 # Copyright (c) 2025, Sine Nomine Associates
 # See LICENSE
 
+import io
+import os
 import pytest
 
-from unittest.mock import Mock
+from unittest.mock import Mock, AsyncMock
 import OpenAFSLibrary.logger
 import OpenAFSLibrary.command
 import OpenAFSLibrary.variable
+import OpenAFSLibrary.keywords.volume
+import OpenAFSLibrary.registry
+from OpenAFSLibrary import simcell
+from OpenAFSLibrary.resolver import ServerResolver
+from OpenAFSLibrary.vldb import PartitionVolumeIds
 
 
 @pytest.fixture
@@ -41,6 +48,26 @@ def logged(monkeypatch):
     return captured
 
 
+@pytest.fixture(autouse=True)
+def command_state(monkeypatch):
+    """
+    Start each test without command observers, cached partition listings,
+    placement samples, resolved addresses, or registered resources.
+    """
+    monkeypatch.setattr(OpenAFSLibrary.command, "_observers", [])
+    monkeypatch.setattr(
+        OpenAFSLibrary.keywords.volume, "_partition_volume_ids", PartitionVolumeIds()
+    )
+    monkeypatch.setattr(
+        OpenAFSLibrary.keywords.volume,
+        "_placement",
+        OpenAFSLibrary.keywords.volume._Placement(),
+    )
+    monkeypatch.setattr(OpenAFSLibrary.keywords.volume, "_resolver", ServerResolver())
+    yield
+    OpenAFSLibrary.registry.registry.clear()
+
+
 @pytest.fixture
 def variables(monkeypatch):
     """
@@ -49,7 +76,16 @@ def variables(monkeypatch):
 
     Tests can preset variable values by setting keys in the returned dict.
     """
-    variables = {}
+
+    class Variables(dict):
+        # Forget the cached values when a test sets a variable.
+        def __setitem__(self, key, value):
+            dict.__setitem__(self, key, value)
+            OpenAFSLibrary.variable.clear_cache()
+
+    variables = Variables()
+    monkeypatch.setattr(OpenAFSLibrary.variable, "_cache", {})
+    monkeypatch.setattr(OpenAFSLibrary.variable, "_frozen", False)
 
     # Remove env vars which could interfere with tests.
     for name in OpenAFSLibrary.variable._default_value.keys():
@@ -63,6 +99,10 @@ def variables(monkeypatch):
         return rf_vars.get(name, None)
 
     monkeypatch.setattr(OpenAFSLibrary.variable._rf, "get_variable_value", gvv)
+
+    # Do not resolve command paths on the test host.
+    monkeypatch.setattr(OpenAFSLibrary.variable, "_tool_paths", {})
+    monkeypatch.setattr(OpenAFSLibrary.variable.shutil, "which", lambda cmd: None)
     return variables
 
 
@@ -101,9 +141,13 @@ def process(monkeypatch, variables):
         proc.args = None
         proc.returncode = code
         proc.expected_args = expected_args
-        proc.stdout = _l2b(stdout)
-        proc.stderr = _l2b(stderr)
-        proc.communicate = Mock(return_value=(proc.stdout, proc.stderr))
+        proc.output = _l2b(stdout)
+        proc.error = _l2b(stderr)
+        proc.stdout = io.BytesIO(proc.output)
+        proc.stderr = io.BytesIO(proc.error)
+        proc.communicate = Mock(return_value=(proc.output, proc.error))
+        proc.wait = Mock(return_value=code)
+        proc.poll = Mock(return_value=code)
         procs.append(proc)
         return proc
 
@@ -113,7 +157,64 @@ def process(monkeypatch, variables):
         if proc.expected_args is not None:
             assert args == proc.expected_args
         proc.args = args
+        proc.kwargs = kwargs
+        return proc
+
+    async def _create_subprocess_exec(*args, **kwargs):
+        proc = _popen(list(args), **kwargs)
+        proc.communicate = AsyncMock(return_value=(proc.output, proc.error))
+        return proc
+
+    async def _create_subprocess_shell(cmd, **kwargs):
+        proc = _popen(cmd, **kwargs)
+        proc.communicate = AsyncMock(return_value=(proc.output, proc.error))
         return proc
 
     monkeypatch.setattr(OpenAFSLibrary.command.subprocess, "Popen", _popen)
+    monkeypatch.setattr(
+        OpenAFSLibrary.command.asyncio,
+        "create_subprocess_exec",
+        _create_subprocess_exec,
+    )
+    monkeypatch.setattr(
+        OpenAFSLibrary.command.asyncio,
+        "create_subprocess_shell",
+        _create_subprocess_shell,
+    )
     return process
+
+
+@pytest.fixture
+def cell(request, variables):
+    """
+    Run the commands on a simulated cell for the duration of the test.
+
+    The cell has the fileservers afs1 and afs2, each with the partitions a
+    and b. Tests may give other SimulatedCell arguments with an indirect
+    parameter, for example:
+
+        @pytest.mark.parametrize("cell", [{"parts": ["a"]}], indirect=True)
+        def test_example(cell):
+            ...
+    """
+    kwargs = {"servers": ["afs1", "afs2"], "parts": ["a", "b"]}
+    kwargs.update(getattr(request, "param", {}))
+    yield simcell.start(**kwargs)
+    simcell.stop()
+
+
+@pytest.fixture
+def commands(cell, monkeypatch):
+    """
+    Record the commands run on the simulated cell as "tool subcommand"
+    strings, for example "vos release".
+    """
+    ran = []
+    run = cell.run
+
+    def recording_run(args, *rest, **kwargs):
+        ran.append("%s %s" % (os.path.basename(args[0]), args[1]))
+        return run(args, *rest, **kwargs)
+
+    monkeypatch.setattr(cell, "run", recording_run)
+    return ran
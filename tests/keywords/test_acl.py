@@ -2,6 +2,7 @@
 # See LICENSE
 
 import pytest
+import asyncio
 
 from OpenAFSLibrary.keywords.acl import (
     normalize,
@@ -9,6 +10,7 @@ from OpenAFSLibrary.keywords.acl import (
     AccessControlList,
     _ACLKeywords,
 )
+from OpenAFSLibrary.registry import registry
 
 
 @pytest.fixture
@@ -168,11 +170,25 @@ class Test_AccessControlList:
     ],
 )
 def test_add_access_rights__runs_fs_setacl(keywords, process, rights):
+    process(expected_args=["fs", "listacl", "/a/b/c"])
     proc = process()
     keywords.add_access_rights("/a/b/c", "myuser", rights)
     assert proc.args == ["fs", "setacl", "-dir", "/a/b/c", "-acl", "myuser", rights]
 
 
+def test_add_access_rights__registers_previous_rights(keywords, process):
+    process(
+        stdout=[
+            "Access list for /a/b/c is",
+            "Normal rights:",
+            "  myuser rl",
+        ]
+    )
+    process()
+    keywords.add_access_rights("/a/b/c", "myuser", "rlidwk")
+    assert registry.acls == {("/a/b/c", "myuser"): "rl"}
+
+
 def test_access_control_list_matches__succeeds__when__acls_match(
     keywords, process, tmp_path
 ):
@@ -293,3 +309,25 @@ def test_access_control_should_not_exist__fails__when__acls_are_present(
     )
     name = "user"
     keywords.access_control_should_exist(tmp_path, name)
+
+
+def test_add_access_rights_async__runs_fs_setacl(keywords, process):
+    process(expected_args=["fs", "listacl", "/a/b/c"])
+    proc = process()
+    asyncio.run(keywords.add_access_rights_async("/a/b/c", "myuser", "rl"))
+    assert proc.args == ["fs", "setacl", "-dir", "/a/b/c", "-acl", "myuser", "rl"]
+
+
+def test_access_control_list_matches_async__fails__when__acls_do_not_mactch(
+    keywords, process, tmp_path
+):
+    process(
+        stdout=[
+            f"Access list for {tmp_path}",
+            "Normal rights:",
+            "  bogus rlidwk",
+        ]
+    )
+    with pytest.raises(AssertionError) as e:
+        asyncio.run(keywords.access_control_list_matches_async(tmp_path, "user rl"))
+    assert "ACLs do not match" in str(e)
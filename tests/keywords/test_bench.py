@@ -0,0 +1,110 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import pytest
+
+from OpenAFSLibrary.command import vos
+from OpenAFSLibrary.keywords import bench
+from OpenAFSLibrary.keywords.bench import _BenchmarkKeywords, release_timings
+from OpenAFSLibrary.keywords.path import _PathKeywords
+from OpenAFSLibrary.registry import registry
+
+
+@pytest.fixture
+def create_files(cell, monkeypatch):
+    """Record the files created, and set the volume usage to match."""
+    calls = []
+
+    def create_files(self, path, count=1, size=0, depth=0, width=0, fill="zero"):
+        calls.append((path, count, size, depth, width, fill))
+        volume = cell.volumes[cell.mounts[path]]
+        volume.files = int(count)
+        volume.blocks = int(count) * int(size) // 1024
+
+    monkeypatch.setattr(_PathKeywords, "create_files", create_files)
+    return calls
+
+
+def test_benchmark_volume_move__moves_volume_between_sites(cell, create_files):
+    path = "/afs/example.com/bench"
+    results = _BenchmarkKeywords().benchmark_volume_move(
+        "bench", path, "afs1:a,afs2:b", moves=3, count=100, size=1048576
+    )
+    assert create_files == [(path, 100, 1048576, 0, 0, "zero")]
+    assert [(r["move"], r["from"], r["to"]) for r in results] == [
+        (1, "afs1:a", "afs2:b"),
+        (2, "afs2:b", "afs1:a"),
+        (3, "afs1:a", "afs2:b"),
+    ]
+    for row in results:
+        assert row["kbytes"] == 102400
+        assert row["files"] == 100
+        assert row["seconds"] >= 0
+        assert "Cloning source volume" in row["phases"]
+        assert "Deleting old volume on source server" in row["phases"]
+    assert "bench" not in cell.volumes
+    assert "bench" not in registry.volumes
+
+
+def test_benchmark_volume_move__fails__when_one_site(cell, create_files):
+    with pytest.raises(AssertionError, match="two sites"):
+        _BenchmarkKeywords().benchmark_volume_move(
+            "bench", "/afs/example.com/bench", "afs1:a"
+        )
+
+
+RELEASE = """\
+This is an incremental release of volume 536870918
+Re-cloning permanent RO volume 536870919 ... done
+Getting status of parent volume 536870918... done
+Updating existing ro volume 536870919 on 10.0.0.1 ...
+Starting ForwardMulti from 536870919 to 536870919 on 10.0.0.1 (as of Thu Oct  1 00:00:00 2026).
+Creating new volume 536870919 on replication site 10.0.0.2: done
+Starting ForwardMulti from 536870919 to 536870919 on 10.0.0.2 (entire volume).
+updating VLDB ... done
+Released volume test successfully
+"""
+
+
+def test_release_timings__times_each_site(monkeypatch):
+    ticks = iter(range(100))
+    monkeypatch.setattr(bench.time, "monotonic", lambda: next(ticks))
+    phases, sites = release_timings(RELEASE.splitlines())
+    assert phases == {
+        "Re-cloning permanent RO volume": 1,
+        "Getting status of parent volume": 1,
+    }
+    assert sites == {
+        "10.0.0.1": {"seconds": 2, "mode": "incremental"},
+        "10.0.0.2": {"seconds": 2, "mode": "full"},
+    }
+
+
+def test_release_volume_and_measure__times_each_ro_site(cell, commands):
+    volume = cell.create_volume("test", "afs1", "a")
+    volume.blocks = 2048
+    vos("addsite", "-server", "afs1", "-partition", "a", "-id", "test")
+    vos("addsite", "-server", "afs2", "-partition", "b", "-id", "test")
+    result = _BenchmarkKeywords().release_volume_and_measure("test")
+    assert result["force"] is False
+    assert "Re-cloning permanent RO volume" in result["phases"]
+    assert [
+        (s["server"], s["part"], s["mode"], s["kbytes"]) for s in result["sites"]
+    ] == [
+        ("10.0.0.1", "a", "full", 2048),
+        ("10.0.0.2", "b", "full", 2048),
+    ]
+    assert cell.volumes["test"].released
+    assert "vos listvol" not in commands
+    assert commands.count("vos examine") == 1
+    assert commands.index("vos examine") > commands.index("vos release")
+
+
+def test_release_volume_and_measure__compares_full_and_incremental(cell):
+    cell.create_volume("test", "afs1", "a")
+    vos("addsite", "-server", "afs2", "-partition", "a", "-id", "test")
+    vos("release", "test")
+    results = _BenchmarkKeywords().release_volume_and_measure("test", compare=True)
+    assert results["incremental"]["sites"][0]["mode"] == "incremental"
+    assert results["full"]["sites"][0]["mode"] == "full"
+    assert results["full"]["force"] is True
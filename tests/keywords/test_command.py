@@ -2,8 +2,12 @@
 # See LICENSE
 
 import pytest
+import sys
 
+from OpenAFSLibrary.command import NoSuchEntryError
 from OpenAFSLibrary.keywords.command import _CommandKeywords
+from OpenAFSLibrary.keywords.volume import _VolumeKeywords, get_volume_entry
+from OpenAFSLibrary.querycache import query_cache
 
 
 @pytest.fixture
@@ -16,10 +20,31 @@ def test_command_should_succeed__succeeds__when__exit_code_is_0(
 ):
     proc = process(stdout=["success"])
     keywords.command_should_succeed("command flag1 flag2")
-    assert proc.args == "command flag1 flag2"
+    assert proc.args == ["command", "flag1", "flag2"]
     assert "Output: success" in logged.info
 
 
+@pytest.mark.parametrize(
+    "cmd,expected",
+    [
+        ("command 'quoted arg'", ["command", "quoted arg"]),
+        ("command | grep x", "command | grep x"),
+        ("command > out", "command > out"),
+        ("command $HOME", "command $HOME"),
+        ("FOO=bar command", "FOO=bar command"),
+        ("command 'unbalanced", "command 'unbalanced"),
+        ("cd /tmp", "cd /tmp"),
+    ],
+)
+def test_command_should_succeed__uses_shell__when__metachars_are_present(
+    keywords, process, cmd, expected
+):
+    proc = process()
+    keywords.command_should_succeed(cmd)
+    assert proc.args == expected
+    assert proc.kwargs["shell"] is isinstance(expected, str)
+
+
 def test_command_should_succeed__raises_assertion_error__when__exit_code_is_1(
     keywords, process, logged
 ):
@@ -42,3 +67,80 @@ def test_command_should_fail__suceeds__when__exit_code_is_1(keywords, process, l
     process(code=1, stderr=["failed"])
     keywords.command_should_fail("command")
     assert "Code: 1" in logged.info
+
+
+def test_command_should_fail__succeeds__when__command_is_missing(keywords, logged):
+    keywords.command_should_fail("no-such-command arg")
+    assert "Code: 127" in logged.info
+
+
+def test_command_should_succeed__succeeds__when__command_is_shell_builtin(keywords):
+    keywords.command_should_succeed("exit 0")
+    keywords.command_should_succeed("cd /tmp")
+
+
+def test_command_should_succeed__raises_assertion_error__when__command_is_missing(
+    keywords,
+):
+    with pytest.raises(AssertionError, match="custom message"):
+        keywords.command_should_succeed("no-such-command arg", msg="custom message")
+
+
+def test_run_commands_in_parallel__returns_outputs__when__commands_succeed(
+    keywords, process
+):
+    process(stdout=["one"])
+    process(stdout=["two"])
+    got = keywords.run_commands_in_parallel("command one", "command two", max_workers=1)
+    assert got == ["one", "two"]
+
+
+def test_run_commands_in_parallel__raises_assertion_error__when__command_fails(
+    keywords, process, logged
+):
+    process(stdout=["one"])
+    process(code=1, stderr=["failed"])
+    with pytest.raises(AssertionError) as e:
+        keywords.run_commands_in_parallel("command one", "command two", max_workers=1)
+    assert "command two" in str(e.value)
+    assert "Error: failed" in logged.info
+
+
+def test_command_paths_should_be_valid__fails__when__command_is_missing(
+    keywords, variables, logged
+):
+    with pytest.raises(AssertionError) as e:
+        keywords.command_paths_should_be_valid("VOS")
+    assert "VOS: vos not found in PATH" in str(e.value)
+
+
+def test_command_paths_should_be_valid__succeeds__when__commands_are_found(
+    keywords, variables, tmp_path
+):
+    variables["VOS"] = sys.executable
+    keywords.command_paths_should_be_valid("VOS")
+
+
+def test_start_simulated_cell__runs_commands_on_the_simulated_cell(keywords, variables):
+    keywords.start_simulated_cell(servers="afs1,afs2", parts="a,b")
+    try:
+        keywords.command_should_succeed("vos listpart afs2")
+        keywords.command_should_fail("vos listpart afs3")
+    finally:
+        keywords.stop_simulated_cell()
+
+
+def test_command_should_succeed__invalidates_cached_queries__when__volume_is_removed(
+    keywords, variables
+):
+    keywords.start_simulated_cell(servers="afs1")
+    query_cache.enable()
+    try:
+        _VolumeKeywords().create_volume("t1", server="afs1")
+        assert get_volume_entry("t1").name == "t1"
+        keywords.command_should_succeed("vos remove -id t1")
+        with pytest.raises(NoSuchEntryError):
+            get_volume_entry("t1")
+    finally:
+        query_cache.disable()
+        keywords.stop_simulated_cell()
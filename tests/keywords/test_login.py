@@ -51,7 +51,7 @@ def test_akimpersonate___runs_aklog(process):
     proc = process()
     expected = "aklog -d -c example.com -k EXAMPLE.COM -keytab robot.keytab -principal user@EXAMPLE.COM"
     akimpersonate("user")
-    assert proc.args == expected
+    assert proc.args == expected.split()
 
 
 def test_akimpersonate__run_aklog_with_values__when__variable_are_set(
@@ -63,7 +63,7 @@ def test_akimpersonate__run_aklog_with_values__when__variable_are_set(
     variables["KRB_REALM"] = "v3"
     variables["KRB_AFS_KEYTAB"] = "v4"
     akimpersonate("user")
-    assert proc.args == "v1 -d -c v2 -k v3 -keytab v4 -principal user@v3"
+    assert proc.args == "v1 -d -c v2 -k v3 -keytab v4 -principal user@v3".split()
 
 
 def test_akimpersonate__raises_assertion_error__when__aklog_fails(process):
@@ -79,7 +79,7 @@ def test_login_with_password__runs_klog_krb5(process):
     )
     proc = process()
     login_with_password("user", "password")
-    assert proc.args == expected
+    assert proc.args == expected.split()
 
 
 def test_login_with_password__run_klog_krb5_with_values__when__variables_are_set(
@@ -90,7 +90,7 @@ def test_login_with_password__run_klog_krb5_with_values__when__variables_are_set
     variables["AFS_CELL"] = "v2"
     variables["KRB_REALM"] = "v3"
     login_with_password("user", "password")
-    assert proc.args == "v1 -principal user -password password -cell v2 -k v3"
+    assert proc.args == "v1 -principal user -password password -cell v2 -k v3".split()
 
 
 @pytest.mark.parametrize(
@@ -116,8 +116,8 @@ def test_login_with_keytab__runs_kinit_and_aklog(process, tmp_keytab):
     proc_kinit = process()
     proc_aklog = process()
     login_with_keytab("user", str(tmp_keytab))
-    assert proc_kinit.args == f"kinit -k -t {tmp_keytab} user@EXAMPLE.COM"
-    assert proc_aklog.args == "aklog -d -c example.com -k EXAMPLE.COM"
+    assert proc_kinit.args == ["kinit", "-k", "-t", str(tmp_keytab), "user@EXAMPLE.COM"]
+    assert proc_aklog.args == ["aklog", "-d", "-c", "example.com", "-k", "EXAMPLE.COM"]
 
 
 def test_login_with_keytab__specified_commands__when__variables_are_set(
@@ -130,8 +130,8 @@ def test_login_with_keytab__specified_commands__when__variables_are_set(
     variables["AFS_CELL"] = "v3"
     variables["KRB_REALM"] = "v4"
     login_with_keytab("user", str(tmp_keytab))
-    assert proc_kinit.args == f"v1 -k -t {tmp_keytab} user@v4"
-    assert proc_aklog.args == "v2 -d -c v3 -k v4"
+    assert proc_kinit.args == ["v1", "-k", "-t", str(tmp_keytab), "user@v4"]
+    assert proc_aklog.args == ["v2", "-d", "-c", "v3", "-k", "v4"]
 
 
 #
@@ -144,7 +144,7 @@ def test_login_with_akimpersonate(keywords, process, variables):
     proc = process(code=0)
     variables["AFS_AKIMPERSONATE"] = True
     keywords.login("user")
-    assert proc.args == expected
+    assert proc.args == expected.split()
 
 
 def test_login_with_password(keywords, process):
@@ -153,15 +153,15 @@ def test_login_with_password(keywords, process):
     )
     proc = process()
     keywords.login("user", password="password")
-    assert proc.args == expected
+    assert proc.args == expected.split()
 
 
 def test_login_with_keytab(keywords, process, tmp_keytab):
     proc_kinit = process()
     proc_aklog = process()
     keywords.login("user", keytab=str(tmp_keytab))
-    assert proc_kinit.args == f"kinit -k -t {tmp_keytab} user@EXAMPLE.COM"
-    assert proc_aklog.args == "aklog -d -c example.com -k EXAMPLE.COM"
+    assert proc_kinit.args == ["kinit", "-k", "-t", str(tmp_keytab), "user@EXAMPLE.COM"]
+    assert proc_aklog.args == ["aklog", "-d", "-c", "example.com", "-k", "EXAMPLE.COM"]
 
 
 def test_login__raises_value_error__when__args_are_missing(keywords):
@@ -175,8 +175,9 @@ def test_logout__runs_kdestroy_and_unlog(keywords, process):
     proc_kdestroy = process()
     proc_unlog = process()
     keywords.logout()
-    assert proc_kdestroy.args == "KRB5CCNAME=/tmp/afsrobot.krb5cc kdestroy"
-    assert proc_unlog.args == "unlog"
+    assert proc_kdestroy.args == ["kdestroy"]
+    assert proc_kdestroy.kwargs["env"]["KRB5CCNAME"] == "/tmp/afsrobot.krb5cc"
+    assert proc_unlog.args == ["unlog"]
 
 
 def test_logout__runs_commands__when__variables_are_set(keywords, process, variables):
@@ -186,8 +187,9 @@ def test_logout__runs_commands__when__variables_are_set(keywords, process, varia
     variables["KDESTROY"] = "v1"
     variables["UNLOG"] = "v2"
     keywords.logout()
-    assert proc_kdestroy.args == "KRB5CCNAME=/tmp/afsrobot.krb5cc v1"
-    assert proc_unlog.args == "v2"
+    assert proc_kdestroy.args == ["v1"]
+    assert proc_kdestroy.kwargs["env"]["KRB5CCNAME"] == "/tmp/afsrobot.krb5cc"
+    assert proc_unlog.args == ["v2"]
 
 
 def test_logout__runs_unlog__when__akimperonate_variable_is_true(
@@ -196,4 +198,4 @@ def test_logout__runs_unlog__when__akimperonate_variable_is_true(
     proc_unlog = process()
     variables["AFS_AKIMPERSONATE"] = True
     keywords.logout()
-    assert proc_unlog.args == "unlog"
+    assert proc_unlog.args == ["unlog"]
@@ -0,0 +1,49 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import json
+import pytest
+
+from OpenAFSLibrary.command import vos
+from OpenAFSLibrary.keywords.metrics import _MetricsKeywords
+
+
+@pytest.fixture
+def keywords():
+    keywords = _MetricsKeywords()
+    keywords.reset_command_metrics()
+    yield keywords
+    keywords.reset_command_metrics()
+
+
+def test_get_command_metrics__returns_timings__when__commands_are_run(
+    keywords, process
+):
+    process(stdout=["one"])
+    process(stdout=["two"])
+    vos("listvldb", "-name", "one")
+    vos("listvldb", "-name", "two")
+    stats = keywords.get_command_metrics()
+    assert len(stats) == 1
+    assert stats[0]["tag"] == "vos listvldb"
+    assert stats[0]["count"] == 2
+
+
+@pytest.mark.parametrize("format", ["json", "csv"])
+def test_write_command_metrics__writes_file(keywords, process, tmp_path, format):
+    process()
+    vos("listpart", "fs1")
+    path = tmp_path / ("metrics." + format)
+    keywords.write_command_metrics(str(path), format=format)
+    text = path.read_text()
+    if format == "json":
+        assert json.loads(text)[0]["tag"] == "vos listpart"
+    else:
+        assert "vos listpart,1," in text
+
+
+def test_write_command_metrics__raises_value_error__when__format_is_invalid(
+    keywords, tmp_path
+):
+    with pytest.raises(ValueError):
+        keywords.write_command_metrics(str(tmp_path / "x"), format="xml")
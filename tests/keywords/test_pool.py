@@ -0,0 +1,131 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import pytest
+
+from OpenAFSLibrary import simcell
+from OpenAFSLibrary.keywords import pool
+from OpenAFSLibrary.keywords.pool import _PoolKeywords
+from OpenAFSLibrary.registry import registry
+
+
+@pytest.fixture
+def keywords(cell):
+    keywords = _PoolKeywords()
+    yield keywords
+    keywords.destroy_volume_pool()
+
+
+def pool_volumes(cell):
+    return sorted(name for name in cell.volumes if name.startswith("pool."))
+
+
+def test_create_volume_pool__fills_pool_per_server(keywords, cell):
+    keywords.create_volume_pool(size=3, servers="afs1,afs2")
+    keywords.wait_for_volume_pool(timeout=5)
+    assert len(pool_volumes(cell)) == 6
+
+
+def test_checkout_volume__renames_and_mounts_pool_volume(keywords, cell):
+    keywords.create_volume_pool(size=2, low=1, servers="afs1")
+    keywords.wait_for_volume_pool(timeout=5)
+    vid = keywords.checkout_volume("test", path="/afs/example.com/test")
+    assert cell.volumes["test"].rw == int(vid)
+    assert cell.mounts["/afs/example.com/test"] == "test"
+    assert "test" in registry.volumes
+    keywords.wait_for_volume_pool(timeout=5)
+    assert len(pool_volumes(cell)) == 1  # Refilled below the low watermark only.
+    keywords.checkout_volume("test2")
+    keywords.wait_for_volume_pool(timeout=5)
+    assert len(pool_volumes(cell)) == 2
+
+
+def test_checkout_volume__creates_volume__when__pool_is_empty(keywords, cell):
+    keywords.create_volume_pool(size=0, low=0, servers="afs1")
+    vid = keywords.checkout_volume("test")
+    assert cell.volumes["test"].rw == int(vid)
+
+
+def test_return_volume__recycles_volume(keywords, cell, commands):
+    keywords.create_volume_pool(size=4, low=0, servers="afs1")
+    keywords.wait_for_volume_pool(timeout=5)
+    vid = keywords.checkout_volume("test", path="/afs/example.com/test")
+    keywords.checkout_volume("test2")
+    keywords.checkout_volume("test3")
+    cell.volumes["test"].blocks = 1000
+    cell.volumes["test"].files = 10
+    keywords.return_volume("test")
+    assert "/afs/example.com/test" not in cell.mounts
+    assert "test" not in cell.volumes
+    volume = cell.ids[int(vid)]
+    assert volume.name.startswith("pool.")
+    assert (volume.blocks, volume.files) == (simcell.VOLUME_BLOCKS, 1)
+    assert len(pool_volumes(cell)) == 3  # Including the dumped blank volume.
+    keywords.return_volume("test2")
+    assert len(pool_volumes(cell)) == 4
+    assert commands.count("vos dump") == 1
+    assert commands.count("vos restore") == 2
+
+
+def test_return_volume__removes_volume__when__not_recycled(keywords, cell):
+    keywords.create_volume_pool(size=1, low=0, servers="afs1")
+    keywords.wait_for_volume_pool(timeout=5)
+    vid = keywords.checkout_volume("test")
+    keywords.return_volume("test", recycle=False)
+    assert int(vid) not in cell.ids
+    assert "test" not in registry.volumes
+
+
+def test_return_volume__fails__when__volume_not_checked_out(keywords, cell):
+    keywords.create_volume_pool(size=0, low=0, servers="afs1")
+    with pytest.raises(AssertionError, match="not checked out"):
+        keywords.return_volume("test")
+
+
+def test_destroy_volume_pool__removes_available_volumes(keywords, cell):
+    keywords.create_volume_pool(size=2, servers="afs1,afs2")
+    keywords.wait_for_volume_pool(timeout=5)
+    keywords.destroy_volume_pool()
+    assert pool_volumes(cell) == []
+    assert len(registry) == 0
+
+
+def test_create_volume_pool__keeps_filling__when__create_raises(
+    keywords, cell, monkeypatch
+):
+    create = pool._create_volume
+    calls = []
+
+    def flaky_create(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise AssertionError("Failed to parse created volume id")
+        return create(*args)
+
+    monkeypatch.setattr(pool, "RETRY_DELAY", 0)
+    monkeypatch.setattr(pool, "_create_volume", flaky_create)
+    keywords.create_volume_pool(size=2, servers="afs1")
+    keywords.wait_for_volume_pool(timeout=5)
+    assert len(pool_volumes(cell)) == 2
+    assert pool._pool.errors == 1
+
+
+def test_wait_for_volume_pool__reports_last_error__when__creates_fail(
+    keywords, cell, monkeypatch
+):
+    def missing_vos(*args):
+        raise FileNotFoundError("No such file or directory: 'vos'")
+
+    monkeypatch.setattr(pool, "RETRY_DELAY", 0.01)
+    monkeypatch.setattr(pool, "_create_volume", missing_vos)
+    keywords.create_volume_pool(size=1, servers="afs1")
+    with pytest.raises(AssertionError, match="last error: No such file"):
+        keywords.wait_for_volume_pool(timeout=0.2)
+    with pytest.raises(AssertionError, match="last error: No such file"):
+        keywords.checkout_volume("test")
+
+
+def test_checkout_volume__fails__when__server_not_in_pool(keywords, cell):
+    keywords.create_volume_pool(size=0, low=0, servers="afs1")
+    with pytest.raises(AssertionError, match="'afs2' is not in the volume pool"):
+        keywords.checkout_volume("test", server="afs2")
@@ -2,16 +2,34 @@
 # See LICENSE
 
 import pytest
+import asyncio
+import collections
+import threading
+import time
 
 from unittest.mock import Mock
+from OpenAFSLibrary import simcell
+from OpenAFSLibrary.keywords import volume
+from OpenAFSLibrary.keywords.acl import _ACLKeywords
+from OpenAFSLibrary.registry import registry
+from OpenAFSLibrary.vldb import VolumeEntry
 from OpenAFSLibrary.keywords.volume import (
     socket,
     examine_path,
     get_volume_entry,
     get_parts,
     release_parent,
+    lookup_volume_entry,
+    phase_timings,
+    unload_vldb_snapshot,
+    fs,
+    vos,
+    volume_batch,
+    zap_sweep,
+    _parse_partinfo,
     _zap_volume,
     _VolumeKeywords,
+    NoSuchEntryError,
 )
 
 
@@ -47,15 +65,12 @@ def test_examine_path__parses_fs_examine_output(process):
 
 def test_get_volume_entry__parses_vos_listvldb_output(process):
     name = "public"
-    expected = {
-        "locked": False,
-        "name": f"{name}",
-        "rw": "536871326",
-        "ro": "536871327",
-        "server": "198.44.193.47",
-        "part": "a",
-        "rosites": [("198.44.193.51", "b"), ("198.44.193.47", "a")],
-    }
+    expected = VolumeEntry(name)
+    expected.rw = 536871326
+    expected.ro = 536871327
+    expected.server = "198.44.193.47"
+    expected.part = "a"
+    expected.rosites = [("198.44.193.51", "b"), ("198.44.193.47", "a")]
     process(
         expected_args=[
             "vos",
@@ -203,6 +218,51 @@ def test_create_volume__creates_volume__when__default_args_given(
     assert got == volid
 
 
+def test_create_volume_async__creates_volume__when__default_args_given(
+    keywords, process, monkeypatch
+):
+    name = "test"
+    hostname = "fs1.example.org"
+    volid = "536882946"
+    monkeypatch.setattr(socket, "gethostname", Mock(return_value=hostname))
+    proc = process(
+        stdout=[f"Volume {volid} created on partition /vicepa of {hostname}"],
+    )
+    got = asyncio.run(keywords.create_volume_async(name))
+    assert got == volid
+    assert proc.args[0:2] == ["vos", "create"]
+
+
+def test_remove_volume_async__removes_ro_sites__when__present(keywords, process):
+    name = "test"
+    process(
+        stdout=[
+            "",
+            f"{name} ",
+            "    RWrite: 536874630     ROnly: 536874631",
+            "    number of sites -> 2",
+            "       server 198.44.193.51 partition /vicepa RW Site ",
+            "       server 198.44.193.51 partition /vicepa RO Site ",
+        ],
+    )
+    ro = process()
+    rw = process()
+    checkvolumes = process()
+    asyncio.run(keywords.remove_volume_async(name))
+    assert ro.args == [
+        "vos",
+        "remove",
+        "-server",
+        "198.44.193.51",
+        "-part",
+        "a",
+        "-id",
+        "test.readonly",
+    ]
+    assert rw.args == ["vos", "remove", "-id", name]
+    assert checkvolumes.args == ["fs", "checkvolumes"]
+
+
 def test_remove_volume__deletes_volume__when__present(keywords, process):
     print()
     name = "test"
@@ -266,6 +326,14 @@ def test_volume_location_matches__succeeds__when__volume_resides_on_given_site(
     volid = "536871188"
     monkeypatch.setattr(socket, "gethostbyname", Mock(return_value=address))
 
+    process(
+        expected_args=["vos", "listaddrs", "-printuuid", "-noresolve", "-noauth"],
+        stdout=[
+            "UUID: 0027b6b2-bd93-1d77-b3-77-860be30aaa77",
+            address,
+            "",
+        ],
+    )
     process(
         expected_args=[
             "vos",
@@ -384,3 +452,371 @@ def test_get_volume_id__returns_volume_id(keywords, process):
     )
     got = keywords.get_volume_id(name)
     assert got == volid
+
+
+@pytest.fixture
+def snapshot(process):
+    def _snapshot(*names):
+        stdout = []
+        for i, name in enumerate(names):
+            rw = 536871188 + 3 * i
+            stdout += [
+                "",
+                f"{name} ",
+                f"    RWrite: {rw}     ROnly: {rw + 1} ",
+                "    number of sites -> 2",
+                "       server 198.44.193.47 partition /vicepb RW Site ",
+                "       server 198.44.193.47 partition /vicepb RO Site ",
+            ]
+        return process(
+            expected_args=["vos", "listvldb", "-quiet", "-noresolve", "-noauth"],
+            stdout=stdout,
+        )
+
+    yield _snapshot
+    unload_vldb_snapshot()
+
+
+def test_load_vldb_snapshot__answers_lookups_from_the_snapshot(
+    keywords, process, snapshot
+):
+    snapshot("test.1", "test.2", "other")
+    assert keywords.load_vldb_snapshot() == 3
+    assert keywords.get_volume_id("test.2") == "536871191"
+    assert keywords.get_volume_id("536871195") == "536871194"
+    keywords.volume_should_be_unlocked("other")
+    keywords.volume_should_not_exist("missing")
+    assert keywords.get_volume_names_with_prefix("test.") == ["test.1", "test.2"]
+    with pytest.raises(NoSuchEntryError):
+        lookup_volume_entry("missing")
+
+
+def test_load_vldb_snapshot__looks_up_entries_again__when__vos_changes_the_vldb(
+    keywords, process, snapshot
+):
+    snapshot("test.1", "test.2")
+    keywords.load_vldb_snapshot()
+    process(expected_args=["vos", "remove", "-id", "test.1"])
+    vos("remove", "-id", "test.1")
+    listvldb = ["-quiet", "-noresolve", "-noauth"]
+    process(
+        expected_args=["vos", "listvldb", "-name", "test.1"] + listvldb,
+        code=1,
+        stderr=["VLDB: no such entry"],
+    )
+    keywords.volume_should_not_exist("test.1")
+    process(
+        expected_args=["vos", "listvldb", "-name", "test.2"] + listvldb,
+        stdout=[
+            "",
+            "test.2 ",
+            "    RWrite: 536871300 ",
+            "    number of sites -> 1",
+            "       server 198.44.193.47 partition /vicepa RW Site ",
+        ],
+    )
+    assert keywords.get_volume_id("test.2") == "536871300"
+    # The updated entries are current until the VLDB is changed again.
+    assert keywords.get_volume_id("test.2") == "536871300"
+    assert keywords.get_volume_id("536871300") == "536871300"
+    keywords.volume_should_not_exist("test.1")
+    keywords.volume_should_not_exist("536871188")
+
+
+def test_lookup_volume_entry__updates_snapshot__when__vos_changes_the_vldb(
+    keywords, cell, commands
+):
+    keywords.load_vldb_snapshot()
+    snapshot = volume._snapshot
+    for i in range(3):
+        name = "test.%d" % i
+        keywords.create_volume(name, server="afs1", part="a")
+        keywords.volume_should_be_unlocked(name)
+        keywords.get_volume_id(name)
+    assert commands.count("vos listvldb") == 4  # The snapshot and each volume.
+    assert volume._snapshot is snapshot
+    assert len(snapshot) == 5
+    assert keywords.refresh_vldb_snapshot() == 5
+
+
+def test_unload_vldb_snapshot__looks_up_entries_with_listvldb(
+    keywords, process, snapshot
+):
+    snapshot("test")
+    keywords.load_vldb_snapshot()
+    keywords.unload_vldb_snapshot()
+    process(
+        expected_args=[
+            "vos",
+            "listvldb",
+            "-name",
+            "test",
+            "-quiet",
+            "-noresolve",
+            "-noauth",
+        ],
+        stdout=["", "test ", "    RWrite: 536871100 ", "    number of sites -> 0"],
+    )
+    assert keywords.get_volume_id("test") == "536871100"
+
+
+def test_volume_location_matches__succeeds__when__server_is_multihomed(
+    keywords, cell, monkeypatch
+):
+    cell.add_server("afs3", parts=["a"], aliases=["192.168.1.3"])
+    cell.create_volume("test", "afs3", "a")
+    vos("addsite", "-server", "afs3", "-partition", "a", "-id", "test")
+    vos("release", "-id", "test")
+    gethostbyname = Mock(return_value="192.168.1.3")
+    monkeypatch.setattr(socket, "gethostbyname", gethostbyname)
+    keywords.volume_location_matches("test", "afs3-b", "a")
+    keywords.volume_location_matches("test", "afs3-b", "a", vtype="ro")
+    keywords.volume_location_matches("test", "192.168.1.3", "a")
+    assert gethostbyname.call_count == 1
+    with pytest.raises(AssertionError, match="does not match"):
+        keywords.volume_location_matches("test", "afs3-b", "b")
+
+
+def test_phase_timings__adds_repeated_phases():
+    phases = phase_timings(
+        [
+            "Starting transaction on source volume 536870918 ... done",
+            "Cloning source volume 536870918 ... done",
+            "Starting transaction on source volume 536870918 ... done",
+            "Volume 536870918 moved from 10.0.0.1 /vicepa to 10.0.0.2 /vicepa",
+        ]
+    )
+    assert list(phases) == [
+        "Starting transaction on source volume",
+        "Cloning source volume",
+    ]
+
+
+def test_move_volume__moves_volume_and_updates_registry(keywords, cell):
+    keywords.create_volume("test", server="afs1", part="a")
+    vos("backup", "test")
+    phases = keywords.move_volume("test", "afs1", "a", "afs2", "b")
+    assert "Dumping from clone on source to volume on destination" in phases
+    volume = cell.volumes["test"]
+    assert (volume.server, volume.part, volume.bk) == ("10.0.0.2", "b", None)
+    assert registry.volumes["test"][1:] == ("afs2", "b")
+    keywords.volume_location_matches("test", "10.0.0.2", "b")
+
+
+def test_create_volumes__spreads_volumes_over_servers_and_partitions(keywords, cell):
+    vids = keywords.create_volumes("test.{:02d}", count=8, servers="afs1,afs2")
+    assert len(set(vids)) == 8
+    assert keywords.get_volume_id("test.01") == vids[0]
+    for (address, part), volumes in cell.partitions.items():
+        names = [n for n in volumes.values() if n.startswith("test.")]
+        assert len(names) == 2
+
+
+def test_create_volumes__uses_afs_fileservers__when__servers_not_given(
+    keywords, cell, variables
+):
+    variables["AFS_FILESERVERS"] = "afs2"
+    vids = keywords.create_volumes("x", "y", parts="b")
+    assert len(vids) == 2
+    assert set(cell.partitions[(cell.addresses["afs2"], "b")]) >= {int(v) for v in vids}
+
+
+@pytest.fixture
+def peaks(cell, monkeypatch):
+    """
+    Record the peak number of concurrent commands run on the simulated cell
+    for each subcommand and server, e.g. peaks[("create", "afs1")].
+    """
+    lock = threading.Lock()
+    running = collections.Counter()
+    peaks = collections.Counter()
+    run = cell.run
+
+    def tracking_run(args, *rest, **kwargs):
+        if "-server" not in args:
+            return run(args, *rest, **kwargs)
+        key = (args[1], args[args.index("-server") + 1])
+        with lock:
+            running[key] += 1
+            peaks[key] = max(peaks[key], running[key])
+        time.sleep(0.01)
+        try:
+            return run(args, *rest, **kwargs)
+        finally:
+            with lock:
+                running[key] -= 1
+
+    monkeypatch.setattr(cell, "run", tracking_run)
+    return peaks
+
+
+def test_create_volumes__limits_concurrent_creates_per_server(keywords, cell, peaks):
+    keywords.create_volumes("test", count=20, servers="afs1,afs2", max_per_server=3)
+    assert 1 <= peaks[("create", "afs1")] <= 3
+    assert 1 <= peaks[("create", "afs2")] <= 3
+
+
+def test_create_volumes__mounts_volumes_and_releases_parent_once(
+    keywords, cell, commands
+):
+    vos("addsite", "-server", "afs1", "-partition", "a", "-id", "root.cell")
+    vos("release", "root.cell")
+    del commands[:]
+    keywords.create_volumes("test", count=3, path="/afs/example.com", servers="afs1")
+    assert sorted(cell.mounts)[-3:] == [
+        "/afs/example.com/test.1",
+        "/afs/example.com/test.2",
+        "/afs/example.com/test.3",
+    ]
+    assert commands.count("vos release") == 1
+
+
+def test_volume_batch__releases_each_parent_once(keywords, cell, commands):
+    vos("addsite", "-server", "afs1", "-partition", "a", "-id", "root.cell")
+    vos("release", "root.cell")
+    del commands[:]
+    keywords.begin_volume_batch()
+    for name in ("a", "b", "c"):
+        keywords.create_volume(name, server="afs1", path="/afs/example.com/" + name)
+    keywords.remove_volume("c")
+    assert "vos release" not in commands
+    assert "fs checkvolumes" not in commands
+    keywords.end_volume_batch()
+    assert commands.count("vos release") == 1
+    assert commands.count("fs checkvolumes") == 1
+    assert commands[-1] == "fs checkvolumes"
+
+
+def test_volume_batch__releases__when__outermost_batch_ends(keywords, cell, commands):
+    vos("addsite", "-server", "afs1", "-partition", "a", "-id", "root.cell")
+    with volume_batch():
+        with volume_batch():
+            keywords.create_volume("a", server="afs1", path="/afs/example.com/a")
+        assert "vos release" not in commands[1:]
+    assert commands.count("vos release") == 1
+
+
+def test_end_volume_batch__fails__when__batch_not_started(keywords):
+    with pytest.raises(AssertionError, match="No volume batch"):
+        keywords.end_volume_batch()
+
+
+def test_remove_all_created_resources__removes_resources_in_parallel(
+    keywords, cell, commands
+):
+    vos("addsite", "-server", "afs1", "-partition", "a", "-id", "root.cell")
+    vos("release", "root.cell")
+    keywords.create_volumes(
+        "test", count=6, servers="afs1,afs2", path="/afs/example.com", ro=True
+    )
+    keywords.create_volume("orphan", server="afs2", part="b", orphan=True)
+    keywords.mount_volume("/afs/example.com/again", "test.1")
+    _ACLKeywords().add_access_rights("/afs/example.com", "user1", "rl")
+    keywords.remove_volume("test.6")
+    del commands[:]
+
+    keywords.remove_all_created_resources()
+
+    assert sorted(cell.volumes) == ["root.afs", "root.cell"]
+    assert sorted(cell.mounts) == ["/afs", "/afs/example.com"]
+    assert "user1" not in cell.acls["/afs/example.com"]
+    volumes = [v for sites in cell.partitions.values() for v in sites.values()]
+    assert "orphan" not in volumes
+    # Each volume, the orphan by id and by name, and the parent.
+    assert commands.count("vos listvldb") == 8
+    assert commands.count("vos release") == 1
+    assert commands.count("fs checkvolumes") == 1
+    assert commands.count("vos zap") == 1
+    keywords.remove_all_created_resources()
+
+
+def test_remove_all_created_resources__lists_vldb_once__when__many_volumes(
+    keywords, cell, commands, monkeypatch
+):
+    monkeypatch.setattr(volume, "MAX_LOOKUPS", 2)
+    keywords.create_volumes("test", count=3, servers="afs1,afs2")
+    keywords.create_volume("orphan", server="afs2", part="b", orphan=True)
+    del commands[:]
+    keywords.remove_all_created_resources()
+    assert sorted(cell.volumes) == ["root.afs", "root.cell"]
+    assert commands.count("vos listvldb") == 1
+    assert commands.count("vos zap") == 1
+
+
+def test_remove_all_created_resources__restores_previous_acl_rights(keywords, cell):
+    acls = _ACLKeywords()
+    fs("setacl", "-dir", "/afs/example.com", "-acl", "system:anyuser", "rl")
+    acls.add_access_rights("/afs/example.com", "system:anyuser", "rlidwk")
+    acls.add_access_rights("/afs/example.com", "system:anyuser", "rlk")
+    acls.add_access_rights("/afs/example.com", "user1", "rl")
+    keywords.remove_all_created_resources()
+    acl = cell.acls["/afs/example.com"]
+    assert acl["system:anyuser"] == ("rl", "")
+    assert "user1" not in acl
+
+
+def test_remove_all_created_resources__fails__when__a_remove_fails(keywords, cell):
+    keywords.create_volumes("test", count=2, servers="afs1")
+    cell.inject_error("vos remove", error="server busy")
+    with pytest.raises(AssertionError, match="Failed to remove 1 created resources"):
+        keywords.remove_all_created_resources()
+    assert len(cell.volumes) == 3
+
+
+def test_remove_volume__zaps_partitions_of_all_servers__and__reports_sites(
+    keywords, cell, commands
+):
+    vid = keywords.create_volume("test", server="afs2", part="b", orphan=True)
+    del commands[:]
+    zapped = keywords.remove_volume(vid, server="afs1,afs2", zap=True)
+    assert zapped == [("afs2", "b")]
+    assert commands.count("vos zap") == 4
+    assert commands.count("vos listpart") == 2
+
+
+def test_remove_volume_async__zaps_partitions_of_all_servers(keywords, cell):
+    vid = keywords.create_volume("test", server="afs1", part="a", orphan=True)
+    zapped = asyncio.run(
+        keywords.remove_volume_async(vid, server="afs1,afs2", zap=True)
+    )
+    assert zapped == [("afs1", "a")]
+
+
+def test_zap_sweep__limits_concurrent_zaps_per_server(cell, peaks):
+    cell.add_server("afs3", parts="abcdefgh")
+    assert zap_sweep("536999999", ["afs3"], max_per_server=2) == []
+    assert peaks[("zap", "afs3")] == 2
+
+
+def test_parse_partinfo__parses_vos_partinfo_output():
+    lines = [
+        "Free space on partition /vicepa: 26210168 K blocks out of total 26210816",
+        "Free space on partition /vicepb: 100 K blocks out of total 200",
+    ]
+    assert _parse_partinfo(lines) == {"a": (26210168, 26210816), "b": (100, 200)}
+
+
+def test_create_volume__places_volumes_by_free_space__when__auto(
+    keywords, cell, commands, variables
+):
+    variables["AFS_FILESERVERS"] = "afs1,afs2"
+    cell.sizes[(cell.addresses["afs2"], "b")] = 2 * simcell.PARTITION_BLOCKS
+    keywords.create_volume("big", server="auto", part="auto")
+    assert cell.volumes["big"].server == cell.addresses["afs2"]
+    assert cell.volumes["big"].part == "b"
+    for i in range(8):
+        keywords.create_volume("v%d" % i, server="auto", part="auto", quota="1000")
+    assert commands.count("vos partinfo") == 2  # Sampled once per server.
+    sites = {(v.server, v.part) for v in cell.volumes.values() if v.quota}
+    assert sites == {
+        (cell.addresses["afs2"], "b")
+    }  # The large partition still has the most free space.
+
+
+def test_create_volume__spreads_volumes_over_partitions__when__part_is_auto(
+    keywords, cell
+):
+    for i in range(4):
+        keywords.create_volume("v%d" % i, server="afs1", part="auto")
+    parts = sorted(cell.volumes["v%d" % i].part for i in range(4))
+    assert parts == ["a", "a", "b", "b"]
@@ -0,0 +1,121 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import pytest
+
+from OpenAFSLibrary.command import NoSuchEntryError, vos
+from OpenAFSLibrary.keywords import wait
+from OpenAFSLibrary.keywords.wait import _WaitKeywords
+from OpenAFSLibrary.metrics import command_metrics
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Run a queue of actions in place of the backoff sleeps."""
+    actions = []
+    delays = []
+
+    def sleep(seconds):
+        delays.append(seconds)
+        if actions:
+            actions.pop(0)()
+
+    monkeypatch.setattr(wait.time, "sleep", sleep)
+    command_metrics.reset()
+    yield actions, delays
+    command_metrics.reset()
+
+
+def tags():
+    return {s["tag"]: s["count"] for s in command_metrics.summary()}
+
+
+def test_wait_for_volume_unlocked__returns__when_unlocked(cell, sleeps):
+    actions, delays = sleeps
+    cell.create_volume("test", "afs1", "a")
+    vos("lock", "-id", "test")
+    actions.append(lambda: None)
+    actions.append(lambda: vos("unlock", "-id", "test"))
+    _WaitKeywords().wait_for_volume_unlocked("test")
+    assert len(delays) == 2
+    assert delays[0] <= wait.INITIAL_DELAY
+    assert delays[1] <= 2 * wait.INITIAL_DELAY
+    assert tags()["wait unlocked"] == 1
+
+
+def test_wait_for_volume_unlocked__looks_up_each_volume(cell, sleeps, commands):
+    actions, delays = sleeps
+    for name in ("a1", "a2", "a3"):
+        cell.create_volume(name, "afs1", "a")
+        vos("lock", "-id", name)
+    actions.append(lambda: [vos("unlock", "-id", n) for n in ("a1", "a2", "a3")])
+    commands.clear()
+    _WaitKeywords().wait_for_volume_unlocked("a1", "a2", "a3")
+    assert commands.count("vos listvldb") == 6  # Each volume, twice.
+    assert tags()["wait unlocked"] == 3
+
+
+def test_wait_for_volume_unlocked__lists_vldb_once__when__many_volumes(
+    cell, sleeps, commands, monkeypatch
+):
+    actions, delays = sleeps
+    monkeypatch.setattr(wait, "MAX_LOOKUPS", 2)
+    for name in ("a1", "a2", "a3"):
+        cell.create_volume(name, "afs1", "a")
+        vos("lock", "-id", name)
+    actions.append(lambda: [vos("unlock", "-id", n) for n in ("a1", "a2", "a3")])
+    commands.clear()
+    _WaitKeywords().wait_for_volume_unlocked("a1", "a2", "a3")
+    assert commands.count("vos listvldb") == 2
+
+
+def test_wait_for_volume_unlocked__fails_at_once__when__volume_is_missing(cell, sleeps):
+    actions, delays = sleeps
+    with pytest.raises(NoSuchEntryError):
+        _WaitKeywords().wait_for_volume_unlocked("missing")
+    assert delays == []
+
+
+def test_wait_for_volume_unlocked__fails__when_timed_out(cell, sleeps):
+    cell.create_volume("test", "afs1", "a")
+    vos("lock", "-id", "test")
+    with pytest.raises(AssertionError, match="volume unlocked: test"):
+        _WaitKeywords().wait_for_volume_unlocked("test", timeout=0)
+
+
+def test_wait_for_release_complete__returns__when_released(cell, sleeps, commands):
+    actions, delays = sleeps
+    volume = cell.create_volume("test", "afs1", "a")
+    vos("addsite", "-server", "afs2", "-partition", "a", "-id", "test")
+    vos("release", "-id", "test")
+    volume.updated += 10  # The read-write volume changed since the release.
+    actions.append(lambda: vos("release", "-id", "test"))
+    _WaitKeywords().wait_for_release_complete("test")
+    assert len(delays) == 1
+    assert "vos listvol" not in commands
+    assert commands.count("vos examine") == 4  # The RW and RO, twice.
+    assert tags()["wait release"] == 1
+
+
+def test_wait_for_release_complete__fails__when_no_ro_sites(cell, sleeps):
+    cell.create_volume("test", "afs1", "a")
+    with pytest.raises(AssertionError, match="no read-only sites"):
+        _WaitKeywords().wait_for_release_complete("test")
+
+
+def test_wait_for_volume_online__returns__when_online(cell, sleeps):
+    actions, delays = sleeps
+    cell.create_volume("test", "afs1", "a")
+    cell.create_volume("test2", "afs2", "a")
+    vos("offline", "-id", "test")
+    actions.append(lambda: vos("online", "-id", "test"))
+    _WaitKeywords().wait_for_volume_online("test", "test2")
+    assert len(delays) == 1
+    assert tags()["wait online"] == 2
+
+
+def test_wait_for_volume_online__fails__when_timed_out(cell, sleeps):
+    cell.create_volume("test", "afs1", "a")
+    vos("offline", "-id", "test")
+    with pytest.raises(AssertionError, match="volume online: test"):
+        _WaitKeywords().wait_for_volume_online("test", timeout=0)
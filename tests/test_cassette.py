@@ -0,0 +1,79 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import pytest
+import sys
+
+from OpenAFSLibrary import cassette
+from OpenAFSLibrary.cassette import CassetteError
+from OpenAFSLibrary.command import run_program, vos, vos_lines, NoSuchEntryError
+import OpenAFSLibrary.command
+
+
+@pytest.fixture
+def tape(tmp_path):
+    yield tmp_path / "commands.jsonl"
+    cassette.stop_recording()
+    cassette.stop_replay()
+
+
+def no_spawn(monkeypatch):
+    def _popen(args, **kwargs):
+        raise AssertionError("Program was run during replay: %s" % args)
+
+    monkeypatch.setattr(OpenAFSLibrary.command.subprocess, "Popen", _popen)
+
+
+def test_replay__serves_recorded_results(tape, monkeypatch):
+    python = sys.executable
+    cassette.start_recording(tape)
+    run_program([python, "-c", "print('hello')"])
+    run_program([python, "-c", "import sys; sys.stderr.write('x'); sys.exit(3)"])
+    cassette.stop_recording()
+    assert len(cassette.load(tape)) == 2
+
+    no_spawn(monkeypatch)
+    cassette.start_replay(tape)
+    assert run_program(["/other/path/python", "-c", "print('hello')"]) == (
+        0,
+        "hello\n",
+        "",
+    )
+    rc, out, err = run_program(
+        [python, "-c", "import sys; sys.stderr.write('x'); sys.exit(3)"]
+    )
+    assert (rc, err) == (3, "x")
+
+
+def test_replay__serves_results_in_order__and__repeats_the_last(tape):
+    with open(tape, "w") as f:
+        f.write('{"args":["vos","listvldb"],"code":0,"stdout":"one","stderr":""}\n')
+        f.write('{"args":["vos","listvldb"],"code":0,"stdout":"two","stderr":""}\n')
+    cassette.start_replay(tape)
+    got = [run_program(["vos", "listvldb"])[1] for _ in range(3)]
+    assert got == ["one", "two", "two"]
+
+
+def test_replay__raises_cassette_error__when__command_not_recorded(tape, monkeypatch):
+    no_spawn(monkeypatch)
+    tape.write_text("")
+    cassette.start_replay(tape)
+    with pytest.raises(CassetteError):
+        run_program(["vos", "listvldb"])
+
+
+def test_record_and_replay__stream_and_tool_errors(tmp_path, tape, process):
+    gz = tmp_path / "commands.jsonl.gz"
+    process(stdout=["line1", "line2"])
+    process(code=255, stderr=["VLDB: no such entry"])
+    cassette.start_recording(gz)
+    assert list(vos_lines("listvol", "-fast")) == ["line1", "line2"]
+    with pytest.raises(NoSuchEntryError):
+        vos("listvldb", "-name", "x")
+    cassette.stop_recording()
+
+    # The process queue is empty now, so a spawned program would fail.
+    cassette.start_replay(gz)
+    assert list(vos_lines("listvol", "-fast")) == ["line1", "line2"]
+    with pytest.raises(NoSuchEntryError):
+        vos("listvldb", "-name", "x")
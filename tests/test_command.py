@@ -2,18 +2,30 @@
 # See LICENSE
 
 import pytest
+import asyncio
 import os
 import sys
+import time
 
 from OpenAFSLibrary.command import (
+    add_observer,
     run_program,
+    run_programs,
+    arun_program,
+    arun_programs,
+    avos,
+    afs,
     rxdebug,
     bos,
     vos,
     fs,
+    vos_lines,
+    ProgramStream,
     CommandFailed,
+    CommandTimedOut,
     NoSuchEntryError,
 )
+from OpenAFSLibrary.querycache import query_cache
 
 
 @pytest.fixture
@@ -21,6 +33,13 @@ def python():
     return sys.executable
 
 
+@pytest.fixture
+def cached():
+    query_cache.enable(ttl=60, size=16)
+    yield query_cache
+    query_cache.disable()
+
+
 def test_run_program__runs_hello_world(python, logged):
     rc, out, err = run_program([python, "-c", "print('hello world')"])
     assert rc == 0
@@ -43,6 +62,35 @@ def test_run_program__raises_file_not_found__when__program_is_missing(tmp_path):
         rc, out, err = run_program([missing_path])
 
 
+def test_run_program__returns_127__when__command_string_program_is_missing():
+    rc, out, err = run_program("no-such-command arg")
+    assert rc == 127
+    assert "no-such-command" in err
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="This test is not applicable on Windows."
+)
+@pytest.mark.parametrize(
+    "command_string, expected_rc",
+    [("exit 0", 0), ("exit 3", 3), ("cd /", 0), (": ok", 0)],
+)
+def test_run_program__runs_shell_builtins_in_shell(command_string, expected_rc):
+    rc, out, err = run_program(command_string)
+    assert rc == expected_rc
+
+
+def test_arun_program__returns_127__when__command_string_program_is_missing():
+    rc, out, err = asyncio.run(arun_program("no-such-command arg"))
+    assert rc == 127
+
+
+def test_program_stream__returns_127__when__command_string_program_is_missing():
+    with ProgramStream("no-such-command arg") as stream:
+        assert list(stream) == []
+    assert stream.returncode == 127
+
+
 @pytest.mark.skipif(
     sys.platform == "win32", reason="This test is not applicable on Windows."
 )
@@ -56,6 +104,162 @@ def test_run_program__raises_permission_error__when__file_is_not_executable(
         rc, out, err = run_program([script_path])
 
 
+def test_run_program__raises_command_timed_out__when__timeout_expires(python):
+    code = "import time; print('started', flush=True); time.sleep(30)"
+    start = time.monotonic()
+    with pytest.raises(CommandTimedOut) as e:
+        run_program([python, "-c", code], timeout=0.5)
+    assert time.monotonic() - start < 10
+    assert e.value.timeout == 0.5
+    assert e.value.output.strip() == "started"
+    assert isinstance(e.value, CommandFailed)
+
+
+def test_run_program__kills_process_group__when__shell_command_times_out():
+    start = time.monotonic()
+    with pytest.raises(CommandTimedOut) as e:
+        run_program("echo started; sleep 30; echo done", timeout=0.5)
+    assert time.monotonic() - start < 10
+    assert e.value.output.strip() == "started"
+
+
+def test_run_program__uses_timeout_variable__when__timeout_not_given(python, variables):
+    variables["AFS_COMMAND_TIMEOUT"] = "0.5"
+    with pytest.raises(CommandTimedOut):
+        run_program([python, "-c", "import time; time.sleep(30)"])
+
+
+def test_arun_program__raises_command_timed_out__when__timeout_expires(python):
+    code = "import time; print('started', flush=True); time.sleep(30)"
+    with pytest.raises(CommandTimedOut) as e:
+        asyncio.run(arun_program([python, "-c", code], timeout=0.5))
+    assert e.value.output.strip() == "started"
+
+
+def test_program_stream__raises_command_timed_out__when__timeout_expires(python):
+    code = "import time; print('started', flush=True); time.sleep(30)"
+    lines = []
+    with pytest.raises(CommandTimedOut):
+        with ProgramStream([python, "-c", code], timeout=0.5) as stream:
+            for line in stream:
+                lines.append(line)
+    assert lines == ["started"]
+
+
+def test_run_programs__returns_results_in_order(python):
+    commands = [
+        [python, "-c", "import time; time.sleep(0.2); print('first')"],
+        [python, "-c", "print('second')"],
+        [python, "-c", "import sys; sys.exit(3)"],
+    ]
+    results = run_programs(commands, max_workers=3)
+    assert [rc for rc, out, err in results] == [0, 0, 3]
+    assert results[0][1].strip() == "first"
+    assert results[1][1].strip() == "second"
+
+
+def test_run_programs__raises_command_failed__when__check_is_true(python):
+    commands = [
+        [python, "-c", "print('ok')"],
+        [python, "-c", "import sys; sys.stderr.write('boom'); sys.exit(1)"],
+    ]
+    with pytest.raises(CommandFailed) as e:
+        run_programs(commands, max_workers=2, check=True)
+    assert e.value.name == python
+    assert e.value.err == "boom"
+
+
+def test_run_programs__returns_empty_list__when__no_commands_given():
+    assert run_programs([]) == []
+
+
+def test_arun_program__runs_hello_world(python, logged):
+    rc, out, err = asyncio.run(arun_program([python, "-c", "print('hello world')"]))
+    assert rc == 0
+    assert out.strip() == "hello world"
+    assert f"running: {python} -c print('hello world')" in logged.info
+
+
+def test_arun_program__runs_shell_command(logged):
+    rc, out, err = asyncio.run(arun_program("echo hello; exit 2"))
+    assert rc == 2
+    assert out.strip() == "hello"
+
+
+def test_arun_programs__returns_results_in_order(python):
+    commands = [
+        [python, "-c", "import time; time.sleep(0.2); print('first')"],
+        [python, "-c", "print('second')"],
+    ]
+    results = asyncio.run(arun_programs(commands, max_workers=2))
+    assert [out.strip() for rc, out, err in results] == ["first", "second"]
+
+
+def test_avos__raises_no_such_entry_error__when__vldb_error_is_seen(process):
+    proc = process(code=255, stderr=["error", "VLDB: no such entry"])
+    with pytest.raises(NoSuchEntryError):
+        asyncio.run(avos("examine"))
+    assert proc.args == ["vos", "examine"]
+
+
+def test_afs__runs_fs_command(process):
+    usage = "fs: Commands are: ..."
+    proc = process(stdout=[usage])
+    out = asyncio.run(afs("help"))
+    assert out == usage
+    assert proc.args == ["fs", "help"]
+
+
+def test_program_stream__yields_lines_and_collects_error(python, logged):
+    code = "import sys; print('a'); print('b'); sys.stderr.write('oops'); sys.exit(2)"
+    with ProgramStream([python, "-c", code]) as stream:
+        lines = list(stream)
+    assert lines == ["a", "b"]
+    assert stream.returncode == 2
+    assert stream.error == "oops"
+    assert "lines: 2" in logged.debug
+
+
+def test_program_stream__kills_program__when__closed_early(python):
+    code = "import time\nwhile True:\n    print('x', flush=True)\n    time.sleep(0.01)"
+    stream = ProgramStream([python, "-c", code])
+    assert next(iter(stream)) == "x"
+    stream.close()
+    assert stream.returncode != 0
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="This test is not applicable on Windows."
+)
+def test_program_stream__kills_pipeline__when__closed_early():
+    stream = ProgramStream("while true; do echo x; sleep 0.01; done | cat", timeout=10)
+    assert next(iter(stream)) == "x"
+    start = time.monotonic()
+    stream.close()
+    assert time.monotonic() - start < 5
+    assert stream.returncode != 0
+    assert not stream.timed_out
+
+
+def test_vos_lines__yields_output_lines(process):
+    proc = process(stdout=["one", "two"])
+    assert list(vos_lines("listvol", "-fast")) == ["one", "two"]
+    assert proc.args == ["vos", "listvol", "-fast"]
+
+
+def test_vos_lines__raises_no_such_entry_error__when__vldb_error_is_seen(process):
+    process(code=255, stderr=["VLDB: no such entry"])
+    with pytest.raises(NoSuchEntryError):
+        list(vos_lines("listvldb", "-name", "test"))
+
+
+def test_vos_lines__reuses_output__when__query_is_cached(process, cached):
+    process(stdout=["one", "two"])
+    assert list(vos_lines("listpart", "fs1")) == ["one", "two"]
+    assert list(vos_lines("listpart", "fs1")) == ["one", "two"]
+    assert cached.hits == 1
+
+
 def test_run_rxdebug__runs_rxdebug(process):
     usage = "Usage: rxdebug -servers ..."
     proc = process(code=0, stdout=[usage])
@@ -116,3 +320,113 @@ def test_run_fs__runs_command_in_path__when__fs_variable_is_set(process, variabl
     out = fs("help")
     assert out == usage
     assert proc.args == ["/my/custom/path/fs", "help"]
+
+
+def test_vos__reuses_output__when__query_is_cached(process, cached):
+    proc = process(stdout=["The partitions on the server are:"])
+    out1 = vos("listpart", "fs1")
+    out2 = vos("listpart", "fs1")
+    assert out1 == out2
+    assert proc.args == ["vos", "listpart", "fs1"]
+    assert cached.hits == 1
+
+
+def test_vos__does_not_cache_output__when__invalidated_while_running(process, cached):
+    proc = process(stdout=["old"])
+
+    def communicate(*args, **kwargs):
+        cached.invalidate("vos")  # A concurrent change finished first.
+        return (proc.output, proc.error)
+
+    proc.communicate.side_effect = communicate
+    assert vos("listvldb", "-name", "test") == "old"
+    process(stdout=["new"])
+    assert vos("listvldb", "-name", "test") == "new"
+
+
+def test_vos__invalidates_cached_queries__when__volume_is_changed(process, cached):
+    process(stdout=["first"])
+    process(stdout=["Volume 536870912 created on partition /vicepa of fs1"])
+    process(stdout=["second"])
+    assert vos("listvldb", "-name", "test") == "first"
+    vos("create", "-server", "fs1", "-partition", "a", "-name", "test")
+    assert vos("listvldb", "-name", "test") == "second"
+
+
+def test_fs__keeps_cached_vos_queries__when__acl_is_changed(process, cached):
+    process(stdout=["listvldb"])
+    process(stdout=["listacl"])
+    process()
+    process(stdout=["listacl changed"])
+    vos("listvldb", "-name", "test")
+    fs("listacl", "/afs/test")
+    fs("setacl", "-dir", "/afs/test", "-acl", "user", "rl")
+    assert fs("listacl", "/afs/test") == "listacl changed"
+    assert vos("listvldb", "-name", "test") == "listvldb"
+
+
+def test_run_program__invalidates_cached_queries__when__volume_is_changed(
+    process, cached
+):
+    process(stdout=["first"])
+    process()
+    process(stdout=["second"])
+    assert vos("listvldb", "-name", "test") == "first"
+    run_program(["/usr/sbin/vos", "remove", "-id", "test"])
+    assert vos("listvldb", "-name", "test") == "second"
+
+
+def test_run_program__invalidates_cached_queries__when__shell_command_changes_volume(
+    process, cached
+):
+    process(stdout=["first"])
+    process()
+    process(stdout=["second"])
+    assert vos("listvldb", "-name", "test") == "first"
+    run_program("sudo vos remove -id test > /dev/null")
+    assert vos("listvldb", "-name", "test") == "second"
+
+
+def test_run_program__keeps_cached_queries__when__volume_is_examined(process, cached):
+    process(stdout=["first"])
+    process()
+    assert vos("listvldb", "-name", "test") == "first"
+    run_program(["vos", "examine", "-id", "fs"])
+    assert vos("listvldb", "-name", "test") == "first"
+
+
+def test_vos__does_not_cache_errors(process, cached):
+    process(code=255, stderr=["VLDB: no such entry"])
+    process(stdout=["found"])
+    with pytest.raises(NoSuchEntryError):
+        vos("listvldb", "-name", "test")
+    assert vos("listvldb", "-name", "test") == "found"
+
+
+class Observer:
+    def __init__(self):
+        self.records = []
+
+    def record(self, args, code, output, error):
+        self.records.append((args[1], code, output))
+
+
+def test_program_stream__does_not_collect_output__when__observers_ignore_output(
+    process,
+):
+    observer = Observer()
+    add_observer(observer)
+    process(stdout=["line 1", "line 2"])
+    with ProgramStream(["vos", "listvldb"]) as stream:
+        assert list(stream) == ["line 1", "line 2"]
+        assert stream._lines is None
+    assert observer.records == [("listvldb", 0, None)]
+
+
+def test_program_stream__collects_output__when__observer_needs_output(process):
+    observer = Observer()
+    add_observer(observer, output=True)
+    process(stdout=["line 1", "line 2"])
+    with ProgramStream(["vos", "listvldb"]) as stream:
+        list(stream)
+    assert observer.records == [("listvldb", 0, "line 1\nline 2\n")]
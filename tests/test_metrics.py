@@ -0,0 +1,53 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import json
+import pytest
+
+from OpenAFSLibrary.metrics import CommandMetrics, command_tag, percentile
+
+
+@pytest.mark.parametrize(
+    "args,expected",
+    [
+        (["/usr/afs/bin/vos", "listvldb", "-name", "x"], "vos listvldb"),
+        (["fs", "setacl", "-dir", "/afs"], "fs setacl"),
+        (["unlog"], "unlog"),
+        (["rxdebug", "-servers", "host"], "rxdebug"),
+        ("kdestroy -q", "kdestroy"),
+        ([], ""),
+    ],
+)
+def test_command_tag__returns_tool_and_subcommand(args, expected):
+    assert command_tag(args) == expected
+
+
+def test_percentile__returns_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_summary__returns_stats_by_tag__slowest_first():
+    metrics = CommandMetrics()
+    for x in (1.0, 2.0, 3.0):
+        metrics.record("vos release", x)
+    metrics.record("vos listvldb", 0.5)
+    stats = metrics.summary()
+    assert [s["tag"] for s in stats] == ["vos release", "vos listvldb"]
+    assert stats[0]["count"] == 3
+    assert stats[0]["total"] == 6.0
+    assert stats[0]["mean"] == 2.0
+    assert stats[0]["p50"] == 2.0
+    assert stats[0]["p99"] == 3.0
+
+
+def test_to_json_and_to_csv__dump_summary():
+    metrics = CommandMetrics()
+    metrics.record("fs setacl", 0.25)
+    assert json.loads(metrics.to_json())[0]["tag"] == "fs setacl"
+    lines = metrics.to_csv().splitlines()
+    assert lines[0] == "tag,count,total,mean,min,max,p50,p95,p99"
+    assert lines[1].startswith("fs setacl,1,0.25,")
@@ -0,0 +1,66 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import pytest
+
+from OpenAFSLibrary.querycache import QueryCache
+import OpenAFSLibrary.querycache
+
+
+@pytest.fixture
+def cache():
+    cache = QueryCache()
+    cache.enable(ttl=60, size=2)
+    return cache
+
+
+def test_get__returns_none__when__key_is_missing(cache):
+    assert cache.get(("vos", "listpart")) is None
+    assert cache.misses == 1
+
+
+def test_get__returns_value__when__key_was_put(cache):
+    cache.put(("vos", "listpart"), "output")
+    assert cache.get(("vos", "listpart")) == "output"
+    assert cache.hits == 1
+
+
+def test_get__returns_none__when__entry_is_expired(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(OpenAFSLibrary.querycache.time, "monotonic", lambda: now[0])
+    cache.put(("vos", "listpart"), "output")
+    now[0] += 61
+    assert cache.get(("vos", "listpart")) is None
+
+
+def test_put__evicts_least_recently_used__when__size_is_exceeded(cache):
+    cache.put(("vos", "a"), "a")
+    cache.put(("vos", "b"), "b")
+    cache.get(("vos", "a"))
+    cache.put(("vos", "c"), "c")
+    assert cache.get(("vos", "a")) == "a"
+    assert cache.get(("vos", "b")) is None
+    assert cache.get(("vos", "c")) == "c"
+
+
+def test_put__is_ignored__when__cache_is_disabled():
+    cache = QueryCache()
+    cache.put(("vos", "a"), "a")
+    assert len(cache) == 0
+
+
+def test_invalidate__removes_entries_for_tools(cache):
+    cache.put(("vos", "a"), "a")
+    cache.put(("fs", "b"), "b")
+    cache.invalidate("vos")
+    assert cache.get(("vos", "a")) is None
+    assert cache.get(("fs", "b")) == "b"
+
+
+def test_put__is_ignored__when__invalidated_since_generation(cache):
+    generation = cache.generation
+    cache.invalidate("vos")
+    cache.put(("vos", "a"), "a", generation)
+    assert cache.get(("vos", "a")) is None
+    cache.put(("vos", "a"), "a", cache.generation)
+    assert cache.get(("vos", "a")) == "a"
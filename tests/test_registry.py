@@ -0,0 +1,28 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+from OpenAFSLibrary.registry import ResourceRegistry, within
+
+
+def test_forget_volume__removes_volume_by_name_or_id():
+    registry = ResourceRegistry()
+    registry.add_volume("a", 536870915, "afs1", "a")
+    registry.add_volume("b", 536870918, "afs1", "a")
+    registry.forget_volume("a")
+    registry.forget_volume("536870918")
+    assert len(registry) == 0
+
+
+def test_forget_mount__removes_acl_entries_within_mount():
+    registry = ResourceRegistry()
+    registry.add_mount("/afs/example.com/test")
+    registry.add_acl("/afs/example.com/test/dir", "user1")
+    registry.add_acl("/afs/example.com/test2", "user1")
+    registry.forget_mount("/afs/example.com/test")
+    assert list(registry.acls) == [("/afs/example.com/test2", "user1")]
+
+
+def test_within__matches_the_directory_and_paths_below():
+    assert within("/afs/a", "/afs/a")
+    assert within("/afs/a/b", "/afs/a/")
+    assert not within("/afs/ab", "/afs/a")
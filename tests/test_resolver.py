@@ -0,0 +1,92 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import socket
+from unittest.mock import Mock
+
+import pytest
+
+from OpenAFSLibrary.command import vos
+from OpenAFSLibrary.resolver import ServerResolver, parse_listaddrs
+
+LISTING = """\
+UUID: 0027b6b2-bd93-1d77-b3-77-860be30aaa77
+10.0.0.1
+192.168.1.1
+
+UUID: 0054f7a2-1c2e-1d77-a0-c4-860be30aaa78
+10.0.0.2
+
+10.0.0.3
+"""
+
+
+@pytest.fixture
+def cell(cell):
+    cell.multihomed[cell.addresses["afs2"]] = ["192.168.1.2", "172.16.0.2"]
+    return cell
+
+
+@pytest.fixture
+def gethostbyname(monkeypatch):
+    hosts = {"afs1": "10.0.0.1", "afs2": "10.0.0.2", "afs2-b": "192.168.1.2"}
+    mock = Mock(side_effect=lambda host: hosts[host])
+    monkeypatch.setattr(socket, "gethostbyname", mock)
+    return mock
+
+
+def test_parse_listaddrs():
+    assert parse_listaddrs(LISTING.splitlines()) == [
+        ("0027b6b2-bd93-1d77-b3-77-860be30aaa77", ["10.0.0.1", "192.168.1.1"]),
+        ("0054f7a2-1c2e-1d77-a0-c4-860be30aaa78", ["10.0.0.2"]),
+        (None, ["10.0.0.3"]),
+    ]
+
+
+def test_address__resolves_each_name_once(cell, gethostbyname):
+    resolver = ServerResolver()
+    assert resolver.address("afs1") == "10.0.0.1"
+    assert resolver.address("afs1") == "10.0.0.1"
+    assert resolver.address("10.0.0.9") == "10.0.0.9"
+    assert gethostbyname.call_count == 1
+
+
+def test_addresses__include_all_addresses_of_multihomed_server(cell, gethostbyname):
+    resolver = ServerResolver()
+    expected = {"10.0.0.2", "192.168.1.2", "172.16.0.2"}
+    assert resolver.addresses("afs2") == expected
+    assert resolver.addresses("afs2-b") == expected
+    assert resolver.addresses("172.16.0.2") == expected
+    assert resolver.addresses("10.0.0.9") == {"10.0.0.9"}
+
+
+def test_addresses__lists_addresses_once(cell, gethostbyname, commands):
+    resolver = ServerResolver()
+    for _ in range(3):
+        resolver.addresses("afs1")
+        resolver.addresses("afs2")
+    assert commands == ["vos listaddrs"]
+    vos("changeaddr", "-oldaddr", "172.16.0.2", "-remove")
+    assert resolver.addresses("afs2") == {"10.0.0.2", "192.168.1.2"}
+    assert commands.count("vos listaddrs") == 2
+
+
+def test_addresses__returns_own_address__when__listaddrs_fails(
+    cell, gethostbyname, commands, logged
+):
+    resolver = ServerResolver()
+    cell.inject_error("vos listaddrs", error="no quorum elected", count=2)
+    assert resolver.addresses("afs2") == {"10.0.0.2"}
+    assert resolver.addresses("192.168.1.2") == {"192.168.1.2"}
+    assert any("no quorum elected" in m for m in logged.info)
+    expected = {"10.0.0.2", "192.168.1.2", "172.16.0.2"}
+    assert resolver.addresses("afs2") == expected
+    assert commands.count("vos listaddrs") == 3
+
+
+def test_clear__discards_cached_names(cell, gethostbyname):
+    resolver = ServerResolver()
+    resolver.addresses("afs1")
+    resolver.clear()
+    resolver.addresses("afs1")
+    assert gethostbyname.call_count == 2
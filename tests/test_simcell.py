@@ -0,0 +1,176 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+import asyncio
+import time
+
+import pytest
+
+from OpenAFSLibrary import simcell
+from OpenAFSLibrary.command import (
+    arun_programs,
+    vos,
+    fs,
+    rxdebug,
+    CommandFailed,
+    NoSuchEntryError,
+)
+from OpenAFSLibrary.keywords.acl import AccessControlList
+from OpenAFSLibrary.keywords.volume import (
+    examine_path,
+    get_volume_entry,
+    get_parts,
+    _volume_on_partition,
+    _VolumeKeywords,
+)
+
+
+def test_run__returns_error__when__operation_is_unknown(cell):
+    code, out, err = cell.run(["vos", "bogus"])
+    assert code == 1
+    assert "Unrecognized operation" in err
+
+
+def test_create_volume__adds_vldb_entry_and_partition_volume(cell):
+    keywords = _VolumeKeywords()
+    vid = keywords.create_volume("test", server="afs2", part="b")
+    entry = get_volume_entry("test")
+    assert entry.rw == int(vid)
+    assert (entry.server, entry.part) == (cell.addresses["afs2"], "b")
+    assert _volume_on_partition("afs2", "b", vid)
+    assert not _volume_on_partition("afs1", "a", vid)
+    assert get_parts("afs1") == ["a", "b"]
+
+
+def test_create_volume__fails__when__volume_exists(cell):
+    cell.create_volume("test", "afs1", "a")
+    with pytest.raises(CommandFailed):
+        vos("create", "-server", "afs1", "-partition", "a", "-name", "test")
+
+
+def test_create_volume__releases_replicated_volume_and_parent(cell):
+    keywords = _VolumeKeywords()
+    vos("addsite", "-server", "afs1", "-partition", "a", "-id", "root.cell")
+    vos("release", "root.cell")
+    vid = keywords.create_volume(
+        "test", server="afs1", path="/afs/example.com/test", ro=True
+    )
+    entry = get_volume_entry(vid)
+    assert entry.rosites == [(cell.addresses["afs1"], "a")]
+    info = examine_path("/afs/example.com/test")
+    assert info["name"] == "test.readonly"
+    assert info["vid"] == int(vid) + 1
+    assert examine_path("/afs/example.com")["name"] == "root.cell.readonly"
+
+
+def test_remove_volume__removes_entry_and_clones(cell):
+    keywords = _VolumeKeywords()
+    vid = keywords.create_volume("test", server="afs1", ro=True)
+    keywords.remove_volume("test")
+    with pytest.raises(NoSuchEntryError):
+        get_volume_entry("test")
+    assert not _volume_on_partition("afs1", "a", vid)
+    assert not _volume_on_partition("afs1", "a", str(int(vid) + 1))
+
+
+def test_remove_volume__zaps_orphan_volume(cell):
+    keywords = _VolumeKeywords()
+    vid = keywords.create_volume("test", server="afs1", part="b", orphan=True)
+    with pytest.raises(NoSuchEntryError):
+        get_volume_entry(vid)
+    assert _volume_on_partition("afs1", "b", vid)
+    keywords.remove_volume(vid, server="afs1", zap=True)
+    assert not _volume_on_partition("afs1", "b", vid)
+
+
+def test_volume_lock__is_reported_by_listvldb(cell):
+    keywords = _VolumeKeywords()
+    cell.create_volume("test", "afs1", "a")
+    keywords.volume_should_be_unlocked("test")
+    vos("lock", "-id", "test")
+    keywords.volume_should_be_locked("test")
+    with pytest.raises(CommandFailed):
+        vos("release", "test")
+
+
+def test_listvldb__lists_all_entries(cell):
+    cell.populate(5, prefix="load")
+    out = vos("listvldb", "-noresolve")
+    assert "Total entries: 7" in out
+    out = vos("listvldb", "-server", "afs1", "-partition", "a", "-quiet")
+    assert out.count("RW Site") == 4  # root.afs, root.cell, load.0, load.4
+
+
+def test_setacl__updates_listacl(cell):
+    fs("mkmount", "-dir", "/afs/example.com/test", "-vol", "root.cell")
+    fs("setacl", "-dir", "/afs/example.com/test", "-acl", "user1", "rl")
+    fs("setacl", "-dir", "/afs/example.com/test", "-acl", "user2", "w", "-negative")
+    acl = AccessControlList.from_output(fs("listacl", "/afs/example.com/test"))
+    assert acl.contains("system:administrators", "rlidwka")
+    assert acl.contains("user1", "rl")
+    assert acl.contains("user2", "-w")
+    fs("setacl", "-dir", "/afs/example.com/test", "-acl", "user1", "none")
+    acl = AccessControlList.from_output(fs("listacl", "/afs/example.com/test"))
+    assert not acl.contains("user1", "rl")
+
+
+def test_mkmount__fails__when__path_is_a_mount_point(cell):
+    with pytest.raises(CommandFailed):
+        fs("mkmount", "-dir", "/afs/example.com", "-vol", "root.cell")
+
+
+def test_rxdebug__returns_version(cell):
+    out = rxdebug("-servers", "afs1", "-port", "7000", "-version")
+    assert "AFS version: OpenAFS" in out
+
+
+def test_inject_error__fails_the_next_commands(cell):
+    cell.inject_error("vos listpart", error="server down", count=2)
+    for _ in range(2):
+        with pytest.raises(CommandFailed, match="server down"):
+            get_parts("afs1")
+    assert get_parts("afs1") == ["a", "b"]
+
+
+def test_latency__delays_commands_by_tag(cell, monkeypatch):
+    delays = []
+    monkeypatch.setattr(simcell.time, "sleep", delays.append)
+    cell.latency = 0.01
+    cell.set_latency("vos release", 0.5)
+    vos("listpart", "afs1")
+    vos("release", "root.cell")
+    assert delays == [0.01, 0.5]
+
+
+def test_latency__overlaps__when__commands_run_with_asyncio(cell):
+    cell.latency = 0.2
+    start = time.monotonic()
+    results = asyncio.run(arun_programs([["vos", "listpart", "afs1"]] * 10))
+    assert time.monotonic() - start < 1.0
+    assert [code for code, out, err in results] == [0] * 10
+
+
+def test_error_rate__fails_commands_at_random(variables):
+    cell = simcell.SimulatedCell(error_rate=0.5, seed=1)
+    codes = [cell.run(["vos", "listpart", "localhost"])[0] for _ in range(100)]
+    assert 0 < codes.count(1) < 100
+
+
+def test_volume_should_exist__lists_each_partition_once(cell):
+    keywords = _VolumeKeywords()
+    cell.populate(20, prefix="load")
+    calls = cell.calls
+    for i in range(20):
+        keywords.volume_should_exist("load.%d" % i)
+    assert cell.calls - calls == 20 + 4  # One listvldb per volume.
+    keywords.create_volume("test", server="afs1")
+    keywords.volume_should_exist("test")
+
+
+def test_get_volume_status__returns_volume_and_partition_status(cell):
+    keywords = _VolumeKeywords()
+    vid = keywords.create_volume("test", server="afs1", part="b", quota="100")
+    status = keywords.get_volume_status("test")
+    assert (status.id, status.max_quota, status.type) == (int(vid), 100, "RW")
+    statuses = keywords.get_volume_status(server="afs1", part="b")
+    assert [s.name for s in statuses] == ["test"]
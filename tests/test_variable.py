@@ -1,8 +1,20 @@
 # Copyright (c) 2025, Sine Nomine Associates
 # See LICENSE
 
+import os
 import pytest
-from OpenAFSLibrary.variable import get_var, get_bool, VariableMissing, VariableEmpty
+import OpenAFSLibrary.variable
+from OpenAFSLibrary.variable import (
+    get_var,
+    get_bool,
+    get_tool,
+    check_tools,
+    clear_cache,
+    freeze,
+    VariableCacheListener,
+    VariableMissing,
+    VariableEmpty,
+)
 
 
 def test_get_var__returns_default_values(variables):
@@ -61,3 +73,114 @@ def test_get_bool__raises_exception__when__variable_value_is_empty(variables):
     variables["__TEST_NAME__"] = ""
     with pytest.raises(VariableEmpty):
         get_bool("__TEST_NAME__")
+
+
+@pytest.fixture
+def which(monkeypatch, variables):
+    """Resolve commands in a fake PATH and count the lookups."""
+    paths = {"vos": "/usr/bin/vos", "fs": "/usr/bin/fs"}
+    lookups = []
+
+    def _which(cmd):
+        lookups.append(cmd)
+        return paths.get(cmd)
+
+    monkeypatch.setattr(OpenAFSLibrary.variable.shutil, "which", _which)
+    return lookups
+
+
+def test_get_tool__returns_absolute_path__when__command_is_found(which):
+    assert get_tool("VOS") == "/usr/bin/vos"
+    assert get_tool("VOS") == "/usr/bin/vos"
+    assert which == ["vos"]
+
+
+def test_get_tool__resolves_again__when__variable_changes(which, variables):
+    assert get_tool("VOS") == "/usr/bin/vos"
+    variables["VOS"] = "fs"
+    assert get_tool("VOS") == "/usr/bin/fs"
+
+
+def test_get_tool__returns_value__when__command_is_not_found(which):
+    assert get_tool("BOS") == "bos"
+    assert get_tool("BOS") == "bos"
+    assert which == ["bos", "bos"]
+
+
+def test_check_tools__reports_missing_commands(which, variables, tmp_path):
+    script = tmp_path / "fs"
+    script.write_text("#!/bin/sh\n")
+    os.chmod(script, 0o644)
+    variables["FS"] = str(script)
+    variables["BOS"] = str(tmp_path / "missing")
+    problems = check_tools(["VOS", "FS", "BOS", "UNLOG"])
+    assert problems == [
+        f"FS: {script} is not executable",
+        f"BOS: {tmp_path}/missing does not exist",
+        "UNLOG: unlog not found in PATH",
+    ]
+
+
+@pytest.fixture
+def lookups(monkeypatch, variables):
+    """Count the Robot Framework variable lookups."""
+    lookups = []
+    gvv = OpenAFSLibrary.variable._rf.get_variable_value
+
+    def counting_gvv(name):
+        lookups.append(name)
+        return gvv(name)
+
+    monkeypatch.setattr(OpenAFSLibrary.variable._rf, "get_variable_value", counting_gvv)
+    return lookups
+
+
+def test_get_var__caches_value(lookups):
+    assert get_var("VOS") == "vos"
+    assert get_var("VOS") == "vos"
+    assert lookups == ["${VOS}"]
+
+
+def test_get_var__does_not_cache_missing_variables(lookups):
+    for _ in range(2):
+        with pytest.raises(VariableMissing):
+            get_var("__TEST_NAME__")
+    assert lookups == ["${__TEST_NAME__}", "${__TEST_NAME__}"]
+
+
+def test_clear_cache__resolves_variables_again(lookups):
+    get_var("VOS")
+    clear_cache()
+    get_var("VOS")
+    assert lookups == ["${VOS}", "${VOS}"]
+
+
+def test_freeze__keeps_cached_values__until__unfrozen(lookups):
+    get_var("VOS")
+    freeze()
+    clear_cache()
+    get_var("VOS")
+    assert lookups == ["${VOS}"]
+    freeze(False)
+    get_var("VOS")
+    assert lookups == ["${VOS}", "${VOS}"]
+
+
+@pytest.mark.parametrize(
+    "event,attrs,cleared",
+    [
+        ("start_suite", {}, True),
+        ("end_test", {}, True),
+        ("start_keyword", {"libname": "BuiltIn"}, True),
+        ("end_keyword", {"libname": "BuiltIn"}, True),
+        ("start_keyword", {"libname": "OpenAFSLibrary"}, False),
+        ("end_keyword", {"libname": "OpenAFSLibrary", "assign": []}, False),
+        ("end_keyword", {"libname": "OpenAFSLibrary", "assign": ["${X}"]}, True),
+    ],
+)
+def test_variable_cache_listener__clears_cache(lookups, event, attrs, cleared):
+    get_var("VOS")
+    listener = VariableCacheListener()
+    getattr(listener, event)("name", attrs)
+    get_var("VOS")
+    assert len(lookups) == (2 if cleared else 1)
@@ -0,0 +1,187 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+from OpenAFSLibrary import command, vldb
+from OpenAFSLibrary.vldb import (
+    PartitionVolumeIds,
+    VldbSnapshot,
+    VolumeEntry,
+    parse_vldb,
+)
+
+LISTING = """\
+VLDB entries for all servers
+
+root.afs
+    RWrite: 536870912     ROnly: 536870913
+    number of sites -> 2
+       server 10.0.0.1 partition /vicepa RW Site
+       server 10.0.0.1 partition /vicepa RO Site
+
+test.1
+    RWrite: 536870915
+    number of sites -> 1
+       server 10.0.0.2 partition /vicepb RW Site
+    Volume is currently LOCKED
+
+Total entries: 2
+"""
+
+
+def entry(name, rw, server, part, ro=None, rosites=()):
+    e = VolumeEntry(name)
+    e.rw = rw
+    e.ro = ro
+    e.server = server
+    e.part = part
+    e.rosites = list(rosites)
+    return e
+
+
+def entries():
+    return [
+        entry(
+            "root.afs",
+            536870912,
+            "10.0.0.1",
+            "a",
+            ro=536870913,
+            rosites=[("10.0.0.1", "a")],
+        ),
+        entry("test.1", 536870915, "10.0.0.2", "b"),
+        entry("test.2", 536870918, "10.0.0.2", "b"),
+        entry("user.x", 536870921, "10.0.0.1", "a"),
+    ]
+
+
+def test_parse_vldb__parses_all_entries():
+    got = list(parse_vldb(LISTING.splitlines()))
+    expected = entries()[:2]
+    expected[1].locked = True
+    assert got == expected
+
+
+def test_parse_vldb__parses_entries__when__no_blank_lines():
+    lines = [line for line in LISTING.splitlines() if line.strip()]
+    assert [e.name for e in parse_vldb(lines)] == ["root.afs", "test.1"]
+
+
+def test_parse_vldb__parses_lock_operation_and_backup_id():
+    lines = [
+        "test ",
+        "    RWrite: 536870915     Backup: 536870917 ",
+        "    number of sites -> 1",
+        "       server 10.0.0.2 partition /vicepb RW Site ",
+        "    Volume is currently LOCKED  ",
+        "    Volume is locked for a release operation",
+    ]
+    (e,) = parse_vldb(lines)
+    assert (e.rw, e.ro, e.bk) == (536870915, None, 536870917)
+    assert (e.locked, e.op) == (True, "release")
+
+
+def test_parse_vldb__parses_unreleased_sites():
+    lines = [
+        "test",
+        "    RWrite: 536870915     ROnly: 536870916",
+        "    number of sites -> 3",
+        "       server 10.0.0.1 partition /vicepa RW Site",
+        "       server 10.0.0.1 partition /vicepa RO Site  -- New release",
+        "       server 10.0.0.2 partition /vicepb RO Site  -- Old release",
+    ]
+    (e,) = parse_vldb(lines)
+    assert e.rosites == [("10.0.0.1", "a"), ("10.0.0.2", "b")]
+    assert e.unreleased == [("10.0.0.1", "a"), ("10.0.0.2", "b")]
+
+
+def test_get__finds_entry_by_name_and_ids():
+    snapshot = VldbSnapshot(entries())
+    assert len(snapshot) == 4
+    assert snapshot.get("root.afs").rw == 536870912
+    assert snapshot.get("root.afs.readonly").name == "root.afs"
+    assert snapshot.get("536870913").name == "root.afs"
+    assert snapshot.get(536870915).name == "test.1"
+    assert snapshot.get("missing") is None
+
+
+def test_with_prefix__returns_entries_in_name_order():
+    snapshot = VldbSnapshot(reversed(entries()))
+    assert [e.name for e in snapshot.with_prefix("test.")] == ["test.1", "test.2"]
+    assert snapshot.with_prefix("nope") == []
+    snapshot.add(entry("test.0", 536870924, "10.0.0.2", "b"))
+    assert [e.name for e in snapshot.with_prefix("test")][0] == "test.0"
+
+
+def test_on_partition__returns_rw_and_ro_sites():
+    snapshot = VldbSnapshot(entries())
+    names = [e.name for e in snapshot.on_partition("10.0.0.1", "a")]
+    assert sorted(names) == ["root.afs", "user.x"]
+
+
+def test_record__marks_snapshot_stale__when__vos_changes_the_vldb():
+    snapshot = VldbSnapshot(entries())
+    snapshot.record(["/usr/bin/vos", "listvldb", "-name", "x"], 0, "", "")
+    snapshot.record(["fs", "mkmount", "-dir", "x", "-vol", "y"], 0, "", "")
+    assert not snapshot.stale
+    snapshot.record(["/usr/bin/vos", "remove", "-id", "x"], 0, "", "")
+    assert snapshot.stale
+
+
+def test_update__replaces_entry_and_keeps_it_current__until_vldb_changes():
+    snapshot = VldbSnapshot(entries())
+    snapshot.record(["vos", "remove", "-id", "test.1"], 0, "", "")
+    assert not snapshot.is_current("test.2")
+    snapshot.update("test.1", None)
+    snapshot.update("test.2", entry("test.2", 536870930, "10.0.0.1", "a"))
+    assert snapshot.get("test.1") is None
+    assert snapshot.get("536870930").name == "test.2"
+    assert snapshot.get("536870918") is None
+    assert snapshot.on_partition("10.0.0.2", "b") == []
+    assert snapshot.is_current("test.1") and snapshot.is_current("test.2")
+    assert [e.name for e in snapshot.with_prefix("test.")] == ["test.2"]
+    assert "test.2" in [e.name for e in snapshot.on_partition("10.0.0.1", "a")]
+    snapshot.record(["vos", "release", "-id", "test.2"], 0, "", "")
+    assert not snapshot.is_current("test.2")
+
+
+def test_partition_volume_ids__loads_each_partition_once():
+    loads = []
+
+    def load():
+        loads.append(1)
+        return ["1", "2"]
+
+    ids = PartitionVolumeIds()
+    assert ids.get("s", "a", load) == {"1", "2"}
+    assert ids.get("s", "a", load) == {"1", "2"}
+    ids.get("s", "b", load)
+    assert len(loads) == 2
+
+
+def test_partition_volume_ids__loads_again__when__expired(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(vldb.time, "monotonic", lambda: now[0])
+    ids = PartitionVolumeIds(ttl=10)
+    ids.get("s", "a", lambda: ["1"])
+    now[0] += 11
+    assert ids.get("s", "a", lambda: ["2"]) == {"2"}
+
+
+def test_partition_volume_ids__clears__when__vos_changes_volumes():
+    ids = PartitionVolumeIds()
+    ids.get("s", "a", lambda: ["1"])
+    ids.record(["vos", "listvldb"], 0, "", "")
+    assert ids.get("s", "a", lambda: ["2"]) == {"1"}
+    ids.record(["vos", "zap", "-id", "1", "-server", "s", "-part", "a"], 0, "", "")
+    assert ids.get("s", "a", lambda: ["2"]) == {"2"}
+
+
+def test_partition_volume_ids__stops_observing__when__sets_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(vldb.time, "monotonic", lambda: now[0])
+    ids = PartitionVolumeIds(ttl=10)
+    ids.get("s", "a", lambda: ["1"])
+    assert [o for o, output in command._observers] == [ids]
+    now[0] += 11
+    ids.record(["vos", "listvldb"], 0, None, "")
+    assert command._observers == []
@@ -0,0 +1,72 @@
+# Copyright (c) 2025, Sine Nomine Associates
+# See LICENSE
+
+from OpenAFSLibrary.volstatus import VolumeStatus, parse_volume_status
+
+EXAMINE = """\
+name\t\ttest
+id\t\t536870918
+serv\t\t192.168.122.10\tafs1.example.com
+part\t\t/vicepa
+status\t\tOK
+backupID\t536870920
+parentID\t536870918
+cloneID\t\t0
+inUse\t\tY
+needsSalvaged\tN
+destroyMe\tN
+type\t\tRW
+creationDate\t1700000000\tTue Nov 14 22:13:20 2023
+accessDate\t1700000100\tTue Nov 14 22:15:00 2023
+updateDate\t1700000200\tTue Nov 14 22:16:40 2023
+backupDate\t0\tThu Jan  1 00:00:00 1970
+copyDate\t1700000000\tTue Nov 14 22:13:20 2023
+flags\t\t0\t(Optional)
+diskused\t1024
+maxquota\t5000
+minquota\t0
+filecount\t12
+dayUse\t\t3
+weekUse\t\t17\t(Optional)
+spare2\t\t0\t(Optional)
+
+    RWrite: 536870918     Backup: 536870920
+    number of sites -> 1
+       server afs1.example.com partition /vicepa RW Site
+"""
+
+
+def test_parse_volume_status__parses_vos_examine_format_output():
+    (status,) = parse_volume_status(EXAMINE.splitlines())
+    assert status.name == "test"
+    assert status.id == 536870918
+    assert (status.server, status.part) == ("192.168.122.10", "a")
+    assert status.backup_id == 536870920
+    assert status.in_use is True
+    assert status.needs_salvaged is False
+    assert status.type == "RW"
+    assert status.creation_date == 1700000000
+    assert status.access_date == 1700000100
+    assert status.update_date == 1700000200
+    assert status.flags == 0
+    assert (status.disk_used, status.max_quota, status.file_count) == (1024, 5000, 12)
+    assert (status.day_use, status.week_use) == (3, 17)
+
+
+def test_parse_volume_status__parses_vos_listvol_format_entries():
+    lines = ["Total number of volumes on server afs1 partition /vicepa: 2 "]
+    for vid in (1, 2):
+        lines += ["BEGIN_OF_ENTRY", "name\t\tv%d" % vid, "id\t\t%d" % vid]
+        lines += ["END_OF_ENTRY"]
+    lines += ["", "Total volumes: 2 on-line 0 off-line 0 busy"]
+    statuses = list(parse_volume_status(lines))
+    assert [(s.name, s.id) for s in statuses] == [("v1", 1), ("v2", 2)]
+    assert statuses[0].disk_used is None
+
+
+def test_volume_status__compares_fields():
+    a = VolumeStatus()
+    b = VolumeStatus()
+    assert a == b
+    b.id = 1
+    assert a != b